@@ -12,6 +12,8 @@ import tempfile
 import os
 
 from agentpress.thread_manager import ThreadManager
+from agentpress.cancellation import CancellationToken
+from agentpress.tool_cache import get_tool_cache_stats
 from services.supabase import DBConnection
 from services import redis
 from agent.run import run_agent
@@ -20,7 +22,9 @@ from utils.logger import logger
 from services.billing import check_billing_status
 from utils.config import config
 from sandbox.sandbox import create_sandbox, get_or_start_sandbox
-from services.llm import make_llm_api_call
+from sandbox.uploads import SandboxUploader
+from services.llm import make_llm_api_call, get_connection_stats
+from services.prompt_cache import get_prompt_cache_stats
 
 # Initialize shared resources
 router = APIRouter()
@@ -484,6 +488,22 @@ async def get_agent_run(agent_run_id: str, user_id: str = Depends(get_current_us
         "error": agent_run_data['error']
     }
 
+@router.get("/tool-cache/stats")
+async def tool_cache_stats(user_id: str = Depends(get_current_user_id_from_jwt)):
+    """Get hit and miss counts of the tool result cache."""
+    logger.info("Fetching tool cache stats")
+    return {"tools": await get_tool_cache_stats()}
+
+@router.get("/llm/connection-stats")
+async def llm_connection_stats(user_id: str = Depends(get_current_user_id_from_jwt)):
+    """Get connection reuse of the pooled LLM provider clients in this instance."""
+    return {"instance_id": instance_id, "providers": get_connection_stats()}
+
+@router.get("/llm/prompt-cache-stats")
+async def llm_prompt_cache_stats(user_id: str = Depends(get_current_user_id_from_jwt)):
+    """Get prompt cache reads, writes and hit rate per model."""
+    return {"models": await get_prompt_cache_stats()}
+
 @router.get("/agent-run/{agent_run_id}/stream")
 async def stream_agent_run(
     agent_run_id: str,
@@ -689,6 +709,8 @@ async def run_agent_background(
     pubsub = None
     stop_checker = None
     stop_signal_received = False
+    # Cancels the in-flight LLM stream and tool calls as soon as STOP arrives
+    cancellation_token = CancellationToken()
 
     # Define Redis keys and channels
     response_list_key = f"agent_run:{agent_run_id}:responses"
@@ -709,17 +731,18 @@ async def run_agent_background(
                     if data == "STOP":
                         logger.info(f"Received STOP signal for agent run {agent_run_id} (Instance: {instance_id})")
                         stop_signal_received = True
+                        cancellation_token.cancel("Run stopped by user")
                         break
                 # Periodically refresh the active run key TTL
                 if total_responses % 50 == 0: # Refresh every 50 responses or so
                     try: await redis.expire(instance_active_key, redis.REDIS_KEY_TTL)
                     except Exception as ttl_err: logger.warning(f"Failed to refresh TTL for {instance_active_key}: {ttl_err}")
-                await asyncio.sleep(0.1) # Short sleep to prevent tight loop
         except asyncio.CancelledError:
             logger.info(f"Stop signal checker cancelled for {agent_run_id} (Instance: {instance_id})")
         except Exception as e:
             logger.error(f"Error in stop signal checker for {agent_run_id}: {e}", exc_info=True)
             stop_signal_received = True # Stop the run if the checker fails
+            cancellation_token.cancel("Stop signal checker failed")
 
     try:
         # Setup Pub/Sub listener for control signals
@@ -736,18 +759,16 @@ async def run_agent_background(
             thread_id=thread_id, project_id=project_id, stream=stream,
             thread_manager=thread_manager, model_name=model_name,
             enable_thinking=enable_thinking, reasoning_effort=reasoning_effort,
-            enable_context_manager=enable_context_manager
+            enable_context_manager=enable_context_manager,
+            cancellation_token=cancellation_token
         )
 
         final_status = "running"
         error_message = None
 
+        # After STOP the token winds the generator down promptly; keep draining it so
+        # the partial assistant message and cancelled tool results are recorded
         async for response in agent_gen:
-            if stop_signal_received:
-                logger.info(f"Agent run {agent_run_id} stopped by signal.")
-                final_status = "stopped"
-                break
-
             # Store response in Redis list and publish notification
             response_json = json.dumps(response)
             await redis.rpush(response_list_key, response_json)
@@ -764,6 +785,10 @@ async def run_agent_background(
                          error_message = response.get('message', f"Run ended with status: {status_val}")
                      break
 
+        if stop_signal_received:
+            logger.info(f"Agent run {agent_run_id} stopped by signal.")
+            final_status = "stopped"
+
         # If loop finished without explicit completion/error/stop signal, mark as completed
         if final_status == "running":
              final_status = "completed"
@@ -958,50 +983,24 @@ async def initiate_agent_with_files(
         if files:
             successful_uploads = []
             failed_uploads = []
+            uploads = []
             for file in files:
                 if file.filename:
-                    try:
-                        safe_filename = file.filename.replace('/', '_').replace('\\', '_')
-                        target_path = f"/workspace/{safe_filename}"
-                        logger.info(f"Attempting to upload {safe_filename} to {target_path} in sandbox {sandbox_id}")
-                        content = await file.read()
-                        upload_successful = False
-                        try:
-                            if hasattr(sandbox, 'fs') and hasattr(sandbox.fs, 'upload_file'):
-                                import inspect
-                                if inspect.iscoroutinefunction(sandbox.fs.upload_file):
-                                    await sandbox.fs.upload_file(target_path, content)
-                                else:
-                                    sandbox.fs.upload_file(target_path, content)
-                                logger.debug(f"Called sandbox.fs.upload_file for {target_path}")
-                                upload_successful = True
-                            else:
-                                raise NotImplementedError("Suitable upload method not found on sandbox object.")
-                        except Exception as upload_error:
-                            logger.error(f"Error during sandbox upload call for {safe_filename}: {str(upload_error)}", exc_info=True)
-
-                        if upload_successful:
-                            try:
-                                await asyncio.sleep(0.2)
-                                parent_dir = os.path.dirname(target_path)
-                                files_in_dir = sandbox.fs.list_files(parent_dir)
-                                file_names_in_dir = [f.name for f in files_in_dir]
-                                if safe_filename in file_names_in_dir:
-                                    successful_uploads.append(target_path)
-                                    logger.info(f"Successfully uploaded and verified file {safe_filename} to sandbox path {target_path}")
-                                else:
-                                    logger.error(f"Verification failed for {safe_filename}: File not found in {parent_dir} after upload attempt.")
-                                    failed_uploads.append(safe_filename)
-                            except Exception as verify_error:
-                                logger.error(f"Error verifying file {safe_filename} after upload: {str(verify_error)}", exc_info=True)
-                                failed_uploads.append(safe_filename)
-                        else:
-                            failed_uploads.append(safe_filename)
-                    except Exception as file_error:
-                        logger.error(f"Error processing file {file.filename}: {str(file_error)}", exc_info=True)
-                        failed_uploads.append(file.filename)
-                    finally:
-                        await file.close()
+                    safe_filename = file.filename.replace('/', '_').replace('\\', '_')
+                    uploads.append((file, f"/workspace/{safe_filename}"))
+            logger.info(f"Uploading {len(uploads)} files to sandbox {sandbox_id}")
+            try:
+                results = await SandboxUploader(sandbox, sandbox_id).upload_many(uploads)
+                for (file, target_path), result in zip(uploads, results):
+                    if result.success:
+                        successful_uploads.append(target_path)
+                        logger.info(f"Successfully uploaded and verified file {target_path} ({result.size} bytes{', unchanged' if result.skipped else ''})")
+                    else:
+                        logger.error(f"Upload failed for {os.path.basename(target_path)}: {result.error}")
+                        failed_uploads.append(os.path.basename(target_path))
+            finally:
+                for file in files:
+                    await file.close()
 
             if successful_uploads:
                 message_content += "\n\n" if message_content else ""
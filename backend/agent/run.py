@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import re
 from uuid import uuid4
 from typing import Optional
@@ -14,6 +15,7 @@ from utils.config import config
 
 from agentpress.thread_manager import ThreadManager
 from agentpress.response_processor import ProcessorConfig
+from agentpress.cancellation import CancellationToken
 from agent.tools.sb_shell_tool import SandboxShellTool
 from agent.tools.sb_files_tool import SandboxFilesTool
 from agent.tools.sb_browser_tool import SandboxBrowserTool
@@ -26,6 +28,9 @@ from agent.tools.sb_vision_tool import SandboxVisionTool
 
 load_dotenv()
 
+# Fire-and-forget tasks started by runs, referenced until they finish
+_background_tasks = set()
+
 async def run_agent(
     thread_id: str,
     project_id: str,
@@ -36,7 +41,8 @@ async def run_agent(
     model_name: str = "anthropic/claude-3-7-sonnet-latest",
     enable_thinking: Optional[bool] = False,
     reasoning_effort: Optional[str] = 'low',
-    enable_context_manager: bool = True
+    enable_context_manager: bool = True,
+    cancellation_token: Optional[CancellationToken] = None
 ):
     """Run the development agent with specified configuration."""
     print(f"🚀 Starting agent with model: {model_name}")
@@ -68,12 +74,20 @@ async def run_agent(
     thread_manager.add_tool(SandboxDeployTool, project_id=project_id, thread_manager=thread_manager)
     thread_manager.add_tool(SandboxExposeTool, project_id=project_id, thread_manager=thread_manager)
     thread_manager.add_tool(MessageTool) # we are just doing this via prompt as there is no need to call it as a tool
-    thread_manager.add_tool(WebSearchTool)
+    thread_manager.add_tool(WebSearchTool, project_id=project_id, thread_manager=thread_manager)
     thread_manager.add_tool(SandboxVisionTool, project_id=project_id, thread_id=thread_id, thread_manager=thread_manager)
+
+    # Get the shell session (reused from earlier runs when still alive) ready while the model starts
+    shell_tool = thread_manager.tool_registry.get_tool("execute_command").get("instance")
+    if shell_tool:
+        # Keep a reference, the event loop only holds tasks weakly
+        warm_task = asyncio.create_task(shell_tool.warm_session())
+        _background_tasks.add(warm_task)
+        warm_task.add_done_callback(_background_tasks.discard)
     
     # Add data providers tool if RapidAPI key is available
     if config.RAPID_API_KEY:
-        thread_manager.add_tool(DataProvidersTool)
+        thread_manager.add_tool(DataProvidersTool, project_id=project_id)
 
 
     # Only include sample response if the model name does not contain "anthropic"
@@ -90,6 +104,9 @@ async def run_agent(
     continue_execution = True
 
     while continue_execution and iteration_count < max_iterations:
+        if cancellation_token and cancellation_token.cancelled:
+            logger.info(f"Agent run on thread {thread_id} stopped")
+            break
         iteration_count += 1
         # logger.debug(f"Running iteration {iteration_count}...")
 
@@ -212,10 +229,11 @@ async def run_agent(
             include_xml_examples=True,
             enable_thinking=enable_thinking,
             reasoning_effort=reasoning_effort,
-            enable_context_manager=enable_context_manager
+            enable_context_manager=enable_context_manager,
+            cancellation_token=cancellation_token
         )
 
-        if isinstance(response, dict) and "status" in response and response["status"] == "error":
+        if isinstance(response, dict) and response.get("status") in ("error", "stopped"):
             yield response
             return
 
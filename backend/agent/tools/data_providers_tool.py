@@ -1,6 +1,7 @@
 import json
+from typing import Optional
 
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, cache_result
 from agent.tools.data_providers.LinkedinProvider import LinkedinProvider
 from agent.tools.data_providers.YahooFinanceProvider import YahooFinanceProvider
 from agent.tools.data_providers.AmazonProvider import AmazonProvider
@@ -10,8 +11,10 @@ from agent.tools.data_providers.TwitterProvider import TwitterProvider
 class DataProvidersTool(Tool):
     """Tool for making requests to various data providers."""
 
-    def __init__(self):
+    def __init__(self, project_id: Optional[str] = None):
         super().__init__()
+        # Scopes cached results to the project
+        self.project_id = project_id
 
         self.register_data_providers = {
             "linkedin": LinkedinProvider(),
@@ -81,6 +84,7 @@ Use this tool when you need to discover what endpoints are available.
                 simplified_message += "..."
             return self.fail_response(simplified_message)
 
+    @cache_result(ttl=3600)
     @openapi_schema({
         "type": "function",
         "function": {
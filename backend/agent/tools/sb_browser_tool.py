@@ -1,11 +1,18 @@
 import traceback
 import json
+import asyncio
+from typing import Optional
 
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, tool_resources
 from agentpress.thread_manager import ThreadManager
 from sandbox.sandbox import SandboxToolsBase, Sandbox
 from utils.logger import logger
 
+# Longest a batch request may take in the sandbox; the tool itself is given
+# BATCH_TOOL_TIMEOUT so the request can finish and report the failed step first
+MAX_BATCH_TIMEOUT = 300
+BATCH_TOOL_TIMEOUT = MAX_BATCH_TIMEOUT + 60
+
 
 class SandboxBrowserTool(SandboxToolsBase):
     """Tool for executing tasks in a Daytona sandbox with browser-use capabilities."""
@@ -14,13 +21,15 @@ class SandboxBrowserTool(SandboxToolsBase):
         super().__init__(project_id, thread_manager)
         self.thread_id = thread_id
 
-    async def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST") -> ToolResult:
+    async def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST", context_id: Optional[str] = None, timeout: int = 30) -> ToolResult:
         """Execute a browser automation action through the API
         
         Args:
             endpoint (str): The API endpoint to call
             params (dict, optional): Parameters to send. Defaults to None.
             method (str, optional): HTTP method to use. Defaults to "POST".
+            context_id (str, optional): Named browser context to run the action in. Defaults to the default context.
+            timeout (int, optional): Seconds to wait for the request. Defaults to 30.
             
         Returns:
             ToolResult: Result of the execution
@@ -29,6 +38,10 @@ class SandboxBrowserTool(SandboxToolsBase):
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
+            if context_id:
+                params = dict(params or {})
+                params["context_id"] = context_id
+            
             # Build the curl command
             url = f"http://localhost:8002/api/automation/{endpoint}"
             
@@ -39,13 +52,16 @@ class SandboxBrowserTool(SandboxToolsBase):
             else:
                 curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
                 if params:
-                    json_data = json.dumps(params)
+                    # Escape single quotes so text values survive the shell quoting
+                    json_data = json.dumps(params).replace("'", "'\"'\"'")
                     curl_cmd += f" -d '{json_data}'"
             
             logger.debug("\033[95mExecuting curl command:\033[0m")
             logger.debug(f"{curl_cmd}")
             
-            response = self.sandbox.process.exec(curl_cmd, timeout=30)
+            # Run the blocking exec off the event loop so parallel browser calls
+            # on different contexts actually overlap
+            response = await asyncio.to_thread(self.sandbox.process.exec, curl_cmd, timeout=timeout)
             
             if response.exit_code == 0:
                 try:
@@ -78,6 +94,8 @@ class SandboxBrowserTool(SandboxToolsBase):
                         success_response['message_id'] = added_message['message_id']
 
                     # Add relevant browser-specific info
+                    if result.get("context_id"):
+                        success_response["context_id"] = result["context_id"]
                     if result.get("url"):
                         success_response["url"] = result["url"]
                     if result.get("title"):
@@ -86,9 +104,19 @@ class SandboxBrowserTool(SandboxToolsBase):
                         success_response["elements_found"] = result["element_count"]
                     if result.get("pixels_below"):
                         success_response["scrollable_content"] = result["pixels_below"] > 0
+                    if result.get("requests_blocked"):
+                        success_response["requests_blocked"] = result["requests_blocked"]
+                        success_response["bytes_blocked"] = result.get("bytes_blocked", 0)
                     # Add OCR text when available
                     if result.get("ocr_text"):
                         success_response["ocr_text"] = result["ocr_text"]
+                    # Per-step outcomes of a batch
+                    if result.get("steps") is not None:
+                        success_response["steps"] = result["steps"]
+                        if not result.get("success", True):
+                            success_response["success"] = False
+                            success_response["error"] = result.get("error", "")
+                            return self.fail_response(json.dumps(success_response, indent=2))
 
                     return self.success_response(success_response)
 
@@ -115,6 +143,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "url": {
                         "type": "string",
                         "description": "The url to navigate to"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["url"]
@@ -124,24 +156,33 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-navigate-to",
         mappings=[
-            {"param_name": "url", "node_type": "content", "path": "."}
+            {"param_name": "url", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-navigate-to>
         https://example.com
         </browser-navigate-to>
-        '''
+
+        <!-- Use separate contexts to browse several sites in parallel -->
+        <browser-navigate-to context_id="research">
+        https://example.org
+        </browser-navigate-to>
+        ''',
+        timeout=120
     )
-    async def browser_navigate_to(self, url: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_navigate_to(self, url: str, context_id: Optional[str] = None) -> ToolResult:
         """Navigate to a specific url
         
         Args:
             url (str): The url to navigate to
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
-        return await self._execute_browser_action("navigate_to", {"url": url})
+        return await self._execute_browser_action("navigate_to", {"url": url}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -154,6 +195,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "query": {
                         "type": "string",
                         "description": "The search query to use"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["query"]
@@ -163,25 +208,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-search-google",
         mappings=[
-            {"param_name": "query", "node_type": "content", "path": "."}
+            {"param_name": "query", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-search-google>
         artificial intelligence news
         </browser-search-google>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_search_google(self, query: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_search_google(self, query: str, context_id: Optional[str] = None) -> ToolResult:
         """Search Google with the provided query
         
         Args:
             query (str): The search query to use
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mSearching Google for: {query}\033[0m")
-        return await self._execute_browser_action("search_google", {"query": query})
+        return await self._execute_browser_action("search_google", {"query": query}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -190,25 +239,37 @@ class SandboxBrowserTool(SandboxToolsBase):
             "description": "Navigate back in browser history",
             "parameters": {
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
+                    }
+                }
             }
         }
     })
     @xml_schema(
         tag_name="browser-go-back",
-        mappings=[],
+        mappings=[
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
+        ],
         example='''
         <browser-go-back></browser-go-back>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_go_back(self) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_go_back(self, context_id: Optional[str] = None) -> ToolResult:
         """Navigate back in browser history
         
+        Args:
+            context_id (str, optional): Named browser context to run the action in
+            
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mNavigating back in browser history\033[0m")
-        return await self._execute_browser_action("go_back", {})
+        return await self._execute_browser_action("go_back", {}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -221,6 +282,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "seconds": {
                         "type": "integer",
                         "description": "Number of seconds to wait (default: 3)"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 }
             }
@@ -229,25 +294,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-wait",
         mappings=[
-            {"param_name": "seconds", "node_type": "content", "path": "."}
+            {"param_name": "seconds", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-wait>
         5
         </browser-wait>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_wait(self, seconds: int = 3) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_wait(self, seconds: int = 3, context_id: Optional[str] = None) -> ToolResult:
         """Wait for the specified number of seconds
         
         Args:
             seconds (int, optional): Number of seconds to wait. Defaults to 3.
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mWaiting for {seconds} seconds\033[0m")
-        return await self._execute_browser_action("wait", {"seconds": seconds})
+        return await self._execute_browser_action("wait", {"seconds": seconds}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -260,6 +329,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "index": {
                         "type": "integer",
                         "description": "The index of the element to click"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["index"]
@@ -269,25 +342,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-click-element",
         mappings=[
-            {"param_name": "index", "node_type": "content", "path": "."}
+            {"param_name": "index", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-click-element>
         2
         </browser-click-element>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_click_element(self, index: int) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_click_element(self, index: int, context_id: Optional[str] = None) -> ToolResult:
         """Click on an element by index
         
         Args:
             index (int): The index of the element to click
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mClicking element with index: {index}\033[0m")
-        return await self._execute_browser_action("click_element", {"index": index})
+        return await self._execute_browser_action("click_element", {"index": index}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -304,6 +381,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "text": {
                         "type": "string",
                         "description": "The text to input"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["index", "text"]
@@ -314,26 +395,30 @@ class SandboxBrowserTool(SandboxToolsBase):
         tag_name="browser-input-text",
         mappings=[
             {"param_name": "index", "node_type": "attribute", "path": "."},
-            {"param_name": "text", "node_type": "content", "path": "."}
+            {"param_name": "text", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-input-text index="2">
         Hello, world!
         </browser-input-text>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_input_text(self, index: int, text: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_input_text(self, index: int, text: str, context_id: Optional[str] = None) -> ToolResult:
         """Input text into an element
         
         Args:
             index (int): The index of the element to input text into
             text (str): The text to input
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mInputting text into element {index}: {text}\033[0m")
-        return await self._execute_browser_action("input_text", {"index": index, "text": text})
+        return await self._execute_browser_action("input_text", {"index": index, "text": text}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -346,6 +431,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "keys": {
                         "type": "string",
                         "description": "The keys to send (e.g., 'Enter', 'Escape', 'Control+a')"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["keys"]
@@ -355,25 +444,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-send-keys",
         mappings=[
-            {"param_name": "keys", "node_type": "content", "path": "."}
+            {"param_name": "keys", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-send-keys>
         Enter
         </browser-send-keys>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_send_keys(self, keys: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_send_keys(self, keys: str, context_id: Optional[str] = None) -> ToolResult:
         """Send keyboard keys
         
         Args:
             keys (str): The keys to send (e.g., 'Enter', 'Escape', 'Control+a')
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mSending keys: {keys}\033[0m")
-        return await self._execute_browser_action("send_keys", {"keys": keys})
+        return await self._execute_browser_action("send_keys", {"keys": keys}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -386,6 +479,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "page_id": {
                         "type": "integer",
                         "description": "The ID of the tab to switch to"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["page_id"]
@@ -395,25 +492,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-switch-tab",
         mappings=[
-            {"param_name": "page_id", "node_type": "content", "path": "."}
+            {"param_name": "page_id", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-switch-tab>
         1
         </browser-switch-tab>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_switch_tab(self, page_id: int) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_switch_tab(self, page_id: int, context_id: Optional[str] = None) -> ToolResult:
         """Switch to a different browser tab
         
         Args:
             page_id (int): The ID of the tab to switch to
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mSwitching to tab: {page_id}\033[0m")
-        return await self._execute_browser_action("switch_tab", {"page_id": page_id})
+        return await self._execute_browser_action("switch_tab", {"page_id": page_id}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -426,6 +527,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "url": {
                         "type": "string",
                         "description": "The URL to open in the new tab"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["url"]
@@ -435,25 +540,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-open-tab",
         mappings=[
-            {"param_name": "url", "node_type": "content", "path": "."}
+            {"param_name": "url", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-open-tab>
         https://example.com
         </browser-open-tab>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_open_tab(self, url: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_open_tab(self, url: str, context_id: Optional[str] = None) -> ToolResult:
         """Open a new browser tab with the specified URL
         
         Args:
             url (str): The URL to open in the new tab
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mOpening new tab with URL: {url}\033[0m")
-        return await self._execute_browser_action("open_tab", {"url": url})
+        return await self._execute_browser_action("open_tab", {"url": url}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -466,6 +575,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "page_id": {
                         "type": "integer",
                         "description": "The ID of the tab to close"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["page_id"]
@@ -475,25 +588,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-close-tab",
         mappings=[
-            {"param_name": "page_id", "node_type": "content", "path": "."}
+            {"param_name": "page_id", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-close-tab>
         1
         </browser-close-tab>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_close_tab(self, page_id: int) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_close_tab(self, page_id: int, context_id: Optional[str] = None) -> ToolResult:
         """Close a browser tab
         
         Args:
             page_id (int): The ID of the tab to close
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mClosing tab: {page_id}\033[0m")
-        return await self._execute_browser_action("close_tab", {"page_id": page_id})
+        return await self._execute_browser_action("close_tab", {"page_id": page_id}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -506,6 +623,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "goal": {
                         "type": "string",
                         "description": "The extraction goal (e.g., 'extract all links', 'find product information')"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["goal"]
@@ -515,25 +636,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-extract-content",
         mappings=[
-            {"param_name": "goal", "node_type": "content", "path": "."}
+            {"param_name": "goal", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-extract-content>
         Extract all links on the page
         </browser-extract-content>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_extract_content(self, goal: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_extract_content(self, goal: str, context_id: Optional[str] = None) -> ToolResult:
         """Extract content from the current page based on the provided goal
         
         Args:
             goal (str): The extraction goal
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mExtracting content with goal: {goal}\033[0m")
-        result = await self._execute_browser_action("extract_content", {"goal": goal})
+        result = await self._execute_browser_action("extract_content", {"goal": goal}, context_id=context_id)
         
         # Format content for better readability
         if result.get("success"):
@@ -565,6 +690,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "amount": {
                         "type": "integer",
                         "description": "Pixel amount to scroll (if not specified, scrolls one page)"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 }
             }
@@ -573,19 +702,23 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-scroll-down",
         mappings=[
-            {"param_name": "amount", "node_type": "content", "path": "."}
+            {"param_name": "amount", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-scroll-down>
         500
         </browser-scroll-down>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_scroll_down(self, amount: int = None) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_scroll_down(self, amount: int = None, context_id: Optional[str] = None) -> ToolResult:
         """Scroll down the page
         
         Args:
             amount (int, optional): Pixel amount to scroll. If None, scrolls one page.
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
@@ -597,7 +730,7 @@ class SandboxBrowserTool(SandboxToolsBase):
         else:
             logger.debug(f"\033[95mScrolling down one page\033[0m")
         
-        return await self._execute_browser_action("scroll_down", params)
+        return await self._execute_browser_action("scroll_down", params, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -610,6 +743,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "amount": {
                         "type": "integer",
                         "description": "Pixel amount to scroll (if not specified, scrolls one page)"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 }
             }
@@ -618,19 +755,23 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-scroll-up",
         mappings=[
-            {"param_name": "amount", "node_type": "content", "path": "."}
+            {"param_name": "amount", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-scroll-up>
         500
         </browser-scroll-up>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_scroll_up(self, amount: int = None) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_scroll_up(self, amount: int = None, context_id: Optional[str] = None) -> ToolResult:
         """Scroll up the page
         
         Args:
             amount (int, optional): Pixel amount to scroll. If None, scrolls one page.
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
@@ -642,7 +783,7 @@ class SandboxBrowserTool(SandboxToolsBase):
         else:
             logger.debug(f"\033[95mScrolling up one page\033[0m")
         
-        return await self._execute_browser_action("scroll_up", params)
+        return await self._execute_browser_action("scroll_up", params, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -655,6 +796,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "text": {
                         "type": "string",
                         "description": "The text to scroll to"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["text"]
@@ -664,25 +809,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-scroll-to-text",
         mappings=[
-            {"param_name": "text", "node_type": "content", "path": "."}
+            {"param_name": "text", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-scroll-to-text>
         Contact Us
         </browser-scroll-to-text>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_scroll_to_text(self, text: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_scroll_to_text(self, text: str, context_id: Optional[str] = None) -> ToolResult:
         """Scroll to specific text on the page
         
         Args:
             text (str): The text to scroll to
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mScrolling to text: {text}\033[0m")
-        return await self._execute_browser_action("scroll_to_text", {"text": text})
+        return await self._execute_browser_action("scroll_to_text", {"text": text}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -695,6 +844,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "index": {
                         "type": "integer",
                         "description": "The index of the dropdown element"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["index"]
@@ -704,25 +857,29 @@ class SandboxBrowserTool(SandboxToolsBase):
     @xml_schema(
         tag_name="browser-get-dropdown-options",
         mappings=[
-            {"param_name": "index", "node_type": "content", "path": "."}
+            {"param_name": "index", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-get-dropdown-options>
         2
         </browser-get-dropdown-options>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_get_dropdown_options(self, index: int) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_get_dropdown_options(self, index: int, context_id: Optional[str] = None) -> ToolResult:
         """Get all options from a dropdown element
         
         Args:
             index (int): The index of the dropdown element
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution with the dropdown options
         """
         logger.debug(f"\033[95mGetting options from dropdown with index: {index}\033[0m")
-        return await self._execute_browser_action("get_dropdown_options", {"index": index})
+        return await self._execute_browser_action("get_dropdown_options", {"index": index}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -739,6 +896,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "text": {
                         "type": "string",
                         "description": "The text of the option to select"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["index", "text"]
@@ -749,26 +910,30 @@ class SandboxBrowserTool(SandboxToolsBase):
         tag_name="browser-select-dropdown-option",
         mappings=[
             {"param_name": "index", "node_type": "attribute", "path": "."},
-            {"param_name": "text", "node_type": "content", "path": "."}
+            {"param_name": "text", "node_type": "content", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-select-dropdown-option index="2">
         Option 1
         </browser-select-dropdown-option>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_select_dropdown_option(self, index: int, text: str) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_select_dropdown_option(self, index: int, text: str, context_id: Optional[str] = None) -> ToolResult:
         """Select an option from a dropdown by text
         
         Args:
             index (int): The index of the dropdown element
             text (str): The text of the option to select
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mSelecting option '{text}' from dropdown with index: {index}\033[0m")
-        return await self._execute_browser_action("select_dropdown_option", {"index": index, "text": text})
+        return await self._execute_browser_action("select_dropdown_option", {"index": index, "text": text}, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -801,6 +966,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "coord_target_y": {
                         "type": "integer",
                         "description": "The target Y coordinate"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 }
             }
@@ -814,15 +983,18 @@ class SandboxBrowserTool(SandboxToolsBase):
             {"param_name": "coord_source_x", "node_type": "attribute", "path": "."},
             {"param_name": "coord_source_y", "node_type": "attribute", "path": "."},
             {"param_name": "coord_target_x", "node_type": "attribute", "path": "."},
-            {"param_name": "coord_target_y", "node_type": "attribute", "path": "."}
+            {"param_name": "coord_target_y", "node_type": "attribute", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-drag-drop element_source="#draggable" element_target="#droppable"></browser-drag-drop>
-        '''
+        ''',
+        timeout=120
     )
+    @tool_resources(writes=["browser:{context_id}"])
     async def browser_drag_drop(self, element_source: str = None, element_target: str = None, 
                                coord_source_x: int = None, coord_source_y: int = None,
-                               coord_target_x: int = None, coord_target_y: int = None) -> ToolResult:
+                               coord_target_x: int = None, coord_target_y: int = None, context_id: Optional[str] = None) -> ToolResult:
         """Perform drag and drop operation between elements or coordinates
         
         Args:
@@ -832,6 +1004,7 @@ class SandboxBrowserTool(SandboxToolsBase):
             coord_source_y (int, optional): The source Y coordinate
             coord_target_x (int, optional): The target X coordinate
             coord_target_y (int, optional): The target Y coordinate
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
@@ -851,7 +1024,7 @@ class SandboxBrowserTool(SandboxToolsBase):
         else:
             return self.fail_response("Must provide either element selectors or coordinates for drag and drop")
         
-        return await self._execute_browser_action("drag_drop", params)
+        return await self._execute_browser_action("drag_drop", params, context_id=context_id)
 
     @openapi_schema({
         "type": "function",
@@ -868,6 +1041,10 @@ class SandboxBrowserTool(SandboxToolsBase):
                     "y": {
                         "type": "integer",
                         "description": "The Y coordinate to click"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
                     }
                 },
                 "required": ["x", "y"]
@@ -878,21 +1055,161 @@ class SandboxBrowserTool(SandboxToolsBase):
         tag_name="browser-click-coordinates",
         mappings=[
             {"param_name": "x", "node_type": "attribute", "path": "."},
-            {"param_name": "y", "node_type": "attribute", "path": "."}
+            {"param_name": "y", "node_type": "attribute", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <browser-click-coordinates x="100" y="200"></browser-click-coordinates>
-        '''
+        ''',
+        timeout=120
     )
-    async def browser_click_coordinates(self, x: int, y: int) -> ToolResult:
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_click_coordinates(self, x: int, y: int, context_id: Optional[str] = None) -> ToolResult:
         """Click at specific X,Y coordinates on the page
         
         Args:
             x (int): The X coordinate to click
             y (int): The Y coordinate to click
+            context_id (str, optional): Named browser context to run the action in
             
         Returns:
             dict: Result of the execution
         """
         logger.debug(f"\033[95mClicking at coordinates: ({x}, {y})\033[0m")
-        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y})
\ No newline at end of file
+        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y}, context_id=context_id)
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "browser_batch",
+            "description": "Run a sequence of browser actions in one call. Browser state (screenshot, elements, OCR) is captured only once after the last action, plus after any step marked as a checkpoint, which is much faster than calling each action separately. Use it for predictable sequences such as filling a form and submitting it.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "actions": {
+                        "type": "array",
+                        "description": "Steps to run in order. Each step names an action (navigate_to, search_google, go_back, wait, click_element, click_coordinates, input_text, send_keys, switch_tab, open_tab, close_tab, extract_content, scroll_down, scroll_up, scroll_to_text, get_dropdown_options, select_dropdown_option, drag_drop) and its parameters, e.g. {\"action\": \"input_text\", \"params\": {\"index\": 2, \"text\": \"hello\"}}. Set \"checkpoint\": true on a step to capture the page state after it.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "action": {"type": "string"},
+                                "params": {"type": "object"},
+                                "checkpoint": {"type": "boolean"}
+                            },
+                            "required": ["action"]
+                        }
+                    },
+                    "abort_on_failure": {
+                        "type": "boolean",
+                        "description": "Stop at the first failed step (default: true)"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to run the action in. Each context has its own isolated tabs, so use distinct ids to work on several sites in parallel. Omit to use the default context."
+                    }
+                },
+                "required": ["actions"]
+            }
+        }
+    }, timeout=BATCH_TOOL_TIMEOUT)
+    @xml_schema(
+        tag_name="browser-batch",
+        mappings=[
+            {"param_name": "actions", "node_type": "content", "path": "."},
+            {"param_name": "abort_on_failure", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <browser-batch>
+        [
+            {"action": "input_text", "params": {"index": 2, "text": "jane@example.com"}},
+            {"action": "input_text", "params": {"index": 3, "text": "hunter2"}},
+            {"action": "click_element", "params": {"index": 4}, "checkpoint": true},
+            {"action": "wait", "params": {"seconds": 2}}
+        ]
+        </browser-batch>
+        ''',
+        timeout=BATCH_TOOL_TIMEOUT
+    )
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_batch(self, actions: list | str, abort_on_failure: bool | str = True, context_id: Optional[str] = None) -> ToolResult:
+        """Run a sequence of browser actions, capturing state only at the end and at checkpoints
+        
+        Args:
+            actions (list or str): Steps to run, as a list or a JSON array of {action, params, checkpoint}
+            abort_on_failure (bool, optional): Stop at the first failed step. Defaults to True.
+            context_id (str, optional): Named browser context to run the action in
+            
+        Returns:
+            dict: Result of the execution
+        """
+        if isinstance(actions, str):
+            try:
+                actions = json.loads(actions)
+            except json.JSONDecodeError as e:
+                return self.fail_response(f"actions must be a JSON array of steps: {e}")
+        if not isinstance(actions, list) or not actions:
+            return self.fail_response("actions must be a non-empty list of steps")
+        for step in actions:
+            if not isinstance(step, dict) or not step.get("action"):
+                return self.fail_response(f"Each step needs an 'action' name, got: {step}")
+        
+        if isinstance(abort_on_failure, str):
+            abort_on_failure = abort_on_failure.strip().lower() not in ("false", "0", "no")
+        
+        logger.debug(f"\033[95mRunning browser batch of {len(actions)} actions\033[0m")
+        # Allow extra time per step, the batch runs as a single request
+        timeout = min(MAX_BATCH_TIMEOUT, 30 + 10 * len(actions))
+        return await self._execute_browser_action(
+            "batch",
+            {"actions": actions, "abort_on_failure": abort_on_failure},
+            context_id=context_id,
+            timeout=timeout
+        )
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "browser_set_interception_profile",
+            "description": "Choose which requests a browser context blocks. New contexts load everything ('full'). Use 'no-media' to skip images, video, fonts, ads and trackers, or 'text-only' to also skip stylesheets, for faster text-only reading. Screenshots reflect what was blocked, so switch back to 'full' when the page needs to look right.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "profile": {
+                        "type": "string",
+                        "enum": ["full", "no-media", "text-only"],
+                        "description": "The interception profile to apply"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Optional named browser context to apply the profile to. Omit to use the default context."
+                    }
+                },
+                "required": ["profile"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="browser-set-interception-profile",
+        mappings=[
+            {"param_name": "profile", "node_type": "attribute", "path": "."},
+            {"param_name": "context_id", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <browser-set-interception-profile profile="no-media"></browser-set-interception-profile>
+        ''',
+        timeout=60
+    )
+    @tool_resources(writes=["browser:{context_id}"])
+    async def browser_set_interception_profile(self, profile: str, context_id: Optional[str] = None) -> ToolResult:
+        """Set the request interception profile of a browser context
+        
+        Args:
+            profile (str): One of 'full', 'no-media' or 'text-only'
+            context_id (str, optional): Named browser context to apply the profile to
+            
+        Returns:
+            dict: Result of the execution
+        """
+        logger.debug(f"\033[95mSetting browser interception profile to {profile}\033[0m")
+        return await self._execute_browser_action("set_interception_profile", {"profile": profile}, context_id=context_id)
@@ -1,13 +1,26 @@
 import os
+import shlex
+import uuid
 from dotenv import load_dotenv
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, tool_resources
 from sandbox.sandbox import SandboxToolsBase, Sandbox
-from utils.files_utils import clean_path
+from utils.files_utils import PathMatcher, clean_path
 from agentpress.thread_manager import ThreadManager
 
 # Load environment variables
 load_dotenv()
 
+# Never published with a site. Images and build output are the site itself, so
+# the workspace excludes are too broad here.
+DEPLOY_EXCLUDES = PathMatcher([
+    ".git/",
+    "node_modules/",
+    ".DS_Store",
+    ".env",
+    ".env.*",
+    "*.log"
+])
+
 class SandboxDeployTool(SandboxToolsBase):
     """Tool for deploying static websites from a Daytona sandbox to Cloudflare Pages."""
 
@@ -60,6 +73,7 @@ class SandboxDeployTool(SandboxToolsBase):
         </deploy>
         '''
     )
+    @tool_resources(reads=["path:{directory_path}"])
     async def deploy(self, name: str, directory_path: str) -> ToolResult:
         """
         Deploy a static website (HTML+CSS+JS) from the sandbox to Cloudflare Pages.
@@ -97,13 +111,23 @@ class SandboxDeployTool(SandboxToolsBase):
                     
                 # Single command that creates the project if it doesn't exist and then deploys
                 project_name = f"{self.sandbox_id}-{name}"
-                deploy_cmd = f'''cd {self.workspace_path} && export CLOUDFLARE_API_TOKEN={self.cloudflare_api_token} && 
-                    (npx wrangler pages deploy {full_path} --project-name {project_name} || 
+                # Copy the site without excluded paths into a staging directory; find prunes
+                # excluded directories so node_modules and .git are never traversed
+                staging_path = f"/tmp/deploy-{uuid.uuid4().hex[:12]}"
+                stage_cmd = (
+                    f"mkdir -p {staging_path} && cd {full_path} && "
+                    f"find . -mindepth 1 {DEPLOY_EXCLUDES.find_prune()} -prune -o "
+                    f"! -type d {DEPLOY_EXCLUDES.find_file_filter()} -print0 "
+                    f"| tar --null --no-recursion -T - -cf - | tar -C {staging_path} -xf -"
+                )
+                deploy_cmd = f'''{stage_cmd} && cd {self.workspace_path} && export CLOUDFLARE_API_TOKEN={self.cloudflare_api_token} && 
+                    (npx wrangler pages deploy {staging_path} --project-name {project_name} || 
                     (npx wrangler pages project create {project_name} --production-branch production && 
-                    npx wrangler pages deploy {full_path} --project-name {project_name}))'''
+                    npx wrangler pages deploy {staging_path} --project-name {project_name})); 
+                    status=$?; rm -rf {staging_path}; exit $status'''
 
                 # Execute the command directly using the sandbox's process.exec method
-                response = self.sandbox.process.exec(deploy_cmd, timeout=300)
+                response = self.sandbox.process.exec(f"/bin/sh -c {shlex.quote(deploy_cmd)}", timeout=300)
                 
                 print(f"Deployment command output: {response.result}")
                 
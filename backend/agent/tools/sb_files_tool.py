@@ -1,12 +1,50 @@
 from daytona_sdk.process import SessionExecuteRequest
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, tool_resources
 from sandbox.sandbox import SandboxToolsBase, Sandbox, get_or_start_sandbox
-from utils.files_utils import EXCLUDED_FILES, EXCLUDED_DIRS, EXCLUDED_EXT, should_exclude_file, clean_path
+from sandbox.manifest import WorkspaceManifest, get_workspace_manifest
+from utils.files_utils import EXCLUDED_DIRS, EXCLUDED_EXT, WORKSPACE_EXCLUDES, clean_path
 from agentpress.thread_manager import ThreadManager
 from utils.logger import logger
+import asyncio
+import hashlib
+import io
+import json
 import os
+import re
+import shlex
+import tarfile
+import textwrap
+import uuid
+
+# Files larger than this are left out of workspace snapshots
+SNAPSHOT_MAX_FILE_SIZE_KB = 1024
+
+# Upper bound on the text returned by a single read_file call. Kept well under the
+# response processor's tool output budget (max_tool_output_chars, 20000 by default)
+# so a read, JSON-escaped, is never shortened and spilled to another file
+MAX_READ_BYTES = 12_000
+
+# Search results returned per page and the most a caller may ask for
+DEFAULT_SEARCH_RESULTS = 50
+MAX_SEARCH_RESULTS = 200
+MAX_SEARCH_CONTEXT_LINES = 10
+
+# Line counts of a unified diff hunk header, e.g. "@@ -10,3 +10,4 @@"
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+
+def _load_helper(name: str):
+    with open(os.path.join(os.path.dirname(__file__), "..", "..", "sandbox", "docker", name), "rb") as f:
+        source = f.read()
+    stem = os.path.splitext(name)[0]
+    return source, f"/tmp/{stem}_{hashlib.sha256(source).hexdigest()[:12]}.py"
+
+# Helpers that run inside the sandbox, installed on first use. The path
+# carries the source hash so sandboxes pick up new versions.
+EDIT_HELPER_SOURCE, EDIT_HELPER_PATH = _load_helper("edit_helper.py")
+SEARCH_HELPER_SOURCE, SEARCH_HELPER_PATH = _load_helper("search_helper.py")
+_helpers_installed = set()  # (sandbox_id, helper_path)
 
 class SandboxFilesTool(SandboxToolsBase):
     """Tool for executing file system operations in a Daytona sandbox. All operations are performed relative to the /workspace directory."""
@@ -20,48 +58,146 @@ class SandboxFilesTool(SandboxToolsBase):
         """Clean and normalize a path to be relative to /workspace"""
         return clean_path(path, self.workspace_path)
 
-    def _should_exclude_file(self, rel_path: str) -> bool:
-        """Check if a file should be excluded based on path, name, or extension"""
-        return should_exclude_file(rel_path)
+    def _should_exclude_file(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check if a path should be excluded based on its segments, name, or extension"""
+        return WORKSPACE_EXCLUDES.excludes(rel_path, is_dir)
+
+    async def _get_manifest(self) -> Optional[WorkspaceManifest]:
+        """Get the workspace manifest for this sandbox, refreshed if it is stale"""
+        manifest = get_workspace_manifest(self.sandbox_id, self.workspace_path)
+        try:
+            await manifest.ensure_fresh(self.sandbox)
+        except Exception as e:
+            logger.warning(f"Could not refresh workspace manifest, using the sandbox directly: {e}")
+            return None
+        return manifest
+
+    async def _file_exists(self, path: str) -> bool:
+        """Check if a file exists in the sandbox.
 
-    def _file_exists(self, path: str) -> bool:
-        """Check if a file exists in the sandbox"""
+        Always asks the sandbox: other workers, background jobs and the frontend
+        change files without updating this process's manifest, which is only used
+        for listings.
+        """
         try:
-            self.sandbox.fs.get_file_info(path)
+            await asyncio.to_thread(self.sandbox.fs.get_file_info, path)
             return True
         except Exception:
             return False
 
-    async def get_workspace_state(self) -> dict:
-        """Get the current workspace state by reading all files"""
+    def _mark_workspace_stale(self) -> None:
+        """Force a manifest refresh after operations that change files behind the tool's back"""
+        get_workspace_manifest(self.sandbox_id, self.workspace_path).mark_stale()
+
+    def _snapshot_command(self, archive_path: str) -> str:
+        """Shell command that tars the pruned workspace tree into archive_path"""
+        return (
+            f"cd {self.workspace_path} && "
+            f"find . -mindepth 1 {WORKSPACE_EXCLUDES.find_prune()} -prune -o "
+            f"-type f {WORKSPACE_EXCLUDES.find_file_filter()} -size -{SNAPSHOT_MAX_FILE_SIZE_KB}k -print0 "
+            f"| tar --null --no-recursion -T - -czf {archive_path}"
+        )
+
+    async def _get_workspace_snapshot(self) -> Dict[str, dict]:
+        """Read the whole pruned workspace tree with one tar exec and one download"""
+        archive_path = f"/tmp/workspace_snapshot_{uuid.uuid4().hex}.tar.gz"
+        try:
+            response = await asyncio.to_thread(
+                self.sandbox.process.exec,
+                f"/bin/sh -c {shlex.quote(self._snapshot_command(archive_path))}",
+                timeout=120
+            )
+            if response.exit_code != 0:
+                raise RuntimeError(f"Snapshot command failed: {response.result}")
+            archive = await asyncio.to_thread(self.sandbox.fs.download_file, archive_path)
+        finally:
+            try:
+                await asyncio.to_thread(self.sandbox.process.exec, f"rm -f {archive_path}", timeout=30)
+            except Exception as e:
+                logger.warning(f"Failed to remove workspace snapshot {archive_path}: {e}")
+
         files_state = {}
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                rel_path = member.name[2:] if member.name.startswith("./") else member.name
+                data = tar.extractfile(member).read()
+                try:
+                    content = data.decode()
+                except UnicodeDecodeError:
+                    print(f"Skipping binary file: {rel_path}")
+                    continue
+                files_state[rel_path] = {
+                    "content": content,
+                    "is_dir": False,
+                    "size": member.size,
+                    "modified": member.mtime,
+                    "hash": hashlib.sha256(data).hexdigest()
+                }
+        return files_state
+
+    async def _get_workspace_listing(self) -> Dict[str, dict]:
+        """Read top-level workspace files one download at a time"""
+        files_state = {}
+        files = await asyncio.to_thread(self.sandbox.fs.list_files, self.workspace_path)
+        for file_info in files:
+            rel_path = file_info.name
+            
+            # Skip excluded files and directories
+            if file_info.is_dir or self._should_exclude_file(rel_path):
+                continue
+
+            try:
+                full_path = f"{self.workspace_path}/{rel_path}"
+                data = await asyncio.to_thread(self.sandbox.fs.download_file, full_path)
+                files_state[rel_path] = {
+                    "content": data.decode(),
+                    "is_dir": file_info.is_dir,
+                    "size": file_info.size,
+                    "modified": file_info.mod_time,
+                    "hash": hashlib.sha256(data).hexdigest()
+                }
+            except UnicodeDecodeError:
+                print(f"Skipping binary file: {rel_path}")
+            except Exception as e:
+                print(f"Error reading file {rel_path}: {e}")
+        return files_state
+
+    async def get_workspace_state(self, previous_hashes: Optional[Dict[str, str]] = None, snapshot: bool = True) -> dict:
+        """Get the current workspace state by reading all files
+        
+        Args:
+            previous_hashes: Map of path to content hash from an earlier call. When
+                given, only new and changed files are returned and deleted paths are
+                marked with {"deleted": True}.
+            snapshot: Read the whole tree in one tar exec instead of listing and
+                downloading top-level files one by one.
+        """
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            files = self.sandbox.fs.list_files(self.workspace_path)
-            for file_info in files:
-                rel_path = file_info.name
-                
-                # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
-                    continue
-
+            files_state = None
+            if snapshot:
                 try:
-                    full_path = f"{self.workspace_path}/{rel_path}"
-                    content = self.sandbox.fs.download_file(full_path).decode()
-                    files_state[rel_path] = {
-                        "content": content,
-                        "is_dir": file_info.is_dir,
-                        "size": file_info.size,
-                        "modified": file_info.mod_time
-                    }
+                    files_state = await self._get_workspace_snapshot()
                 except Exception as e:
-                    print(f"Error reading file {rel_path}: {e}")
-                except UnicodeDecodeError:
-                    print(f"Skipping binary file: {rel_path}")
+                    logger.warning(f"Workspace snapshot failed, falling back to file listing: {e}")
+            if files_state is None:
+                files_state = await self._get_workspace_listing()
 
-            return files_state
+            if previous_hashes is None:
+                return files_state
+
+            changed = {
+                path: state for path, state in files_state.items()
+                if previous_hashes.get(path) != state["hash"]
+            }
+            for path in previous_hashes:
+                if path not in files_state:
+                    changed[path] = {"deleted": True}
+            return changed
         
         except Exception as e:
             print(f"Error getting workspace state: {str(e)}")
@@ -112,6 +248,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </create-file>
         '''
     )
+    @tool_resources(writes=["path:{file_path}"])
     async def create_file(self, file_path: str, file_contents: str, permissions: str = "644") -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -119,7 +256,7 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if self._file_exists(full_path):
+            if await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' already exists. Use update_file to modify existing files.")
             
             # Create parent directories if needed
@@ -128,8 +265,10 @@ class SandboxFilesTool(SandboxToolsBase):
                 self.sandbox.fs.create_folder(parent_dir, "755")
             
             # Write the file content
-            self.sandbox.fs.upload_file(full_path, file_contents.encode())
+            data = file_contents.encode()
+            self.sandbox.fs.upload_file(full_path, data)
             self.sandbox.fs.set_file_permissions(full_path, permissions)
+            get_workspace_manifest(self.sandbox_id, self.workspace_path).record_write(file_path, data)
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
@@ -180,6 +319,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </str-replace>
         '''
     )
+    @tool_resources(writes=["path:{file_path}"])
     async def str_replace(self, file_path: str, old_str: str, new_str: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -187,33 +327,23 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist")
             
-            content = self.sandbox.fs.download_file(full_path).decode()
             old_str = old_str.expandtabs()
             new_str = new_str.expandtabs()
             
-            occurrences = content.count(old_str)
-            if occurrences == 0:
-                return self.fail_response(f"String '{old_str}' not found in file")
-            if occurrences > 1:
-                lines = [i+1 for i, line in enumerate(content.split('\n')) if old_str in line]
-                return self.fail_response(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
-            
-            # Perform replacement
-            new_content = content.replace(old_str, new_str)
-            self.sandbox.fs.upload_file(full_path, new_content.encode())
+            # Only the strings are sent, the helper edits the file in place
+            result = await self._apply_edits({file_path: [{"old_str": old_str, "new_str": new_str}]})
+            if not result["success"]:
+                errors = result.get("errors") or []
+                return self.fail_response(errors[0]["message"] if errors else result["error"])
             
-            # Show snippet around the edit
-            replacement_line = content.split(old_str)[0].count('\n')
-            start_line = max(0, replacement_line - self.SNIPPET_LINES)
-            end_line = replacement_line + self.SNIPPET_LINES + new_str.count('\n')
-            snippet = '\n'.join(new_content.split('\n')[start_line:end_line + 1])
+            edit = result["files"][0]["edits"][0]
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
-            message = f"Replacement successful."
+            message = f"Replacement successful (lines {edit['start_line']}-{edit['end_line']})."
             # if preview_url:
             #     message += f"\n\nYou can preview this HTML file at: {preview_url}"
             
@@ -222,6 +352,197 @@ class SandboxFilesTool(SandboxToolsBase):
         except Exception as e:
             return self.fail_response(f"Error replacing string: {str(e)}")
 
+    async def _run_helper(self, helper_path: str, helper_source: bytes, args: str, timeout: int = 60):
+        """Run a helper script in the sandbox, installing it first if needed
+        
+        /tmp is wiped when a sandbox restarts, so a failed run reinstalls the
+        helper and retries once.
+        """
+        key = (self.sandbox_id, helper_path)
+        for attempt in range(2):
+            if key not in _helpers_installed:
+                await asyncio.to_thread(self.sandbox.fs.upload_file, helper_path, helper_source)
+                _helpers_installed.add(key)
+            response = await asyncio.to_thread(
+                self.sandbox.process.exec,
+                f"python3 {helper_path} {args}",
+                timeout=timeout
+            )
+            if response.exit_code == 0:
+                break
+            _helpers_installed.discard(key)
+        return response
+
+    async def _apply_edits(self, files: Dict[str, List[dict]]) -> dict:
+        """Apply edits atomically with the in-sandbox helper
+        
+        Args:
+            files: Map of workspace-relative path to a list of edits, each either
+                {"old_str", "new_str"} or {"diff"} with a single-file unified diff
+        
+        Returns:
+            The helper's result: {"success", "files": [{"path", "edits", ...}]}, or on
+            failure {"success", "error", "errors": [{"path", "edit", "message"}]}
+        """
+        request_path = f"/tmp/edit_request_{uuid.uuid4().hex}.json"
+        request = {
+            "files": [
+                {"path": f"{self.workspace_path}/{path}", "edits": edits}
+                for path, edits in files.items()
+            ]
+        }
+        await asyncio.to_thread(self.sandbox.fs.upload_file, request_path, json.dumps(request).encode())
+        
+        response = await self._run_helper(EDIT_HELPER_PATH, EDIT_HELPER_SOURCE, request_path)
+        if response.exit_code != 0:
+            raise RuntimeError(f"Edit helper failed: {response.result}")
+        
+        result = json.loads(response.result.strip().splitlines()[-1])
+        if result["success"]:
+            manifest = get_workspace_manifest(self.sandbox_id, self.workspace_path)
+            for file_result in result["files"]:
+                file_result["path"] = self.clean_path(file_result["path"])
+                manifest.record_file(file_result["path"], file_result["size"], file_result["hash"])
+        return result
+
+    def _split_unified_diff(self, diff: str) -> Dict[str, str]:
+        """Split a multi-file unified diff into one diff per workspace-relative path
+        
+        A '--- ' line followed by a '+++ ' line is a file header only between hunks,
+        as counted from the '@@ -a,b +c,d @@' line, so removed or added lines that
+        start with '--' or '++' stay part of their hunk. A header pair followed by
+        '@@' is taken as a header even inside a hunk, in case its counts are off.
+        """
+        lines = textwrap.dedent(diff).splitlines()
+        files: Dict[str, List[str]] = {}
+        current = None
+        old_remaining = new_remaining = 0
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            in_hunk = old_remaining > 0 or new_remaining > 0
+            is_header = (
+                line.startswith("--- ") and index + 1 < len(lines) and lines[index + 1].startswith("+++ ")
+                and (not in_hunk or (index + 2 < len(lines) and lines[index + 2].startswith("@@")))
+            )
+            if is_header:
+                path = lines[index + 1][4:].split("\t")[0].strip()
+                if path == "/dev/null":
+                    raise ValueError("Deleting files with a diff is not supported. Use delete_file instead.")
+                if path.startswith("b/"):
+                    path = path[2:]
+                current = self.clean_path(path)
+                files.setdefault(current, [])
+                old_remaining = new_remaining = 0
+                index += 2
+                continue
+            index += 1
+            if current is None:
+                if line.strip():
+                    raise ValueError("Diff must start with '--- a/<path>' and '+++ b/<path>' headers")
+                continue
+            files[current].append(line)
+            match = HUNK_HEADER.match(line)
+            if match:
+                old_remaining = int(match.group(1)) if match.group(1) is not None else 1
+                new_remaining = int(match.group(2)) if match.group(2) is not None else 1
+            elif line.startswith("-"):
+                old_remaining -= 1
+            elif line.startswith("+"):
+                new_remaining -= 1
+            elif not line.startswith("\\"):
+                old_remaining -= 1
+                new_remaining -= 1
+        return {path: "\n".join(lines) for path, lines in files.items()}
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "edit_files",
+            "description": "Apply several edits across one or more existing files in a single atomic step: either every edit applies or none does. Edits are given as exact search/replace pairs, as a unified diff, or both. File paths must be relative to /workspace. Returns the line range of every edit. Prefer this over several str_replace calls.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "edits": {
+                        "type": "array",
+                        "description": "Search/replace edits, applied in order. Each old_str must appear exactly once in its file at the time it is applied.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "file_path": {"type": "string", "description": "Path to the file, relative to /workspace"},
+                                "old_str": {"type": "string", "description": "Text to be replaced"},
+                                "new_str": {"type": "string", "description": "Replacement text"}
+                            },
+                            "required": ["file_path", "old_str", "new_str"]
+                        }
+                    },
+                    "diff": {
+                        "type": "string",
+                        "description": "Unified diff covering one or more files, with '--- a/<path>' and '+++ b/<path>' headers and '@@' hunks. Hunks are matched by their context lines, so line numbers may be approximate."
+                    }
+                }
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="edit-files",
+        mappings=[
+            {"param_name": "diff", "node_type": "content", "path": "."}
+        ],
+        example='''
+        <edit-files>
+--- a/src/main.py
++++ b/src/main.py
+@@ -10,3 +10,3 @@
+ def greet(name):
+-    print("Hello " + name)
++    print(f"Hello {name}!")
+ 
+--- a/README.md
++++ b/README.md
+@@ -1,2 +1,2 @@
+-# Old Title
++# New Title
+ 
+        </edit-files>
+        '''
+    )
+    @tool_resources(writes=["path"])
+    async def edit_files(self, edits: Optional[Union[List[dict], str]] = None, diff: Optional[str] = None) -> ToolResult:
+        try:
+            # Ensure sandbox is initialized
+            await self._ensure_sandbox()
+            
+            if isinstance(edits, str):
+                edits = json.loads(edits)
+            if not edits and not diff:
+                return self.fail_response("Provide edits, a diff, or both.")
+            
+            files: Dict[str, List[dict]] = {}
+            for edit in edits or []:
+                if not all(key in edit for key in ("file_path", "old_str", "new_str")):
+                    return self.fail_response(f"Each edit needs file_path, old_str and new_str: {edit}")
+                files.setdefault(self.clean_path(edit["file_path"]), []).append({
+                    "old_str": edit["old_str"].expandtabs(),
+                    "new_str": edit["new_str"].expandtabs()
+                })
+            if diff:
+                for path, file_diff in self._split_unified_diff(diff).items():
+                    files.setdefault(path, []).append({"diff": file_diff})
+            
+            result = await self._apply_edits(files)
+            if not result["success"]:
+                return self.fail_response(f"No files were changed. {result['error']}")
+            
+            summary = []
+            for file_result in result["files"]:
+                ranges = ", ".join(f"{e['start_line']}-{e['end_line']}" for e in file_result["edits"])
+                summary.append(f"{file_result['path']} (lines {ranges})")
+            return self.success_response(f"Applied {sum(len(f['edits']) for f in result['files'])} edits: " + "; ".join(summary))
+        
+        except Exception as e:
+            return self.fail_response(f"Error editing files: {str(e)}")
+
     @openapi_schema({
         "type": "function",
         "function": {
@@ -263,6 +584,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </full-file-rewrite>
         '''
     )
+    @tool_resources(writes=["path:{file_path}"])
     async def full_file_rewrite(self, file_path: str, file_contents: str, permissions: str = "644") -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -270,11 +592,13 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
             
-            self.sandbox.fs.upload_file(full_path, file_contents.encode())
+            data = file_contents.encode()
+            self.sandbox.fs.upload_file(full_path, data)
             self.sandbox.fs.set_file_permissions(full_path, permissions)
+            get_workspace_manifest(self.sandbox_id, self.workspace_path).record_write(file_path, data)
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
@@ -313,6 +637,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </delete-file>
         '''
     )
+    @tool_resources(writes=["path:{file_path}"])
     async def delete_file(self, file_path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -320,10 +645,11 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"File '{file_path}' does not exist")
             
             self.sandbox.fs.delete_file(full_path)
+            get_workspace_manifest(self.sandbox_id, self.workspace_path).record_delete(file_path)
             return self.success_response(f"File '{file_path}' deleted successfully.")
         except Exception as e:
             return self.fail_response(f"Error deleting file: {str(e)}")
@@ -354,6 +680,7 @@ class SandboxFilesTool(SandboxToolsBase):
         <create-folder folder_path="src">
         '''
     )
+    @tool_resources(writes=["path:{folder_path}"])
     async def create_folder(self, folder_path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -361,10 +688,11 @@ class SandboxFilesTool(SandboxToolsBase):
             
             folder_path = self.clean_path(folder_path)
             full_path = f"{self.workspace_path}/{folder_path}"
-            if self._file_exists(full_path):
+            if await self._file_exists(full_path):
                 return self.fail_response(f"Folder '{folder_path}' already exists")
             
             self.sandbox.fs.create_folder(full_path)
+            get_workspace_manifest(self.sandbox_id, self.workspace_path).record_folder(folder_path)
             return self.success_response(f"Folder '{folder_path}' created successfully.")
         except Exception as e:
             return self.fail_response(f"Error creating folder: {str(e)}")
@@ -395,6 +723,7 @@ class SandboxFilesTool(SandboxToolsBase):
         <delete-folder folder_path="src">
         '''
     )
+    @tool_resources(writes=["path:{folder_path}"])
     async def delete_folder(self, folder_path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -402,10 +731,11 @@ class SandboxFilesTool(SandboxToolsBase):
 
             folder_path = self.clean_path(folder_path)
             full_path = f"{self.workspace_path}/{folder_path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"Folder '{folder_path}' does not exist")
             
             self.sandbox.fs.delete_folder(full_path)
+            get_workspace_manifest(self.sandbox_id, self.workspace_path).record_delete(folder_path)
             return self.success_response(f"Folder '{folder_path}' deleted successfully.")
         except Exception as e:
             return self.fail_response(f"Error deleting folder: {str(e)}")
@@ -436,6 +766,7 @@ class SandboxFilesTool(SandboxToolsBase):
         <list-files path="src">
         '''
     )
+    @tool_resources(reads=["path:{path}"])
     async def list_files(self, path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -443,13 +774,138 @@ class SandboxFilesTool(SandboxToolsBase):
             
             path = self.clean_path(path)
             full_path = f"{self.workspace_path}/{path}"
-            if not self._file_exists(full_path):
+            if not await self._file_exists(full_path):
                 return self.fail_response(f"Path '{path}' does not exist")
             
-            files = self.sandbox.fs.list_files(full_path)
+            manifest = await self._get_manifest()
+            entries = manifest.list_dir(path) if manifest is not None else None
+            if entries is not None:
+                files = [entry.to_dict() for entry in entries]
+            else:
+                files = await asyncio.to_thread(self.sandbox.fs.list_files, full_path)
             return self.success_response(f"Files in '{path}': {files}")
         except Exception as e:
             return self.fail_response(f"Error listing files: {str(e)}")
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "search_files",
+            "description": "Search file contents in the workspace with ripgrep. Prefer this over grep/find through execute_command: results are capped, include line numbers and surrounding context, and can be paged with a cursor. Dependency, build and binary asset files are skipped, as are files ignored by .gitignore.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "Regular expression to search for (Rust regex syntax), or a literal string when fixed_strings is true"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "File or directory to search, relative to /workspace (default: the whole workspace)",
+                        "default": "."
+                    },
+                    "include": {
+                        "type": "string",
+                        "description": "Optional comma-separated glob patterns limiting which files are searched (e.g., '*.py,*.ts')"
+                    },
+                    "fixed_strings": {
+                        "type": "boolean",
+                        "description": "Treat the pattern as a literal string instead of a regular expression",
+                        "default": False
+                    },
+                    "case_sensitive": {
+                        "type": "boolean",
+                        "description": "Match case exactly",
+                        "default": False
+                    },
+                    "context_lines": {
+                        "type": "integer",
+                        "description": "Lines of context to show before and after each match (max 10)",
+                        "default": 2
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Maximum number of matches to return (max 200)",
+                        "default": 50
+                    },
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Value of next_cursor from a previous search with the same arguments, to get the next page of matches"
+                    }
+                },
+                "required": ["pattern"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="search-files",
+        mappings=[
+            {"param_name": "pattern", "node_type": "content", "path": "."},
+            {"param_name": "path", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "include", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "fixed_strings", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "case_sensitive", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "context_lines", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "max_results", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "cursor", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <!-- Find function definitions in Python files under src -->
+        <search-files path="src" include="*.py" context_lines="2">def handle_\w+\(</search-files>
+
+        <!-- Next page of the same search -->
+        <search-files path="src" include="*.py" context_lines="2" cursor="50">def handle_\w+\(</search-files>
+        '''
+    )
+    @tool_resources(reads=["path:{path}"])
+    async def search_files(self, pattern: str, path: str = ".", include: Optional[str] = None,
+                           fixed_strings: Union[bool, str] = False, case_sensitive: Union[bool, str] = False,
+                           context_lines: int = 2, max_results: int = DEFAULT_SEARCH_RESULTS,
+                           cursor: Optional[int] = None) -> ToolResult:
+        """Search the workspace with the in-sandbox search helper
+        
+        Returns one page of matches as {"total", "files", "matches": [{"file",
+        "line", "text", "before", "after"}], "next_cursor"}.
+        """
+        try:
+            # Ensure sandbox is initialized
+            await self._ensure_sandbox()
+            
+            if not pattern:
+                return self.fail_response("A search pattern is required")
+            if isinstance(fixed_strings, str):
+                fixed_strings = fixed_strings.strip().lower() in ("true", "1", "yes")
+            if isinstance(case_sensitive, str):
+                case_sensitive = case_sensitive.strip().lower() in ("true", "1", "yes")
+            
+            path = self.clean_path(path or ".") or "."
+            request = {
+                "root": self.workspace_path,
+                "pattern": pattern,
+                "path": path,
+                "include": [glob.strip() for glob in include.split(",") if glob.strip()] if include else [],
+                "exclude_dirs": sorted(EXCLUDED_DIRS),
+                "exclude_ext": sorted(EXCLUDED_EXT),
+                "fixed_strings": fixed_strings,
+                "case_sensitive": case_sensitive,
+                "context_lines": min(max(int(context_lines), 0), MAX_SEARCH_CONTEXT_LINES),
+                "max_results": min(max(int(max_results), 1), MAX_SEARCH_RESULTS),
+                "cursor": int(cursor) if cursor is not None else 0
+            }
+            
+            response = await self._run_helper(SEARCH_HELPER_PATH, SEARCH_HELPER_SOURCE, shlex.quote(json.dumps(request)))
+            if response.exit_code != 0:
+                return self.fail_response(f"Search failed: {response.result}")
+            
+            result = json.loads(response.result.strip().splitlines()[-1])
+            if not result.pop("success"):
+                return self.fail_response(f"Search failed: {result['error']}")
+            if not result["total_capped"]:
+                del result["total_capped"]
+            
+            return self.success_response(result)
+        except Exception as e:
+            return self.fail_response(f"Error searching files: {str(e)}")
         
     @openapi_schema({
         "type": "function",
@@ -491,6 +947,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </clone-git-repo>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def clone_git_repo(self, repo_url: str, path: str, branch: str = "main") -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -498,6 +955,7 @@ class SandboxFilesTool(SandboxToolsBase):
             
             # Clone the repository
             self.sandbox.git.clone_repository(repo_url, path, branch)
+            self._mark_workspace_stale()
             return self.success_response(f"Repository cloned successfully.")
         except Exception as e:
             return self.fail_response(f"Error cloning repository: {str(e)}")
@@ -549,6 +1007,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </clone-git-repo-with-auth>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def clone_git_repo_with_auth(self, repo_url: str, path: str, auth_token: str, branch: str = "main") -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -556,6 +1015,7 @@ class SandboxFilesTool(SandboxToolsBase):
             
             # Clone the repository with authentication
             self.sandbox.git.clone_repository(repo_url, path, auth_token, branch)
+            self._mark_workspace_stale()
             return self.success_response(f"Repository cloned successfully.")
         except Exception as e:
             return self.fail_response(f"Error cloning repository: {str(e)}")
@@ -587,6 +1047,7 @@ class SandboxFilesTool(SandboxToolsBase):
         <get-repo-status path="src">
         '''
     )
+    @tool_resources(reads=["path:{path}"])
     async def get_repo_status(self, path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -632,6 +1093,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </add-file-to-repo>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def add_file_to_repo(self, path: str, file_path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -677,6 +1139,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </create-branch>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def create_branch(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -722,6 +1185,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </checkout-branch>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def checkout_branch(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -729,6 +1193,7 @@ class SandboxFilesTool(SandboxToolsBase):
 
             # Checkout the branch
             self.sandbox.git.checkout_branch(path, branch_name)
+            self._mark_workspace_stale()
             return self.success_response(f"Branch '{branch_name}' checked out successfully.")
         except Exception as e:
             return self.fail_response(f"Error checking out branch: {str(e)}")
@@ -767,6 +1232,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </commit>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def commit(self, path: str, message: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -812,6 +1278,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </push>
         '''
     )
+    @tool_resources(reads=["path:{path}"])
     async def push(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -857,6 +1324,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </pull>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def pull(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -864,6 +1332,7 @@ class SandboxFilesTool(SandboxToolsBase):
 
             # Pull the changes
             self.sandbox.git.pull(path, branch_name)
+            self._mark_workspace_stale()
             return self.success_response(f"Changes pulled successfully.")
         except Exception as e:
             return self.fail_response(f"Error pulling changes: {str(e)}")
@@ -902,6 +1371,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </merge>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def merge(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -909,6 +1379,7 @@ class SandboxFilesTool(SandboxToolsBase):
 
             # Merge the branch
             self.sandbox.git.merge(path, branch_name)
+            self._mark_workspace_stale()
             return self.success_response(f"Branch '{branch_name}' merged successfully.")
         except Exception as e:
             return self.fail_response(f"Error merging branch: {str(e)}")
@@ -941,6 +1412,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </fetch>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def fetch(self, path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -986,6 +1458,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </add>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def add(self, path: str, file_path: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -1031,6 +1504,7 @@ class SandboxFilesTool(SandboxToolsBase):
         </checkout>
         '''
     )
+    @tool_resources(writes=["path:{path}"])
     async def checkout(self, path: str, branch_name: str) -> ToolResult:
         try:
             # Ensure sandbox is initialized
@@ -1038,110 +1512,160 @@ class SandboxFilesTool(SandboxToolsBase):
 
             # Checkout the branch
             self.sandbox.git.checkout(path, branch_name)
+            self._mark_workspace_stale()
             return self.success_response(f"Branch '{branch_name}' checked out successfully.")
         except Exception as e:
             return self.fail_response(f"Error checking out branch: {str(e)}")
-        
-    
-    # @openapi_schema({
-    #     "type": "function",
-    #     "function": {
-    #         "name": "read_file",
-    #         "description": "Read and return the contents of a file. This tool is essential for verifying data, checking file contents, and analyzing information. Always use this tool to read file contents before processing or analyzing data. The file path must be relative to /workspace.",
-    #         "parameters": {
-    #             "type": "object",
-    #             "properties": {
-    #                 "file_path": {
-    #                     "type": "string",
-    #                     "description": "Path to the file to read, relative to /workspace (e.g., 'src/main.py' for /workspace/src/main.py). Must be a valid file path within the workspace."
-    #                 },
-    #                 "start_line": {
-    #                     "type": "integer",
-    #                     "description": "Optional starting line number (1-based). Use this to read specific sections of large files. If not specified, reads from the beginning of the file.",
-    #                     "default": 1
-    #                 },
-    #                 "end_line": {
-    #                     "type": "integer",
-    #                     "description": "Optional ending line number (inclusive). Use this to read specific sections of large files. If not specified, reads to the end of the file.",
-    #                     "default": None
-    #                 }
-    #             },
-    #             "required": ["file_path"]
-    #         }
-    #     }
-    # })
-    # @xml_schema(
-    #     tag_name="read-file",
-    #     mappings=[
-    #         {"param_name": "file_path", "node_type": "attribute", "path": "."},
-    #         {"param_name": "start_line", "node_type": "attribute", "path": ".", "required": False},
-    #         {"param_name": "end_line", "node_type": "attribute", "path": ".", "required": False}
-    #     ],
-    #     example='''
-    #     <!-- Example 1: Read entire file -->
-    #     <read-file file_path="src/main.py">
-    #     </read-file>
 
-    #     <!-- Example 2: Read specific lines (lines 10-20) -->
-    #     <read-file file_path="src/main.py" start_line="10" end_line="20">
-    #     </read-file>
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read and return the contents of a file. This tool is essential for verifying data, checking file contents, and analyzing information. Always use this tool to read file contents before processing or analyzing data. The file path must be relative to /workspace. Only the requested slice is read, so use line or byte ranges to page through large files such as logs and datasets. A single read returns at most 12 KB, so read long files and saved tool outputs in parts.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to read, relative to /workspace (e.g., 'src/main.py' for /workspace/src/main.py). Must be a valid file path within the workspace."
+                    },
+                    "start_line": {
+                        "type": "integer",
+                        "description": "Optional starting line number (1-based). Use this to read specific sections of large files. A negative value reads that many lines from the end of the file. If not specified, reads from the beginning of the file.",
+                        "default": 1
+                    },
+                    "end_line": {
+                        "type": "integer",
+                        "description": "Optional ending line number (inclusive). Use this to read specific sections of large files. If not specified, reads to the end of the file.",
+                        "default": None
+                    },
+                    "byte_offset": {
+                        "type": "integer",
+                        "description": "Optional byte offset to start reading at, for files without useful line structure. Takes precedence over start_line/end_line."
+                    },
+                    "byte_length": {
+                        "type": "integer",
+                        "description": "Optional number of bytes to read from byte_offset (max 12000)."
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="read-file",
+        mappings=[
+            {"param_name": "file_path", "node_type": "attribute", "path": "."},
+            {"param_name": "start_line", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "end_line", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "byte_offset", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "byte_length", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <!-- Example 1: Read entire file -->
+        <read-file file_path="src/main.py">
+        </read-file>
+
+        <!-- Example 2: Read specific lines (lines 10-20) -->
+        <read-file file_path="src/main.py" start_line="10" end_line="20">
+        </read-file>
 
-    #     <!-- Example 3: Read from line 5 to end -->
-    #     <read-file file_path="config.json" start_line="5">
-    #     </read-file>
+        <!-- Example 3: Read from line 5 to end -->
+        <read-file file_path="config.json" start_line="5">
+        </read-file>
 
-    #     <!-- Example 4: Read last 10 lines -->
-    #     <read-file file_path="logs/app.log" start_line="-10">
-    #     </read-file>
-    #     '''
-    # )
-    # async def read_file(self, file_path: str, start_line: int = 1, end_line: Optional[int] = None) -> ToolResult:
-    #     """Read file content with optional line range specification.
+        <!-- Example 4: Read last 10 lines -->
+        <read-file file_path="logs/app.log" start_line="-10">
+        </read-file>
+
+        <!-- Example 5: Read 4 KB starting at byte 1048576 -->
+        <read-file file_path="data/export.jsonl" byte_offset="1048576" byte_length="4096">
+        </read-file>
+        '''
+    )
+    @tool_resources(reads=["path:{file_path}"])
+    async def read_file(self, file_path: str, start_line: int = 1, end_line: Optional[int] = None,
+                        byte_offset: Optional[int] = None, byte_length: Optional[int] = None) -> ToolResult:
+        """Read file content with optional line or byte range specification.
+        
+        The slice is cut inside the sandbox with sed/tail/head, so only the
+        requested part of the file is transferred.
         
-    #     Args:
-    #         file_path: Path to the file relative to /workspace
-    #         start_line: Starting line number (1-based), defaults to 1
-    #         end_line: Ending line number (inclusive), defaults to None (end of file)
+        Args:
+            file_path: Path to the file relative to /workspace
+            start_line: Starting line number (1-based), defaults to 1. Negative values count from the end.
+            end_line: Ending line number (inclusive), defaults to None (end of file)
+            byte_offset: Byte offset to start reading at; switches to byte mode
+            byte_length: Number of bytes to read in byte mode
             
-    #     Returns:
-    #         ToolResult containing:
-    #         - Success: File content and metadata
-    #         - Failure: Error message if file doesn't exist or is binary
-    #     """
-    #     try:
-    #         file_path = self.clean_path(file_path)
-    #         full_path = f"{self.workspace_path}/{file_path}"
+        Returns:
+            ToolResult containing:
+            - Success: File content and metadata
+            - Failure: Error message if file doesn't exist or is binary
+        """
+        try:
+            # Ensure sandbox is initialized
+            await self._ensure_sandbox()
             
-    #         if not self._file_exists(full_path):
-    #             return self.fail_response(f"File '{file_path}' does not exist")
+            file_path = self.clean_path(file_path)
+            full_path = f"{self.workspace_path}/{file_path}"
             
-    #         # Download and decode file content
-    #         content = self.sandbox.fs.download_file(full_path).decode()
+            start_line = int(start_line) if start_line is not None else 1
+            end_line = int(end_line) if end_line is not None else None
+            byte_offset = int(byte_offset) if byte_offset is not None else None
+            byte_length = min(int(byte_length), MAX_READ_BYTES) if byte_length is not None else MAX_READ_BYTES
             
-    #         # Split content into lines
-    #         lines = content.split('\n')
-    #         total_lines = len(lines)
+            quoted = shlex.quote(full_path)
+            if byte_offset is not None:
+                slice_cmd = f"tail -c +{max(byte_offset, 0) + 1} {quoted} | head -c {byte_length}"
+            elif start_line < 0:
+                slice_cmd = f"tail -n {-start_line} {quoted}"
+            else:
+                first = max(start_line, 1)
+                slice_cmd = f"sed -n '{first},{end_line}p;{end_line}q' {quoted}" if end_line is not None else f"sed -n '{first},$p' {quoted}"
             
-    #         # Handle line range if specified
-    #         if start_line > 1 or end_line is not None:
-    #             # Convert to 0-based indices
-    #             start_idx = max(0, start_line - 1)
-    #             end_idx = end_line if end_line is not None else total_lines
-    #             end_idx = min(end_idx, total_lines)  # Ensure we don't exceed file length
-                
-    #             # Extract the requested lines
-    #             content = '\n'.join(lines[start_idx:end_idx])
+            # One exec: file stats on the first line, then the slice, capped in size
+            command = (
+                f"[ -f {quoted} ] || exit 3; "
+                f"echo \"$(stat -c %s {quoted}) $(wc -l < {quoted})\"; "
+                f"{slice_cmd} | head -c {MAX_READ_BYTES + 1}"
+            )
+            response = await asyncio.to_thread(
+                self.sandbox.process.exec, f"/bin/sh -c {shlex.quote(command)}", timeout=60
+            )
+            if response.exit_code == 3:
+                return self.fail_response(f"File '{file_path}' does not exist")
+            if response.exit_code != 0:
+                return self.fail_response(f"Error reading file: {response.result}")
             
-    #         return self.success_response({
-    #             "content": content,
-    #             "file_path": file_path,
-    #             "start_line": start_line,
-    #             "end_line": end_line if end_line is not None else total_lines,
-    #             "total_lines": total_lines
-    #         })
+            header, _, content = response.result.partition("\n")
+            size, total_lines = (int(value) for value in header.split())
+            if "\x00" in content:
+                return self.fail_response(f"File '{file_path}' appears to be binary and cannot be read as text")
             
-    #     except UnicodeDecodeError:
-    #         return self.fail_response(f"File '{file_path}' appears to be binary and cannot be read as text")
-    #     except Exception as e:
-    #         return self.fail_response(f"Error reading file: {str(e)}")
-
+            truncated = len(content.encode()) > MAX_READ_BYTES
+            if truncated:
+                content = content.encode()[:MAX_READ_BYTES].decode(errors="ignore")
+            
+            result = {
+                "content": content,
+                "file_path": file_path,
+                "size": size,
+                "total_lines": total_lines
+            }
+            if byte_offset is not None:
+                result["byte_offset"] = byte_offset
+                result["bytes_read"] = len(content.encode())
+            else:
+                lines_read = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+                first = max(total_lines + start_line + 1, 1) if start_line < 0 else max(start_line, 1)
+                result["start_line"] = first
+                result["end_line"] = first + lines_read - 1 if lines_read else first
+            if truncated:
+                result["truncated"] = True
+                result["note"] = f"Output was limited to {MAX_READ_BYTES} bytes. Read the rest with a narrower line range or byte_offset."
+            
+            return self.success_response(result)
+            
+        except Exception as e:
+            return self.fail_response(f"Error reading file: {str(e)}")
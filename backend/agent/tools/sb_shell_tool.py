@@ -1,8 +1,69 @@
-from typing import Optional, Dict, List
+import asyncio
+import base64
+import codecs
+import re
+import shlex
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional, Dict, List, Tuple
 from uuid import uuid4
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, tool_resources
 from sandbox.sandbox import SandboxToolsBase, Sandbox
+from sandbox.manifest import mark_workspace_stale
+from sandbox.sessions import get_shell_session, discard_shell_session, shell_session_missing, load_jobs, store_job
 from agentpress.thread_manager import ThreadManager
+from utils.logger import logger
+
+# How often a running command's log is polled for new output. Polling starts fast so
+# quick commands return promptly and backs off to the interval for long ones.
+COMMAND_POLL_INTERVAL = 1.0
+FIRST_COMMAND_POLL_INTERVAL = 0.1
+# Most new output read and streamed per poll; a faster-growing log is skipped ahead
+PROGRESS_CHUNK_BYTES = 16 * 1024
+# The tool result keeps this much of the start and end of the output
+OUTPUT_HEAD_BYTES = 2000
+OUTPUT_TAIL_BYTES = 8000
+# Full logs of commands with longer output are kept here, relative to /workspace
+COMMAND_LOG_DIR = ".command_logs"
+# Background job logs and pid files live here in the sandbox
+JOB_DIR = "/tmp/jobs"
+# Most output returned by one job_logs call
+MAX_JOB_LOG_BYTES = 32 * 1024
+
+def _decode_log_bytes(data: bytes, final: bool = False) -> Tuple[str, int]:
+    """Text of the log bytes and how many bytes it covers.
+
+    A multi-byte character cut off at the end of data is left for the next read,
+    unless final says no more bytes will follow.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text = decoder.decode(data, final)
+    pending, _ = decoder.getstate()
+    return text, len(data) - len(pending)
+
+@dataclass
+class BackgroundJob:
+    """A command started with start_job, running in its own Daytona session.
+
+    Jobs are stored per sandbox in Redis, so later runs can keep using them.
+    """
+    job_id: str
+    command: str
+    cwd: str
+    session_id: str
+    command_id: str
+    started_at: float
+    offset: int = 0  # Log position up to which output has been returned
+    exit_code: Optional[int] = None
+    killed: bool = False
+
+    @property
+    def log_path(self) -> str:
+        return f"{JOB_DIR}/{self.job_id}.log"
+
+    @property
+    def pid_path(self) -> str:
+        return f"{JOB_DIR}/{self.job_id}.pid"
 
 class SandboxShellTool(SandboxToolsBase):
     """Tool for executing tasks in a Daytona sandbox with browser-use capabilities. 
@@ -10,36 +71,30 @@ class SandboxShellTool(SandboxToolsBase):
 
     def __init__(self, project_id: str, thread_manager: ThreadManager):
         super().__init__(project_id, thread_manager)
-        self._sessions: Dict[str, str] = {}  # Maps session names to session IDs
+        self._jobs: Dict[str, BackgroundJob] = {}  # Maps job IDs to background jobs
+        self._jobs_loaded = False
         self.workspace_path = "/workspace"  # Ensure we're always operating in /workspace
 
     async def _ensure_session(self, session_name: str = "default") -> str:
-        """Ensure a session exists and return its ID."""
-        if session_name not in self._sessions:
-            session_id = str(uuid4())
-            try:
-                await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.create_session(session_id)
-                self._sessions[session_name] = session_id
-            except Exception as e:
-                raise RuntimeError(f"Failed to create session: {str(e)}")
-        return self._sessions[session_name]
-
-    async def _cleanup_session(self, session_name: str):
-        """Clean up a session if it exists."""
-        if session_name in self._sessions:
-            try:
-                await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.delete_session(self._sessions[session_name])
-                del self._sessions[session_name]
-            except Exception as e:
-                print(f"Warning: Failed to cleanup session {session_name}: {str(e)}")
+        """Ensure a session exists and return its ID. Sessions outlive the run and are reused by later runs."""
+        try:
+            await self._ensure_sandbox()  # Ensure sandbox is initialized
+            return await get_shell_session(self.sandbox, self.sandbox_id, session_name)
+        except Exception as e:
+            raise RuntimeError(f"Failed to create session: {str(e)}")
+
+    async def warm_session(self, session_name: str = "default") -> None:
+        """Get the session ready before the first command, so the command does not wait for it"""
+        try:
+            await self._ensure_session(session_name)
+        except Exception as e:
+            logger.warning(f"Failed to warm up session {session_name}: {str(e)}")
 
     @openapi_schema({
         "type": "function",
         "function": {
             "name": "execute_command",
-            "description": "Execute a shell command in the workspace directory. IMPORTANT: By default, commands are blocking and will wait for completion before returning. For long-running operations, use background execution techniques (& operator, nohup) to prevent timeouts. Uses sessions to maintain state between commands. This tool is essential for running CLI tools, installing packages, and managing system operations. Always verify command outputs before using the data. Commands can be chained using && for sequential execution, || for fallback execution, and | for piping output.",
+            "description": "Execute a shell command in the workspace directory. IMPORTANT: By default, commands are blocking and will wait for completion before returning. Output is streamed to the user while the command runs; the result contains the start and end of the output, and the full log is saved under /workspace/.command_logs when it is longer. For long-running operations such as dev servers, watchers or long builds, use start_job instead. Uses sessions to maintain state between commands. This tool is essential for running CLI tools, installing packages, and managing system operations. Always verify command outputs before using the data. Commands can be chained using && for sequential execution, || for fallback execution, and | for piping output.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -58,7 +113,7 @@ class SandboxShellTool(SandboxToolsBase):
                     },
                     "timeout": {
                         "type": "integer",
-                        "description": "Optional timeout in seconds. Increase for long-running commands. Defaults to 60. For commands that might exceed this timeout, use background execution with & operator instead.",
+                        "description": "Optional timeout in seconds. Increase for long-running commands. Defaults to 60. A command still running at the timeout is stopped and its session is reset, so use start_job for commands that might exceed it.",
                         "default": 60
                     }
                 },
@@ -101,53 +156,12 @@ class SandboxShellTool(SandboxToolsBase):
         npm run build > build.log 2>&1
         </execute-command>
 
-        <!-- NON-BLOCKING COMMANDS (TMUX Sessions) -->
-        <!-- Example 1: Start a Vite Development Server -->
-        <execute-command>
-        tmux new-session -d -s vite_dev "cd /workspace && npm run dev"
-        </execute-command>
-
-        <!-- Example 2: Check if Vite Server is Running -->
-        <execute-command>
-        tmux list-sessions | grep -q vite_dev && echo "Vite server running" || echo "Vite server not found"
-        </execute-command>
-
-        <!-- Example 3: Get Vite Server Output -->
-        <execute-command>
-        tmux capture-pane -pt vite_dev
-        </execute-command>
-
-        <!-- Example 4: Stop Vite Server -->
-        <execute-command>
-        tmux kill-session -t vite_dev
-        </execute-command>
-
-        <!-- Example 5: Start a Vite Build Process -->
-        <execute-command>
-        tmux new-session -d -s vite_build "cd /workspace && npm run build"
-        </execute-command>
-
-        <!-- Example 6: Monitor Vite Build Progress -->
-        <execute-command>
-        tmux capture-pane -pt vite_build
-        </execute-command>
-
-        <!-- Example 7: Start Multiple Vite Services -->
-        <execute-command>
-        tmux new-session -d -s vite_services "cd /workspace && npm run start:all"
-        </execute-command>
-
-        <!-- Example 8: Check All Running Services -->
-        <execute-command>
-        tmux list-sessions
-        </execute-command>
-
-        <!-- Example 9: Kill All TMUX Sessions -->
-        <execute-command>
-        tmux kill-server
-        </execute-command>
-        '''
+        <!-- NON-BLOCKING COMMANDS -->
+        <!-- Use start-job for servers and other long-running processes, then job-logs / wait-for-job / kill-job -->
+        ''',
+        timeout=3600
     )
+    @tool_resources(writes=["sandbox"])
     async def execute_command(
         self, 
         command: str, 
@@ -168,49 +182,193 @@ class SandboxShellTool(SandboxToolsBase):
                 folder = folder.strip('/')
                 cwd = f"{self.workspace_path}/{folder}"
             
-            # Ensure we're in the correct directory before executing the command
-            command = f"cd {cwd} && {command}"
+            # Run the command in the session shell (so cd/export persist) with its
+            # output going to a log file that is tailed while it runs. The EXIT trap
+            # records a status even if the command exits the shell.
+            run_id = uuid4().hex[:12]
+            log_path = f"/tmp/command-{run_id}.log"
+            exit_path = f"/tmp/command-{run_id}.exit"
+            command = (
+                f"trap 'echo $? > {exit_path}' EXIT; "
+                f"cd {cwd} && {{ {command}\n}} > {log_path} 2>&1; echo $? > {exit_path}; trap - EXIT"
+            )
             
             # Execute command in session
             from sandbox.sandbox import SessionExecuteRequest
             req = SessionExecuteRequest(
                 command=command,
-                var_async=False,  # This makes the command blocking by default
+                var_async=True,  # Returns immediately, completion is detected by polling
                 cwd=cwd  # Still set the working directory for reference
             )
             
-            response = self.sandbox.process.execute_session_command(
-                session_id=session_id,
-                req=req,
-                timeout=timeout
-            )
+            try:
+                await asyncio.to_thread(
+                    self.sandbox.process.execute_session_command,
+                    session_id=session_id,
+                    req=req,
+                    timeout=None
+                )
+            except Exception:
+                # The stored session may be gone, e.g. deleted by idle reaping elsewhere. Only then is
+                # the command resubmitted; after other errors it may already be running.
+                if not await shell_session_missing(self.sandbox, session_id):
+                    raise
+                await discard_shell_session(self.sandbox_id, session_name)
+                session_id = await self._ensure_session(session_name)
+                await asyncio.to_thread(
+                    self.sandbox.process.execute_session_command,
+                    session_id=session_id,
+                    req=req,
+                    timeout=None
+                )
             
-            # Get detailed logs
-            logs = self.sandbox.process.get_session_command_logs(
-                session_id=session_id,
-                command_id=response.cmd_id
-            )
+            exit_code, summary = await self._stream_command_output(run_id, log_path, exit_path, int(timeout))
+            # Commands can change any file, so the files tool must re-index
+            mark_workspace_stale(self.sandbox_id)
+            
+            if exit_code is None:
+                # The session would stay blocked by the command for this and every later run,
+                # so it is deleted, which stops the command, and the name gets a new session
+                await self._reset_session(session_name, session_id)
+                summary = await self._summarize_command_output(run_id, log_path, exit_path)
             
-            if response.exit_code == 0:
-                return self.success_response({
-                    "output": logs,
-                    "exit_code": response.exit_code,
-                    "cwd": cwd
-                })
+            output, size, saved_log = summary
+            if exit_code is None:
+                error_msg = (
+                    f"Command timed out after {timeout} seconds and was stopped. Session '{session_name}' was reset, "
+                    f"so its working directory and exported variables are lost. Use start_job for long-running "
+                    f"commands.\n\nOutput so far:\n{output}"
+                )
+                if saved_log:
+                    error_msg += f"\n\nFull output ({size} bytes) saved to {saved_log}"
+                return self.fail_response(error_msg)
+            
+            result = {
+                "output": output,
+                "exit_code": exit_code,
+                "cwd": cwd
+            }
+            if saved_log:
+                result["output_truncated"] = True
+                result["output_size"] = size
+                result["full_output_file"] = saved_log
+            
+            if exit_code == 0:
+                return self.success_response(result)
             else:
-                error_msg = f"Command failed with exit code {response.exit_code}"
-                if logs:
-                    error_msg += f": {logs}"
+                error_msg = f"Command failed with exit code {exit_code}"
+                if output:
+                    error_msg += f": {output}"
+                if saved_log:
+                    error_msg += f"\n\nFull output ({size} bytes) saved to {saved_log}"
                 return self.fail_response(error_msg)
                 
         except Exception as e:
             return self.fail_response(f"Error executing command: {str(e)}")
+
+    async def _reset_session(self, session_name: str, session_id: str) -> None:
+        """Forget a named session and delete it from the sandbox, stopping whatever runs in it"""
+        await discard_shell_session(self.sandbox_id, session_name)
+        try:
+            await asyncio.to_thread(self.sandbox.process.delete_session, session_id)
+        except Exception as e:
+            logger.warning(f"Could not delete shell session {session_id} of sandbox {self.sandbox_id}: {str(e)}")
+
+    async def _exec(self, command: str, timeout: int = 30):
+        return await asyncio.to_thread(
+            self.sandbox.process.exec, f"/bin/sh -c {shlex.quote(command)}", timeout=timeout
+        )
+
+    async def _stream_command_output(
+        self, run_id: str, log_path: str, exit_path: str, timeout: int
+    ) -> Tuple[Optional[int], Optional[Tuple[str, int, Optional[str]]]]:
+        """Poll a running command's log, reporting new output as tool progress
+        
+        Returns:
+            (exit code, output summary as from _summarize_command_output), or
+            (None, None) if the command is still running at the timeout
+        """
+        deadline = time.monotonic() + timeout
+        interval = FIRST_COMMAND_POLL_INTERVAL
+        offset = 0
+        # Keeps a multi-byte character split across two reads together
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            # One exec per poll: exit status (if finished), log size, then new output.
+            # The output is base64 encoded so the offset advances by the exact bytes read.
+            # Once the command has finished the same exec also summarizes and cleans up.
+            response = await self._exec(
+                f"status=$(cat {exit_path} 2>/dev/null || echo running); echo $status; "
+                f"stat -c %s {log_path} 2>/dev/null || echo 0; "
+                f"tail -c +{offset + 1} {log_path} 2>/dev/null | head -c {PROGRESS_CHUNK_BYTES} | base64 -w 0; echo; "
+                f"[ \"$status\" = running ] || {{ {self._summary_script(run_id, log_path, exit_path)}; }}"
+            )
+            status, size, encoded, summary = (response.result.split("\n", 3) + ["", "", ""])[:4]
+            size = int(size.strip() or 0)
+            data = base64.b64decode(encoded.strip())
+            if data:
+                output = decoder.decode(data)
+                if output:
+                    self.report_progress({"output": output, "offset": offset, "total_bytes": size})
+                offset += len(data)
+            if size - offset > PROGRESS_CHUNK_BYTES:
+                # Too far behind to stream everything; continue from the recent end
+                offset = size - PROGRESS_CHUNK_BYTES
+                decoder.reset()
+            
+            status = status.strip()
+            if status != "running":
+                exit_code = int(status) if status.lstrip("-").isdigit() else -1
+                return exit_code, self._parse_summary(run_id, summary)
+            if time.monotonic() >= deadline:
+                return None, None
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, COMMAND_POLL_INTERVAL)
+
+    def _summary_script(self, run_id: str, log_path: str, exit_path: str) -> str:
+        """Shell that prints a command's output size and head and tail, then spills or removes its log"""
+        limit = OUTPUT_HEAD_BYTES + OUTPUT_TAIL_BYTES
+        separator = f"@@command-{run_id}-tail@@"
+        saved_path = f"{self.workspace_path}/{COMMAND_LOG_DIR}/{run_id}.log"
+        cleanup = (
+            f"if [ $size -gt {limit} ]; then "
+            f"mkdir -p {self.workspace_path}/{COMMAND_LOG_DIR} && mv {log_path} {saved_path}; "
+            f"else rm -f {log_path}; fi; rm -f {exit_path}"
+        )
+        return (
+            f"size=$(stat -c %s {log_path} 2>/dev/null || echo 0); echo $size; "
+            f"if [ $size -le {limit} ]; then cat {log_path} 2>/dev/null; "
+            f"else head -c {OUTPUT_HEAD_BYTES} {log_path}; echo; echo {separator}; tail -c {OUTPUT_TAIL_BYTES} {log_path}; fi; "
+            f"{cleanup}"
+        )
+
+    def _parse_summary(self, run_id: str, text: str) -> Tuple[str, int, Optional[str]]:
+        """Build the output summary from what _summary_script printed"""
+        limit = OUTPUT_HEAD_BYTES + OUTPUT_TAIL_BYTES
+        size_line, _, output = text.partition("\n")
+        size = int(size_line.strip() or 0)
+        if size <= limit:
+            return output, size, None
+        
+        head, _, tail = output.partition(f"\n@@command-{run_id}-tail@@\n")
+        omitted = size - limit
+        summary = f"{head}\n\n[... {omitted} bytes omitted ...]\n\n{tail}"
+        return summary, size, f"{self.workspace_path}/{COMMAND_LOG_DIR}/{run_id}.log"
+
+    async def _summarize_command_output(self, run_id: str, log_path: str, exit_path: str) -> Tuple[str, int, Optional[str]]:
+        """Head and tail of a command's output, spilling long logs to the workspace
+        
+        Returns:
+            (summary, output size in bytes, workspace path of the saved full log or None)
+        """
+        response = await self._exec(self._summary_script(run_id, log_path, exit_path))
+        return self._parse_summary(run_id, response.result)
         
     @openapi_schema({
         "type": "function",
         "function": {
             "name": "execute_command_async",
-            "description": "Execute a shell command asynchronously in the workspace directory. This tool is useful for running long-running processes without blocking the main thread. Use this for tasks like file uploads, downloads, or other operations that might take a while to complete.",
+            "description": "Execute a shell command asynchronously in the workspace directory. This tool is useful for running long-running processes without blocking the main thread. Use this for tasks like file uploads, downloads, or other operations that might take a while to complete. The command runs as a background job (see start_job) and the returned job_id works with job_status, job_logs, wait_for_job and kill_job.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -224,7 +382,7 @@ class SandboxShellTool(SandboxToolsBase):
                     },
                     "session_name": {
                         "type": "string",
-                        "description": "Optional name of the session to use. Use named sessions for related commands that need to maintain state. Defaults to 'default'.",
+                        "description": "Ignored; every background job runs in its own session.",
                         "default": "default"
                     }
                 },
@@ -251,49 +409,407 @@ class SandboxShellTool(SandboxToolsBase):
         </execute-command-async>
         '''
     )
+    @tool_resources(writes=["sandbox"])
     async def execute_command_async(
         self, 
         command: str, 
         folder: Optional[str] = None,
         session_name: str = "default"
     ) -> ToolResult:
+        # Runs as a background job so it can be polled, waited for and killed
+        return await self.start_job(command, folder=folder)
+
+    def _job_status(self, job: BackgroundJob, size: Optional[int] = None) -> dict:
+        status = {
+            "job_id": job.job_id,
+            "command": job.command,
+            "status": "running" if job.exit_code is None else (
+                "killed" if job.killed else "completed" if job.exit_code == 0 else "failed"
+            ),
+            "exit_code": job.exit_code,
+            "runtime_seconds": round(time.time() - job.started_at, 1),
+            "offset": job.offset
+        }
+        if size is not None:
+            status["log_bytes"] = size
+            status["unread_bytes"] = max(size - job.offset, 0)
+        return status
+
+    async def _load_jobs(self) -> None:
+        """Add the jobs stored for the sandbox, including those of earlier runs"""
+        if self._jobs_loaded:
+            return
+        for job_id, stored in (await load_jobs(self.sandbox_id)).items():
+            self._jobs.setdefault(job_id, BackgroundJob(**stored))
+        self._jobs_loaded = True
+
+    async def _save_job(self, job: BackgroundJob) -> None:
+        await store_job(self.sandbox_id, job.job_id, asdict(job))
+
+    async def _refresh_job(self, job: BackgroundJob) -> None:
+        """Update a job's exit code from its Daytona session command"""
+        if job.exit_code is not None:
+            return
+        command = await asyncio.to_thread(self.sandbox.process.get_session_command, job.session_id, job.command_id)
+        if command.exit_code is not None:
+            job.exit_code = command.exit_code
+            await self._save_job(job)
+
+    async def _read_job_log(self, job: BackgroundJob, offset: int, max_bytes: int) -> Tuple[int, bytes]:
+        """Log size and up to max_bytes of output from offset, as the exact bytes read"""
+        response = await self._exec(
+            f"stat -c %s {job.log_path} 2>/dev/null || echo 0; "
+            f"tail -c +{offset + 1} {job.log_path} 2>/dev/null | head -c {max_bytes} | base64 -w 0"
+        )
+        size, _, encoded = response.result.partition("\n")
+        return int(size.strip() or 0), base64.b64decode(encoded.strip())
+
+    async def _get_job(self, job_id: str) -> BackgroundJob:
+        await self._load_jobs()
+        job = self._jobs.get(job_id)
+        if job is None:
+            known = ", ".join(self._jobs) or "none"
+            raise ValueError(f"Unknown job '{job_id}'. Known jobs: {known}")
+        return job
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "start_job",
+            "description": "Start a long-running command, such as a dev server, file watcher or long build, as a background job in the workspace. Returns immediately with a job_id. Use job_logs to read new output, wait_for_job to wait for completion, job_status to check jobs and kill_job to stop one.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {
+                        "type": "string",
+                        "description": "The shell command to run in the background"
+                    },
+                    "folder": {
+                        "type": "string",
+                        "description": "Optional relative path to a subdirectory of /workspace where the command should be run"
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "Optional job name to use as the job_id (letters, digits, '-' and '_')"
+                    }
+                },
+                "required": ["command"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="start-job",
+        mappings=[
+            {"param_name": "command", "node_type": "content", "path": "."},
+            {"param_name": "folder", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "name", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <!-- Start a Vite dev server in the background -->
+        <start-job name="vite_dev" folder="my-app">
+        npm run dev
+        </start-job>
+        '''
+    )
+    @tool_resources(writes=["sandbox"])
+    async def start_job(self, command: str, folder: Optional[str] = None, name: Optional[str] = None) -> ToolResult:
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            # Ensure session exists
-            session_id = await self._ensure_session(session_name)
+            job_id = re.sub(r"[^A-Za-z0-9_-]", "_", name.strip()) if name else uuid4().hex[:8]
+            await self._load_jobs()
+            if job_id in self._jobs:
+                job = self._jobs[job_id]
+                await self._refresh_job(job)
+                if job.exit_code is None:
+                    return self.fail_response(f"Job '{job_id}' is already running. Kill it first or use another name.")
             
-            # Set up working directory
             cwd = self.workspace_path
             if folder:
                 folder = folder.strip('/')
                 cwd = f"{self.workspace_path}/{folder}"
             
-            # Execute command in session
-            from sandbox.sandbox import SessionExecuteRequest
-            req = SessionExecuteRequest(
+            # Each job gets its own session so it never blocks execute_command. setsid puts
+            # the job in its own process group, so kill_job stops the whole tree, and
+            # `wait` makes the session command's exit code the job's exit code.
+            session_id = f"job-{job_id}-{uuid4().hex[:8]}"
+            await asyncio.to_thread(self.sandbox.process.create_session, session_id)
+            job = BackgroundJob(
+                job_id=job_id,
                 command=command,
-                var_async=True,  # This makes the command asynchronous
-                cwd=cwd  # Still set the working directory for reference
+                cwd=cwd,
+                session_id=session_id,
+                command_id="",
+                started_at=time.time()
+            )
+            wrapped = (
+                f"mkdir -p {JOB_DIR}; cd {cwd} || exit 1; "
+                f"setsid bash -c {shlex.quote(command)} > {job.log_path} 2>&1 < /dev/null & "
+                f"echo $! > {job.pid_path}; wait $!"
             )
             
-            response = self.sandbox.process.execute_session_command(
+            from sandbox.sandbox import SessionExecuteRequest
+            req = SessionExecuteRequest(command=wrapped, var_async=True, cwd=cwd)
+            response = await asyncio.to_thread(
+                self.sandbox.process.execute_session_command,
                 session_id=session_id,
                 req=req,
-                timeout=None  # No timeout for async commands
+                timeout=None
             )
+            job.command_id = response.cmd_id
+            self._jobs[job_id] = job
+            await self._save_job(job)
+            mark_workspace_stale(self.sandbox_id)
             
             return self.success_response({
+                "job_id": job_id,
                 "command_id": response.cmd_id,
-                "cwd": cwd
+                "cwd": cwd,
+                "message": f"Job '{job_id}' started. Use job_logs to read its output."
             })
+        except Exception as e:
+            return self.fail_response(f"Error starting job: {str(e)}")
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "job_status",
+            "description": "Get the status of a background job, or of all jobs if no job_id is given: running/completed/failed, exit code, runtime and how much output has not been read yet.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "Optional ID of the job to check"
+                    }
+                }
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="job-status",
+        mappings=[
+            {"param_name": "job_id", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <job-status job_id="vite_dev"></job-status>
+        '''
+    )
+    @tool_resources(reads=["job:{job_id}"])
+    async def job_status(self, job_id: Optional[str] = None) -> ToolResult:
+        try:
+            await self._ensure_sandbox()
+            if job_id:
+                jobs = [await self._get_job(job_id)]
+            else:
+                await self._load_jobs()
+                jobs = list(self._jobs.values())
+            statuses = []
+            for job in jobs:
+                await self._refresh_job(job)
+                size, _ = await self._read_job_log(job, job.offset, 0)
+                statuses.append(self._job_status(job, size))
+            return self.success_response(statuses[0] if job_id else {"jobs": statuses})
+        except Exception as e:
+            return self.fail_response(f"Error getting job status: {str(e)}")
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "job_logs",
+            "description": "Read a background job's output. By default returns only output produced since the previous job_logs or wait_for_job call, so repeated polling never repeats output.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "ID of the job"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Optional byte offset to read from instead of the last position (0 reads from the start)"
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "Maximum bytes of output to return (max 32768)",
+                        "default": 16384
+                    }
+                },
+                "required": ["job_id"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="job-logs",
+        mappings=[
+            {"param_name": "job_id", "node_type": "attribute", "path": "."},
+            {"param_name": "offset", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "max_bytes", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <job-logs job_id="vite_dev"></job-logs>
+        '''
+    )
+    @tool_resources(writes=["job:{job_id}"])
+    async def job_logs(self, job_id: str, offset: Optional[int] = None, max_bytes: int = 16384) -> ToolResult:
+        try:
+            await self._ensure_sandbox()
+            job = await self._get_job(job_id)
+            await self._refresh_job(job)
+            start = int(offset) if offset is not None else job.offset
+            size, data = await self._read_job_log(job, start, min(int(max_bytes), MAX_JOB_LOG_BYTES))
+            output, consumed = _decode_log_bytes(data, final=job.exit_code is not None and start + len(data) >= size)
+            job.offset = start + consumed
+            await self._save_job(job)
             
+            result = self._job_status(job, size)
+            result["output"] = output
+            return self.success_response(result)
         except Exception as e:
-            return self.fail_response(f"Error executing command: {str(e)}")
-    
+            return self.fail_response(f"Error reading job logs: {str(e)}")
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "wait_for_job",
+            "description": "Wait until a background job finishes or the timeout passes, then return its status and the output produced since the last read. New output is streamed to the user while waiting.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "ID of the job"
+                    },
+                    "timeout": {
+                        "type": "integer",
+                        "description": "Maximum seconds to wait (default 60)",
+                        "default": 60
+                    }
+                },
+                "required": ["job_id"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="wait-for-job",
+        mappings=[
+            {"param_name": "job_id", "node_type": "attribute", "path": "."},
+            {"param_name": "timeout", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <wait-for-job job_id="build" timeout="300"></wait-for-job>
+        ''',
+        timeout=3600
+    )
+    @tool_resources(writes=["job:{job_id}"])
+    async def wait_for_job(self, job_id: str, timeout: int = 60) -> ToolResult:
+        try:
+            await self._ensure_sandbox()
+            job = await self._get_job(job_id)
+            deadline = time.monotonic() + int(timeout)
+            start = job.offset
+            position = job.offset
+            while True:
+                await self._refresh_job(job)
+                size, data = await self._read_job_log(job, position, PROGRESS_CHUNK_BYTES)
+                output, consumed = _decode_log_bytes(data, final=job.exit_code is not None and position + len(data) >= size)
+                if output:
+                    self.report_progress({"job_id": job_id, "output": output, "offset": position, "total_bytes": size})
+                position += consumed
+                if job.exit_code is not None and position >= size:
+                    break
+                if time.monotonic() >= deadline:
+                    break
+                if job.exit_code is None:
+                    await asyncio.sleep(COMMAND_POLL_INTERVAL)
+            
+            # Return the new output since the last read, keeping only its tail if long
+            unread = size - start
+            read_from = max(start, size - MAX_JOB_LOG_BYTES)
+            _, data = await self._read_job_log(job, read_from, MAX_JOB_LOG_BYTES)
+            output, consumed = _decode_log_bytes(data, final=job.exit_code is not None and read_from + len(data) >= size)
+            job.offset = read_from + consumed
+            await self._save_job(job)
+            
+            result = self._job_status(job, size)
+            if read_from > start:
+                result["skipped_bytes"] = read_from - start
+            result["output"] = output
+            if job.exit_code is None:
+                result["message"] = f"Job '{job_id}' is still running after {timeout} seconds ({unread} new bytes of output)"
+            return self.success_response(result)
+        except Exception as e:
+            return self.fail_response(f"Error waiting for job: {str(e)}")
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "kill_job",
+            "description": "Stop a background job and all processes it started.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "ID of the job"
+                    },
+                    "signal": {
+                        "type": "string",
+                        "description": "Signal to send: TERM (default), INT or KILL",
+                        "default": "TERM"
+                    }
+                },
+                "required": ["job_id"]
+            }
+        }
+    })
+    @xml_schema(
+        tag_name="kill-job",
+        mappings=[
+            {"param_name": "job_id", "node_type": "attribute", "path": "."},
+            {"param_name": "signal", "node_type": "attribute", "path": ".", "required": False}
+        ],
+        example='''
+        <kill-job job_id="vite_dev"></kill-job>
+        '''
+    )
+    @tool_resources(writes=["job:{job_id}"])
+    async def kill_job(self, job_id: str, signal: str = "TERM") -> ToolResult:
+        try:
+            await self._ensure_sandbox()
+            job = await self._get_job(job_id)
+            signal = signal.strip().upper().removeprefix("SIG")
+            if signal not in ("TERM", "INT", "KILL"):
+                return self.fail_response(f"Unsupported signal '{signal}'. Use TERM, INT or KILL.")
+            
+            await self._refresh_job(job)
+            if job.exit_code is None:
+                # The job's pid is its process group id (setsid)
+                await self._exec(f"kill -{signal} -$(cat {job.pid_path}) 2>/dev/null || true")
+                job.killed = True
+                await self._save_job(job)
+                for _ in range(10):
+                    await asyncio.sleep(0.5)
+                    await self._refresh_job(job)
+                    if job.exit_code is not None:
+                        break
+            mark_workspace_stale(self.sandbox_id)
+            
+            result = self._job_status(job)
+            if job.exit_code is None:
+                result["message"] = f"Job '{job_id}' did not stop after SIG{signal}; try signal=\"KILL\""
+            else:
+                await asyncio.to_thread(self.sandbox.process.delete_session, job.session_id)
+            return self.success_response(result)
+        except Exception as e:
+            return self.fail_response(f"Error killing job: {str(e)}")
 
     async def cleanup(self):
-        """Clean up all sessions."""
-        for session_name in list(self._sessions.keys()):
-            await self._cleanup_session(session_name)
\ No newline at end of file
+        """Clean up the sessions of finished jobs. Shell sessions are kept for later runs and reaped when idle."""
+        for job in self._jobs.values():
+            if job.exit_code is not None:
+                try:
+                    await asyncio.to_thread(self.sandbox.process.delete_session, job.session_id)
+                except Exception as e:
+                    print(f"Warning: Failed to cleanup session of job {job.job_id}: {str(e)}")
\ No newline at end of file
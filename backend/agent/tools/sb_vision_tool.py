@@ -3,7 +3,7 @@ import base64
 import mimetypes
 from typing import Optional
 
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, tool_resources
 from sandbox.sandbox import SandboxToolsBase, Sandbox
 from agentpress.thread_manager import ThreadManager
 from utils.logger import logger
@@ -57,6 +57,7 @@ class SandboxVisionTool(SandboxToolsBase):
         <see-image file_path="docs/diagram.png"></see-image>
         '''
     )
+    @tool_resources(reads=["path:{file_path}"])
     async def see_image(self, file_path: str) -> ToolResult:
         """Reads an image file, converts it to base64, and adds it as a temporary message."""
         try:
@@ -158,6 +159,7 @@ class SandboxVisionTool(SandboxToolsBase):
         <see-pdf file_path="docs/report.pdf"></see-pdf>
         '''
     )
+    @tool_resources(reads=["path:{file_path}"])
     async def see_pdf(self, file_path: str) -> ToolResult:
         """Reads a PDF file, converts it to base64, and adds it as a temporary message."""
         try:
@@ -4,17 +4,25 @@ from typing import List, Optional
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+import asyncio
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, cache_result
+from agentpress.thread_manager import ThreadManager
+from sandbox.sandbox import SandboxToolsBase
 from utils.config import config
+from utils.logger import logger
 import json
 
 # TODO: add subpages, etc... in filters as sometimes its necessary 
 
-class WebSearchTool(Tool):
-    """Tool for performing web searches using Tavily API and web scraping using Firecrawl."""
+class WebSearchTool(SandboxToolsBase):
+    """Tool for performing web searches using Tavily API and web scraping.
+    
+    Pages are scraped with the sandbox browser's local extraction when a project
+    sandbox is available, falling back to Firecrawl.
+    """
 
-    def __init__(self, api_key: str = None):
-        super().__init__()
+    def __init__(self, api_key: str = None, project_id: Optional[str] = None, thread_manager: Optional[ThreadManager] = None):
+        super().__init__(project_id, thread_manager)
         # Load environment variables
         load_dotenv()
         # Use the provided API key or get it from environment variables
@@ -30,6 +38,7 @@ class WebSearchTool(Tool):
         # Tavily asynchronous search client
         self.tavily_client = AsyncTavilyClient(api_key=self.tavily_api_key)
 
+    @cache_result(ttl=3600)
     @openapi_schema({
         "type": "function",
         "function": {
@@ -86,7 +95,8 @@ class WebSearchTool(Tool):
             query="healthy breakfast recipes" 
             num_results="20">
         </web-search>
-        '''
+        ''',
+        timeout=180
     )
     async def web_search(
         self, 
@@ -161,17 +171,50 @@ class WebSearchTool(Tool):
                 simplified_message += "..."
             return self.fail_response(simplified_message)
 
+    async def _scrape_in_sandbox(self, url: str, goal: Optional[str]) -> Optional[dict]:
+        """Extract the page with the sandbox browser, returning None if that is not possible"""
+        if not self.project_id or not self.thread_manager:
+            return None
+        try:
+            await self._ensure_sandbox()
+            # Extraction only leases the context, so parallel scrapes can share it
+            params = {"url": url, "context_id": "scrape"}
+            if goal:
+                params["goal"] = goal
+            json_data = json.dumps(params).replace("'", "'\"'\"'")
+            curl_cmd = (
+                "curl -s -X POST 'http://localhost:8002/api/automation/extract_url' "
+                f"-H 'Content-Type: application/json' -d '{json_data}'"
+            )
+            response = await asyncio.to_thread(self.sandbox.process.exec, curl_cmd, timeout=60)
+            if response.exit_code != 0:
+                logger.warning(f"Sandbox extraction request failed for {url}: {response.result}")
+                return None
+            result = json.loads(response.result)
+            if not result.get("success") or not result.get("content"):
+                logger.warning(f"Sandbox extraction returned no content for {url}: {result.get('error')}")
+                return None
+            return result
+        except Exception as e:
+            logger.warning(f"Sandbox extraction unavailable for {url}, falling back to Firecrawl: {e}")
+            return None
+
+    @cache_result(ttl=1800)
     @openapi_schema({
         "type": "function",
         "function": {
             "name": "scrape_webpage",
-            "description": "Retrieve the complete text content of a specific webpage using Firecrawl. This tool extracts the full text content from any accessible web page and returns it for analysis, processing, or reference. The extracted text includes the main content of the page without HTML markup. Note that some pages may have limitations on access due to paywalls, access restrictions, or dynamic content loading.",
+            "description": "Retrieve the text content of a specific webpage as markdown. The main content is extracted locally with the sandbox browser, falling back to Firecrawl. This tool extracts the full text content from any accessible web page and returns it for analysis, processing, or reference. The extracted text includes the main content of the page without HTML markup. Note that some pages may have limitations on access due to paywalls, access restrictions, or dynamic content loading.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "url": {
                         "type": "string",
                         "description": "The complete URL of the webpage to scrape. This should be a valid, accessible web address including the protocol (http:// or https://). The tool will attempt to extract all text content from this URL."
+                    },
+                    "goal": {
+                        "type": "string",
+                        "description": "Optional description of the information you need from the page. When given, only the sections of the page most relevant to the goal are returned instead of the whole page."
                     }
                 },
                 "required": ["url"]
@@ -181,7 +224,8 @@ class WebSearchTool(Tool):
     @xml_schema(
         tag_name="scrape-webpage",
         mappings=[
-            {"param_name": "url", "node_type": "attribute", "path": "."}
+            {"param_name": "url", "node_type": "attribute", "path": "."},
+            {"param_name": "goal", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <!-- 
@@ -214,6 +258,12 @@ class WebSearchTool(Tool):
             url="https://example.com/research/ai-paper-2024">
         </scrape-webpage>
         
+        <!-- Use a goal to get only the relevant sections of a long page -->
+        <scrape-webpage 
+            url="https://example.com/pricing"
+            goal="price of the team plan">
+        </scrape-webpage>
+        
         <!-- 3. Only if scrape fails or interaction needed, use browser tools -->
         <!-- Example of when to use browser tools:
              - Dynamic content loading
@@ -222,11 +272,13 @@ class WebSearchTool(Tool):
              - Interactive elements
              - Infinite scroll pages
         -->
-        '''
+        ''',
+        timeout=180
     )
     async def scrape_webpage(
         self,
-        url: str
+        url: str,
+        goal: Optional[str] = None
     ) -> ToolResult:
         """
         Retrieve the complete text content of a webpage using Firecrawl.
@@ -246,6 +298,8 @@ class WebSearchTool(Tool):
         
         Parameters:
         - url: The URL of the webpage to scrape
+        - goal: Optional description of the information needed; only the most
+          relevant sections are returned when given
         """
         try:
             # Parse the URL parameter exactly as it would appear in XML
@@ -259,6 +313,18 @@ class WebSearchTool(Tool):
                     url = 'https://' + url
             else:
                 return self.fail_response("URL must be a string.")
+            
+            # ---------- Local extraction in the sandbox browser ----------
+            local_result = await self._scrape_in_sandbox(url, goal)
+            if local_result:
+                formatted_result = {
+                    "Title": local_result.get("title", ""),
+                    "URL": url,
+                    "Text": local_result["content"]
+                }
+                if local_result.get("chunks_returned", 0) < local_result.get("chunks_total", 0):
+                    formatted_result["Sections"] = f"{local_result['chunks_returned']} of {local_result['chunks_total']} most relevant to the goal"
+                return self.success_response([formatted_result])
                 
             # ---------- Firecrawl scrape endpoint ----------
             async with httpx.AsyncClient() as client:
@@ -0,0 +1,107 @@
+"""
+Run-scoped cancellation for AgentPress.
+
+A CancellationToken is created per agent run and cancelled when the run is
+stopped. The ThreadManager and ResponseProcessor check it between steps and
+race it against the awaits that can take long (the LLM stream, tool calls), so
+a stop takes effect right away instead of after the current step finishes.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Optional, TypeVar
+
+from utils.logger import logger
+
+T = TypeVar("T")
+
+
+class RunCancelled(Exception):
+    """Raised when an operation is abandoned because its run was stopped"""
+
+
+class CancellationToken:
+    """Signal shared by everything working on one agent run"""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Run stopped") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+            logger.info(f"Cancellation requested: {reason}")
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+
+async def run_cancellable(awaitable: Awaitable[T], token: Optional[CancellationToken] = None, timeout: Optional[float] = None) -> T:
+    """Await awaitable, cancelling it if the token is cancelled or the timeout passes.
+
+    Raises:
+        RunCancelled: The token was cancelled first
+        asyncio.TimeoutError: The timeout passed first
+    """
+    if token is None:
+        return await asyncio.wait_for(awaitable, timeout) if timeout else await awaitable
+    if token.cancelled:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise RunCancelled(token.reason)
+
+    task = asyncio.ensure_future(awaitable)
+    waiter = asyncio.ensure_future(token.wait())
+    try:
+        done, _ = await asyncio.wait({task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+    if task in done:
+        return task.result()
+
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    if token.cancelled:
+        raise RunCancelled(token.reason)
+    raise asyncio.TimeoutError()
+
+
+async def iterate_cancellable(iterator: AsyncIterator[T], token: Optional[CancellationToken] = None) -> AsyncIterator[T]:
+    """Yield from an async iterator until it ends or the token is cancelled.
+
+    On cancellation the iterator is closed, which for an LLM stream closes the
+    connection so no more tokens are generated.
+    """
+    if token is None:
+        async for item in iterator:
+            yield item
+        return
+
+    iterator = iterator.__aiter__()
+    while not token.cancelled:
+        try:
+            yield await run_cancellable(iterator.__anext__(), token)
+        except StopAsyncIteration:
+            return
+        except RunCancelled:
+            break
+    await _close(iterator)
+
+
+async def _close(iterator: Any) -> None:
+    try:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        elif hasattr(iterator, "close"):
+            result = iterator.close()
+            if asyncio.iscoroutine(result):
+                await result
+    except Exception as e:
+        logger.debug(f"Error closing cancelled stream: {str(e)}")
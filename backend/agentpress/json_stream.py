@@ -0,0 +1,105 @@
+"""
+Incremental JSON tracking for streamed tool-call arguments.
+
+Native tool calls arrive as many small argument deltas. Instead of trying
+json.loads on the whole buffer after every delta, an IncrementalJSONParser
+scans each delta once, keeping the nesting depth and whether it is inside a
+string, so whether the arguments are complete is known in O(1) and they are
+parsed exactly once.
+"""
+
+import json
+import re
+from typing import Any, List
+
+# Characters that change state outside and inside of strings
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class IncrementalJSONParser:
+    """Tracks one JSON object or array as its text arrives in chunks"""
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._closed = False
+        self._scalar = False
+        self._trailing = False
+        self._parsed = False
+        self._value: Any = None
+
+    def feed(self, chunk: str) -> None:
+        """Add the next piece of JSON text"""
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._parsed = False
+        position = 0
+        length = len(chunk)
+        while position < length and not self._scalar:
+            if self._closed:
+                if chunk[position:].strip():
+                    self._trailing = True
+                return
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    position += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, position)
+                if match is None:
+                    return
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                position = match.end()
+                continue
+            if not self._started:
+                stripped = chunk[position:].lstrip()
+                if not stripped:
+                    return
+                if stripped[0] not in "{[":
+                    # Not an object or array; completeness is only known at the end
+                    self._scalar = True
+                    return
+                self._started = True
+            match = _STRUCTURAL.search(chunk, position)
+            if match is None:
+                return
+            character = match.group()
+            if character == '"':
+                self._in_string = True
+            elif character in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._closed = True
+            position = match.end()
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    @property
+    def complete(self) -> bool:
+        """Whether the top-level object or array has been closed"""
+        return self._closed and not self._trailing
+
+    def value(self) -> Any:
+        """The parsed JSON, parsed once per state of the text.
+
+        Raises:
+            json.JSONDecodeError: The text is not valid JSON
+        """
+        if not self._parsed:
+            self._value = json.loads(self.text)
+            self._parsed = True
+        return self._value
@@ -18,8 +18,12 @@ from datetime import datetime, timezone
 
 from litellm import completion_cost, token_counter
 
-from agentpress.tool import Tool, ToolResult
-from agentpress.tool_registry import ToolRegistry
+from agentpress.tool import Tool, ToolResult, tool_progress_callback
+from agentpress.tool_registry import ToolRegistry, ToolArgumentError
+from agentpress.cancellation import CancellationToken, RunCancelled, run_cancellable, iterate_cancellable
+from agentpress.tool_scheduler import ToolScheduler, ResourceAccess, resolve_accesses, DEFAULT_MAX_PARALLEL_TOOLS
+from agentpress import tool_cache
+from agentpress.json_stream import IncrementalJSONParser
 from utils.logger import logger
 
 # Type alias for XML result adding strategy
@@ -28,6 +32,9 @@ XmlAddingStrategy = Literal["user_message", "assistant_message", "inline_edit"]
 # Type alias for tool execution strategy
 ToolExecutionStrategy = Literal["sequential", "parallel"]
 
+# Seconds a tool call may run unless its schema declares a timeout
+DEFAULT_TOOL_TIMEOUT = 600
+
 @dataclass
 class ToolExecutionContext:
     """Context for a tool execution including call details, result, and display info."""
@@ -56,6 +63,10 @@ class ProcessorConfig:
         tool_execution_strategy: How to execute multiple tools ("sequential" or "parallel")
         xml_adding_strategy: How to add XML tool results to the conversation
         max_xml_tool_calls: Maximum number of XML tool calls to process (0 = no limit)
+        max_parallel_tools: Most tool calls touching the sandbox that run at once with the parallel strategy
+        max_tool_output_chars: Longest tool result output kept in the thread (0 = no limit)
+        tool_output_head_chars: Characters kept from the start of a longer output
+        tool_output_tail_chars: Characters kept from the end of a longer output
     """
 
     xml_tool_calling: bool = True  
@@ -66,6 +77,10 @@ class ProcessorConfig:
     tool_execution_strategy: ToolExecutionStrategy = "sequential"
     xml_adding_strategy: XmlAddingStrategy = "assistant_message"
     max_xml_tool_calls: int = 0  # 0 means no limit
+    max_parallel_tools: int = DEFAULT_MAX_PARALLEL_TOOLS
+    max_tool_output_chars: int = 20000  # 0 means no limit
+    tool_output_head_chars: int = 4000
+    tool_output_tail_chars: int = 8000
     
     def __post_init__(self):
         """Validate configuration after initialization."""
@@ -77,6 +92,9 @@ class ProcessorConfig:
         
         if self.max_xml_tool_calls < 0:
             raise ValueError("max_xml_tool_calls must be a non-negative integer (0 = no limit)")
+        
+        if self.max_tool_output_chars and self.tool_output_head_chars + self.tool_output_tail_chars > self.max_tool_output_chars:
+            raise ValueError("tool_output_head_chars + tool_output_tail_chars must not exceed max_tool_output_chars")
 
 class ResponseProcessor:
     """Processes LLM responses, extracting and executing tool calls."""
@@ -99,6 +117,7 @@ class ResponseProcessor:
         prompt_messages: List[Dict[str, Any]],
         llm_model: str,
         config: ProcessorConfig = ProcessorConfig(),
+        cancellation_token: Optional[CancellationToken] = None,
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """Process a streaming LLM response, handling tool calls and execution.
         
@@ -108,6 +127,7 @@ class ResponseProcessor:
             prompt_messages: List of messages sent to the LLM (the prompt)
             llm_model: The name of the LLM model used
             config: Configuration for parsing and execution
+            cancellation_token: Stops the stream and running tools when the run is stopped
             
         Yields:
             Complete message objects matching the DB schema, except for content chunks.
@@ -124,6 +144,9 @@ class ResponseProcessor:
         last_assistant_message_object = None # Store the final saved assistant message object
         tool_result_message_objects = {} # tool_index -> full saved message object
         has_printed_thinking_prefix = False # Flag for printing thinking prefix only once
+        progress_queue = asyncio.Queue() # (tool_index, tool_call, data) reported by running tools
+        # Orders tools executed on stream that conflict with earlier ones
+        scheduler = ToolScheduler(config.max_parallel_tools, sequential=config.tool_execution_strategy == "sequential")
 
         logger.info(f"Streaming Config: XML={config.xml_tool_calling}, Native={config.native_tool_calling}, "
                    f"Execute on stream={config.execute_on_stream}, Strategy={config.tool_execution_strategy}")
@@ -147,7 +170,7 @@ class ResponseProcessor:
             if assist_start_msg_obj: yield assist_start_msg_obj
             # --- End Start Events ---
 
-            async for chunk in llm_response:
+            async for chunk in iterate_cancellable(llm_response, cancellation_token):
                 if hasattr(chunk, 'choices') and chunk.choices and hasattr(chunk.choices[0], 'finish_reason') and chunk.choices[0].finish_reason:
                     finish_reason = chunk.choices[0].finish_reason
                     logger.debug(f"Detected finish_reason: {finish_reason}")
@@ -205,7 +228,10 @@ class ResponseProcessor:
                                         if started_msg_obj: yield started_msg_obj
                                         yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                        execution_task = asyncio.create_task(self._execute_tool(tool_call))
+                                        execution_task = self._schedule_tool(
+                                            scheduler, tool_call, self._progress_callback(progress_queue, tool_index, tool_call),
+                                            cancellation_token
+                                        )
                                         pending_tool_executions.append({
                                             "task": execution_task, "tool_call": tool_call,
                                             "tool_index": tool_index, "context": context
@@ -244,25 +270,29 @@ class ResponseProcessor:
 
                             # --- Buffer and Execute Complete Native Tool Calls ---
                             if not hasattr(tool_call_chunk, 'function'): continue
-                            idx = tool_call_chunk.index if hasattr(tool_call_chunk, 'index') else 0
-                            # ... (buffer update logic remains same) ...
-                            # ... (check complete logic remains same) ...
-                            has_complete_tool_call = False # Placeholder
-                            if (tool_calls_buffer.get(idx) and
-                                tool_calls_buffer[idx]['id'] and
-                                tool_calls_buffer[idx]['function']['name'] and
-                                tool_calls_buffer[idx]['function']['arguments']):
+                            idx = tool_call_chunk.index if hasattr(tool_call_chunk, 'index') and tool_call_chunk.index is not None else 0
+                            if idx not in tool_calls_buffer:
+                                tool_calls_buffer[idx] = {'id': None, 'name': None, 'arguments': IncrementalJSONParser(), 'executed': False}
+                            current_tool = tool_calls_buffer[idx]
+                            if getattr(tool_call_chunk, 'id', None): current_tool['id'] = tool_call_chunk.id
+                            if getattr(tool_call_chunk.function, 'name', None): current_tool['name'] = tool_call_chunk.function.name
+                            if getattr(tool_call_chunk.function, 'arguments', None): current_tool['arguments'].feed(tool_call_chunk.function.arguments)
+
+                            # The parser knows when the arguments close; they are parsed only then
+                            has_complete_tool_call = False
+                            if (not current_tool['executed'] and current_tool['id'] and current_tool['name'] and
+                                current_tool['arguments'].complete):
                                 try:
-                                    json.loads(tool_calls_buffer[idx]['function']['arguments'])
+                                    current_tool['arguments'].value()
                                     has_complete_tool_call = True
                                 except json.JSONDecodeError: pass
 
 
                             if has_complete_tool_call and config.execute_tools and config.execute_on_stream:
-                                current_tool = tool_calls_buffer[idx]
+                                current_tool['executed'] = True
                                 tool_call_data = {
-                                    "function_name": current_tool['function']['name'],
-                                    "arguments": json.loads(current_tool['function']['arguments']),
+                                    "function_name": current_tool['name'],
+                                    "arguments": current_tool['arguments'].value(),
                                     "id": current_tool['id']
                                 }
                                 current_assistant_id = last_assistant_message_object['message_id'] if last_assistant_message_object else None
@@ -275,7 +305,10 @@ class ResponseProcessor:
                                 if started_msg_obj: yield started_msg_obj
                                 yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                execution_task = asyncio.create_task(self._execute_tool(tool_call_data))
+                                execution_task = self._schedule_tool(
+                                    scheduler, tool_call_data, self._progress_callback(progress_queue, tool_index, tool_call_data),
+                                    cancellation_token
+                                )
                                 pending_tool_executions.append({
                                     "task": execution_task, "tool_call": tool_call_data,
                                     "tool_index": tool_index, "context": context
@@ -286,6 +319,10 @@ class ResponseProcessor:
                     logger.info("Stopping stream processing after loop due to XML tool call limit")
                     break
 
+            if cancellation_token and cancellation_token.cancelled:
+                logger.info(f"Stream for thread {thread_id} cancelled: {cancellation_token.reason}")
+                finish_reason = "cancelled"
+
             # print() # Add a final newline after the streaming loop finishes
 
             # --- After Streaming Loop ---
@@ -296,7 +333,9 @@ class ResponseProcessor:
                 logger.info(f"Waiting for {len(pending_tool_executions)} pending streamed tool executions")
                 # ... (asyncio.wait logic) ...
                 pending_tasks = [execution["task"] for execution in pending_tool_executions]
-                done, _ = await asyncio.wait(pending_tasks)
+                wait_task = asyncio.create_task(asyncio.wait(pending_tasks))
+                async for progress_msg in self._stream_tool_progress(wait_task, progress_queue, thread_id, thread_run_id):
+                    yield progress_msg
 
                 for execution in pending_tool_executions:
                     tool_idx = execution.get("tool_index", -1)
@@ -364,12 +403,12 @@ class ResponseProcessor:
                 complete_native_tool_calls = []
                 if config.native_tool_calling:
                     for idx, tc_buf in tool_calls_buffer.items():
-                        if tc_buf['id'] and tc_buf['function']['name'] and tc_buf['function']['arguments']:
+                        if tc_buf['id'] and tc_buf['name'] and tc_buf['arguments'].text:
                             try:
-                                args = json.loads(tc_buf['function']['arguments'])
+                                args = tc_buf['arguments'].value()
                                 complete_native_tool_calls.append({
                                     "id": tc_buf['id'], "type": "function",
-                                    "function": {"name": tc_buf['function']['name'],"arguments": args}
+                                    "function": {"name": tc_buf['name'],"arguments": args}
                                 })
                             except json.JSONDecodeError: continue
 
@@ -463,7 +502,13 @@ class ResponseProcessor:
                 # Or execute now if not streamed
                 elif final_tool_calls_to_process and not config.execute_on_stream:
                     logger.info(f"Executing {len(final_tool_calls_to_process)} tools ({config.tool_execution_strategy}) after stream")
-                    results_list = await self._execute_tools(final_tool_calls_to_process, config.tool_execution_strategy)
+                    execution_task = asyncio.create_task(self._execute_tools(
+                        final_tool_calls_to_process, config.tool_execution_strategy, progress_queue,
+                        config.max_parallel_tools, cancellation_token
+                    ))
+                    async for progress_msg in self._stream_tool_progress(execution_task, progress_queue, thread_id, thread_run_id):
+                        yield progress_msg
+                    results_list = execution_task.result()
                     current_tool_idx = 0
                     for tc, res in results_list:
                        # Map back using all_tool_data_map which has correct indices
@@ -494,6 +539,10 @@ class ResponseProcessor:
                             if started_msg_obj: yield started_msg_obj
                             yielded_tool_indices.add(tool_idx) # Mark status yielded
 
+                        # Keep oversized output out of the thread before saving it
+                        result = await self._apply_output_budget(tool_call, result, config)
+                        context.result = result
+
                         # Save the tool result message to DB
                         saved_tool_result_object = await self._add_tool_result( # Returns full object or None
                             thread_id, tool_call, result, config.xml_adding_strategy,
@@ -576,7 +625,8 @@ class ResponseProcessor:
         thread_id: str,
         prompt_messages: List[Dict[str, Any]],
         llm_model: str,
-        config: ProcessorConfig = ProcessorConfig()
+        config: ProcessorConfig = ProcessorConfig(),
+        cancellation_token: Optional[CancellationToken] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """Process a non-streaming LLM response, handling tool calls and execution.
         
@@ -586,6 +636,7 @@ class ResponseProcessor:
             prompt_messages: List of messages sent to the LLM (the prompt)
             llm_model: The name of the LLM model used
             config: Configuration for parsing and execution
+            cancellation_token: Cancels running tools when the run is stopped
             
         Yields:
             Complete message objects matching the DB schema.
@@ -705,7 +756,14 @@ class ResponseProcessor:
             tool_calls_to_execute = [item['tool_call'] for item in all_tool_data]
             if config.execute_tools and tool_calls_to_execute:
                 logger.info(f"Executing {len(tool_calls_to_execute)} tools with strategy: {config.tool_execution_strategy}")
-                tool_results = await self._execute_tools(tool_calls_to_execute, config.tool_execution_strategy)
+                progress_queue = asyncio.Queue()
+                execution_task = asyncio.create_task(self._execute_tools(
+                    tool_calls_to_execute, config.tool_execution_strategy, progress_queue,
+                    config.max_parallel_tools, cancellation_token
+                ))
+                async for progress_msg in self._stream_tool_progress(execution_task, progress_queue, thread_id, thread_run_id):
+                    yield progress_msg
+                tool_results = execution_task.result()
 
                 for i, (returned_tool_call, result) in enumerate(tool_results):
                     original_data = all_tool_data[i]
@@ -716,6 +774,7 @@ class ResponseProcessor:
                     context = self._create_tool_context(
                         tool_call_from_data, tool_index, current_assistant_id, parsing_details
                     )
+                    result = await self._apply_output_budget(tool_call_from_data, result, config)
                     context.result = result
 
                     # Save and Yield start status
@@ -1042,8 +1101,23 @@ class ResponseProcessor:
         return parsed_data
 
     # Tool execution methods
-    async def _execute_tool(self, tool_call: Dict[str, Any]) -> ToolResult:
-        """Execute a single tool call and return the result."""
+    async def _execute_tool(
+        self,
+        tool_call: Dict[str, Any],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancellation_token: Optional[CancellationToken] = None
+    ) -> ToolResult:
+        """Execute a single tool call and return the result.
+        
+        The call is cancelled when it exceeds its timeout or the run is stopped,
+        and a failed result saying so is returned.
+        
+        Args:
+            tool_call: The tool call to execute
+            progress_callback: Receives updates the tool sends with Tool.report_progress
+            cancellation_token: Cancels the call when the run is stopped
+        """
+        token = tool_progress_callback.set(progress_callback)
         try:
             function_name = tool_call["function_name"]
             arguments = tool_call["arguments"]
@@ -1056,27 +1130,108 @@ class ResponseProcessor:
                 except json.JSONDecodeError:
                     arguments = {"text": arguments}
             
-            # Get available functions from tool registry
-            available_functions = self.tool_registry.get_available_functions()
-            
-            # Look up the function by name
-            tool_fn = available_functions.get(function_name)
-            if not tool_fn:
+            # Look up the compiled dispatch entry by name
+            dispatch = self.tool_registry.get_dispatch(function_name)
+            if not dispatch:
                 logger.error(f"Tool function '{function_name}' not found in registry")
                 return ToolResult(success=False, output=f"Tool function '{function_name}' not found")
             
-            logger.debug(f"Found tool function for '{function_name}', executing...")
-            result = await tool_fn(**arguments)
+            # Reject bad arguments before the tool does any I/O
+            try:
+                arguments = dispatch.coerce_arguments(arguments if isinstance(arguments, dict) else {})
+            except ToolArgumentError as e:
+                logger.warning(f"Invalid arguments for tool {function_name}: {str(e)}")
+                return ToolResult(success=False, output=f"Invalid arguments for {function_name}: {str(e)}")
+            
+            if cancellation_token and cancellation_token.cancelled:
+                return ToolResult(success=False, output=f"Tool '{function_name}' was not run because the run was stopped")
+            
+            # Idempotent tools may answer from the result cache
+            cache_policy = dispatch.cache
+            if cache_policy:
+                scope = getattr(dispatch.instance, "project_id", None) or tool_cache.GLOBAL_SCOPE
+                key = tool_cache.cache_key(function_name, scope, tool_cache.normalize_arguments(dispatch.method, arguments))
+                cached = await tool_cache.get_cached_result(key, function_name)
+                if cached is not None:
+                    return cached
+            
+            timeout = dispatch.timeout or DEFAULT_TOOL_TIMEOUT
+            logger.debug(f"Found tool function for '{function_name}', executing with timeout {timeout}s...")
+            try:
+                result = await run_cancellable(dispatch.method(**arguments), cancellation_token, timeout)
+            except RunCancelled:
+                logger.info(f"Tool {function_name} cancelled because the run was stopped")
+                return ToolResult(success=False, output=f"Tool '{function_name}' was cancelled because the run was stopped")
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {function_name} timed out after {timeout}s")
+                return ToolResult(success=False, output=f"Tool '{function_name}' timed out after {timeout:g} seconds and was cancelled")
             logger.info(f"Tool execution complete: {function_name} -> {result}")
+            if cache_policy:
+                await tool_cache.store_result(key, function_name, cache_policy, result)
             return result
         except Exception as e:
             logger.error(f"Error executing tool {tool_call['function_name']}: {str(e)}", exc_info=True)
             return ToolResult(success=False, output=f"Error executing tool: {str(e)}")
+        finally:
+            tool_progress_callback.reset(token)
+
+    def _progress_callback(
+        self,
+        progress_queue: Optional[asyncio.Queue],
+        tool_index: int,
+        tool_call: Dict[str, Any]
+    ) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """Create the progress callback for one tool call, queueing updates for the stream."""
+        if progress_queue is None:
+            return None
+        return lambda data: progress_queue.put_nowait((tool_index, tool_call, data))
+
+    async def _stream_tool_progress(
+        self,
+        task: asyncio.Task,
+        progress_queue: asyncio.Queue,
+        thread_id: str,
+        thread_run_id: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield tool_progress status messages until task finishes.
+        
+        Progress messages are transient like content chunks: they are streamed to
+        the client but not saved to the thread.
+        """
+        while True:
+            if progress_queue.empty():
+                if task.done():
+                    return
+                getter = asyncio.ensure_future(progress_queue.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    continue
+                tool_index, tool_call, data = getter.result()
+            else:
+                tool_index, tool_call, data = progress_queue.get_nowait()
+
+            now = datetime.now(timezone.utc).isoformat()
+            content = {
+                "role": "assistant", "status_type": "tool_progress",
+                "function_name": tool_call.get("function_name"), "xml_tag_name": tool_call.get("xml_tag_name"),
+                "tool_index": tool_index, "tool_call_id": tool_call.get("id"),
+                "progress": data
+            }
+            yield {
+                "message_id": None, "thread_id": thread_id, "type": "status", "is_llm_message": False,
+                "content": json.dumps(content),
+                "metadata": json.dumps({"thread_run_id": thread_run_id}),
+                "created_at": now, "updated_at": now
+            }
 
     async def _execute_tools(
         self, 
         tool_calls: List[Dict[str, Any]], 
-        execution_strategy: ToolExecutionStrategy = "sequential"
+        execution_strategy: ToolExecutionStrategy = "sequential",
+        progress_queue: Optional[asyncio.Queue] = None,
+        max_parallel: int = DEFAULT_MAX_PARALLEL_TOOLS,
+        cancellation_token: Optional[CancellationToken] = None
     ) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls with the specified strategy.
         
@@ -1087,7 +1242,11 @@ class ResponseProcessor:
             tool_calls: List of tool calls to execute
             execution_strategy: Strategy for executing tools:
                 - "sequential": Execute tools one after another, waiting for each to complete
-                - "parallel": Execute all tools simultaneously for better performance 
+                - "parallel": Execute independent tools simultaneously for better performance 
+            progress_queue: Optional queue receiving (tool_index, tool_call, data) progress
+                updates, where tool_index is the call's position in tool_calls
+            max_parallel: Most tool calls touching the sandbox to run at once in parallel
+            cancellation_token: Cancels running and pending tools when the run is stopped
                 
         Returns:
             List of tuples containing the original tool call and its result
@@ -1095,14 +1254,14 @@ class ResponseProcessor:
         logger.info(f"Executing {len(tool_calls)} tools with strategy: {execution_strategy}")
             
         if execution_strategy == "sequential":
-            return await self._execute_tools_sequentially(tool_calls)
+            return await self._execute_tools_sequentially(tool_calls, progress_queue, cancellation_token)
         elif execution_strategy == "parallel":
-            return await self._execute_tools_in_parallel(tool_calls)
+            return await self._execute_tools_in_parallel(tool_calls, progress_queue, max_parallel, cancellation_token)
         else:
             logger.warning(f"Unknown execution strategy: {execution_strategy}, falling back to sequential")
-            return await self._execute_tools_sequentially(tool_calls)
+            return await self._execute_tools_sequentially(tool_calls, progress_queue, cancellation_token)
 
-    async def _execute_tools_sequentially(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
+    async def _execute_tools_sequentially(self, tool_calls: List[Dict[str, Any]], progress_queue: Optional[asyncio.Queue] = None, cancellation_token: Optional[CancellationToken] = None) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls sequentially and return results.
         
         This method executes tool calls one after another, waiting for each tool to complete
@@ -1110,6 +1269,8 @@ class ResponseProcessor:
         
         Args:
             tool_calls: List of tool calls to execute
+            progress_queue: Optional queue receiving progress updates from the tools
+            cancellation_token: Cancels running and pending tools when the run is stopped
             
         Returns:
             List of tuples containing the original tool call and its result
@@ -1127,7 +1288,7 @@ class ResponseProcessor:
                 logger.debug(f"Executing tool {index+1}/{len(tool_calls)}: {tool_name}")
                 
                 try:
-                    result = await self._execute_tool(tool_call)
+                    result = await self._execute_tool(tool_call, self._progress_callback(progress_queue, index, tool_call), cancellation_token)
                     results.append((tool_call, result))
                     logger.debug(f"Completed tool {tool_name} with success={result.success}")
                 except Exception as e:
@@ -1150,14 +1311,19 @@ class ResponseProcessor:
                             
             return (results if 'results' in locals() else []) + error_results
 
-    async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
+    async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]], progress_queue: Optional[asyncio.Queue] = None, max_parallel: int = DEFAULT_MAX_PARALLEL_TOOLS, cancellation_token: Optional[CancellationToken] = None) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls in parallel and return results.
         
-        This method executes all tool calls simultaneously using asyncio.gather, which
+        This method executes tool calls simultaneously using asyncio.gather, which
         can significantly improve performance when executing multiple independent tools.
+        Calls that conflict with earlier ones (e.g. two edits of the same file) wait
+        for them, so they still run in order.
         
         Args:
             tool_calls: List of tool calls to execute
+            progress_queue: Optional queue receiving progress updates from the tools
+            max_parallel: Most tool calls touching the sandbox to run at once
+            cancellation_token: Cancels running and pending tools when the run is stopped
             
         Returns:
             List of tuples containing the original tool call and its result
@@ -1170,7 +1336,11 @@ class ResponseProcessor:
             logger.info(f"Executing {len(tool_calls)} tools in parallel: {tool_names}")
             
             # Create tasks for all tool calls
-            tasks = [self._execute_tool(tool_call) for tool_call in tool_calls]
+            scheduler = ToolScheduler(max_parallel)
+            tasks = [
+                self._schedule_tool(scheduler, tool_call, self._progress_callback(progress_queue, index, tool_call), cancellation_token)
+                for index, tool_call in enumerate(tool_calls)
+            ]
             
             # Execute all tasks concurrently with error handling
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -1323,6 +1493,79 @@ class ResponseProcessor:
                 logger.error(f"Failed even with fallback message: {str(e2)}", exc_info=True)
                 return None # Return None on error
 
+    def _get_tool_instance(self, tool_call: Dict[str, Any]) -> Optional[Tool]:
+        """The tool instance that handles a tool call, if it is registered."""
+        dispatch = self.tool_registry.get_dispatch(tool_call.get("function_name", ""))
+        return dispatch.instance if dispatch else None
+
+    def _get_tool_accesses(self, tool_call: Dict[str, Any]) -> List[ResourceAccess]:
+        """Resources a tool call reads and writes, as declared with @tool_resources."""
+        dispatch = self.tool_registry.get_dispatch(tool_call.get("function_name", ""))
+        method = dispatch.method if dispatch else None
+        return resolve_accesses(getattr(method, "tool_resources", None), tool_call.get("arguments", {}))
+
+    def _schedule_tool(self, scheduler: ToolScheduler, tool_call: Dict[str, Any], progress_callback: Optional[Callable] = None, cancellation_token: Optional[CancellationToken] = None) -> asyncio.Task:
+        """Start a tool call as a task once the calls it conflicts with have finished."""
+        return scheduler.schedule(
+            self._get_tool_accesses(tool_call),
+            lambda: self._execute_tool(tool_call, progress_callback, cancellation_token),
+            tool_call.get("function_name", "unknown")
+        )
+
+    async def _save_full_output(self, tool_call: Dict[str, Any], content: str) -> Optional[str]:
+        """Store an oversized output with the tool that produced it, or else any tool that can store it."""
+        name = f"{tool_call.get('function_name', 'tool')}-{uuid.uuid4().hex[:12]}"
+        instance = self._get_tool_instance(tool_call)
+        candidates = [instance] if instance else []
+        for tool_info in list(self.tool_registry.tools.values()) + list(self.tool_registry.xml_tools.values()):
+            if all(tool_info["instance"] is not candidate for candidate in candidates):
+                candidates.append(tool_info["instance"])
+        for candidate in candidates:
+            try:
+                path = await candidate.save_full_output(name, content)
+            except Exception as e:
+                logger.warning(f"{candidate.__class__.__name__} failed to save full tool output: {str(e)}")
+                continue
+            if path:
+                return path
+        return None
+
+    async def _apply_output_budget(self, tool_call: Dict[str, Any], result: ToolResult, config: ProcessorConfig) -> ToolResult:
+        """Shorten a tool result whose output exceeds the configured budget.
+        
+        Results are saved to the thread and re-sent to the LLM on every later turn,
+        so an oversized output is replaced by its head and tail plus a note with its
+        size and where the full output was saved.
+        
+        Args:
+            tool_call: The tool call that produced the result
+            result: The result of the tool execution
+            config: Configuration with the output budget
+            
+        Returns:
+            The result, or a shortened copy of it
+        """
+        if not config.max_tool_output_chars or not isinstance(result, ToolResult):
+            return result
+        output = result.output if isinstance(result.output, str) else json.dumps(result.output)
+        if len(output) <= config.max_tool_output_chars:
+            return result
+
+        path = await self._save_full_output(tool_call, output)
+        head = output[:config.tool_output_head_chars]
+        tail = output[len(output) - config.tool_output_tail_chars:] if config.tool_output_tail_chars else ""
+        omitted = len(output) - len(head) - len(tail)
+        stats = f"{len(output)} characters, {output.count(chr(10)) + 1} lines"
+        if path:
+            note = (
+                f"[... {omitted} characters omitted. Full output ({stats}) saved to {path}. "
+                f"Read it in parts with read_file using start_line/end_line or byte_offset/byte_length ...]"
+            )
+        else:
+            note = f"[... {omitted} characters omitted from output ({stats}) ...]"
+        logger.info(f"Shortened output of {tool_call.get('function_name')} from {len(output)} characters; full output: {path}")
+        return ToolResult(success=result.success, output=f"{head}\n\n{note}\n\n{tail}")
+
     def _format_xml_tool_result(self, tool_call: Dict[str, Any], result: ToolResult) -> str:
         """Format a tool result wrapped in a <tool_result> tag.
 
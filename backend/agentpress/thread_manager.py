@@ -15,6 +15,7 @@ from typing import List, Dict, Any, Optional, Type, Union, AsyncGenerator, Liter
 from services.llm import make_llm_api_call
 from agentpress.tool import Tool
 from agentpress.tool_registry import ToolRegistry
+from agentpress.cancellation import CancellationToken, RunCancelled, run_cancellable
 from agentpress.context_manager import ContextManager
 from agentpress.response_processor import (
     ResponseProcessor,
@@ -161,7 +162,8 @@ class ThreadManager:
         include_xml_examples: bool = False,
         enable_thinking: Optional[bool] = False,
         reasoning_effort: Optional[str] = 'low',
-        enable_context_manager: bool = True
+        enable_context_manager: bool = True,
+        cancellation_token: Optional[CancellationToken] = None
     ) -> Union[Dict[str, Any], AsyncGenerator]:
         """Run a conversation thread with LLM integration and tool execution.
 
@@ -182,6 +184,7 @@ class ThreadManager:
             enable_thinking: Whether to enable thinking before making a decision
             reasoning_effort: The effort level for reasoning
             enable_context_manager: Whether to enable automatic context summarization.
+            cancellation_token: Stops the LLM call, running tools and auto-continue when the run is stopped
 
         Returns:
             An async generator yielding response chunks or error dict
@@ -301,8 +304,11 @@ Here are the XML tools available with examples:
                         last_user_index = i
 
                 # Insert temporary message before the last user message if it exists
+                # It changes every call, so it and what follows are kept out of the prompt cache
+                ephemeral_start = None
                 if temp_msg and last_user_index >= 0:
                     prepared_messages.extend(messages[:last_user_index])
+                    ephemeral_start = len(prepared_messages)
                     prepared_messages.append(temp_msg)
                     prepared_messages.extend(messages[last_user_index:])
                     logger.debug("Added temporary message before the last user message")
@@ -310,6 +316,7 @@ Here are the XML tools available with examples:
                     # If no user message or no temporary message, just add all messages
                     prepared_messages.extend(messages)
                     if temp_msg:
+                        ephemeral_start = len(prepared_messages)
                         prepared_messages.append(temp_msg)
                         logger.debug("Added temporary message to the end of prepared messages")
 
@@ -322,7 +329,7 @@ Here are the XML tools available with examples:
                 # 5. Make LLM API call
                 logger.debug("Making LLM API call")
                 try:
-                    llm_response = await make_llm_api_call(
+                    llm_response = await run_cancellable(make_llm_api_call(
                         prepared_messages, # Pass the potentially modified messages
                         llm_model,
                         temperature=llm_temperature,
@@ -331,10 +338,13 @@ Here are the XML tools available with examples:
                         tool_choice=tool_choice if processor_config.native_tool_calling else None,
                         stream=stream,
                         enable_thinking=enable_thinking,
-                        reasoning_effort=reasoning_effort
-                    )
+                        reasoning_effort=reasoning_effort,
+                        ephemeral_start=ephemeral_start
+                    ), cancellation_token)
                     logger.debug("Successfully received raw LLM API response stream/object")
 
+                except RunCancelled:
+                    raise
                 except Exception as e:
                     logger.error(f"Failed to make LLM API call: {str(e)}", exc_info=True)
                     raise
@@ -347,7 +357,8 @@ Here are the XML tools available with examples:
                         thread_id=thread_id,
                         config=processor_config,
                         prompt_messages=prepared_messages,
-                        llm_model=llm_model
+                        llm_model=llm_model,
+                        cancellation_token=cancellation_token
                     )
 
                     return response_generator
@@ -360,13 +371,21 @@ Here are the XML tools available with examples:
                             thread_id=thread_id,
                             config=processor_config,
                             prompt_messages=prepared_messages,
-                            llm_model=llm_model
+                            llm_model=llm_model,
+                            cancellation_token=cancellation_token
                         )
                         return response_generator # Return the generator
                     except Exception as e:
                         logger.error(f"Error setting up non-streaming response: {str(e)}", exc_info=True)
                         raise # Re-raise the exception to be caught by the outer handler
 
+            except RunCancelled as e:
+                logger.info(f"Run on thread {thread_id} stopped before the LLM responded")
+                return {
+                    "type": "status",
+                    "status": "stopped",
+                    "message": str(e) or "Run stopped"
+                }
             except Exception as e:
                 logger.error(f"Error in run_thread: {str(e)}", exc_info=True)
                 return {
@@ -382,12 +401,16 @@ Here are the XML tools available with examples:
                 # Reset auto_continue for this iteration
                 auto_continue = False
 
+                if cancellation_token and cancellation_token.cancelled:
+                    logger.info("Run stopped, not continuing")
+                    break
+
                 # Run the thread once, passing the potentially modified system prompt
                 # Pass temp_msg only on the first iteration
                 response_gen = await _run_once(temporary_message if auto_continue_count == 0 else None)
 
-                # Handle error responses
-                if isinstance(response_gen, dict) and "status" in response_gen and response_gen["status"] == "error":
+                # Handle error and stopped responses
+                if isinstance(response_gen, dict) and response_gen.get("status") in ("error", "stopped"):
                     yield response_gen
                     return
 
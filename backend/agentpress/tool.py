@@ -7,14 +7,20 @@ This module defines the base classes and decorators for creating tools in AgentP
 - Result containers for standardized tool outputs
 """
 
-from typing import Dict, Any, Union, Optional, List, Type
+from typing import Dict, Any, Union, Optional, List, Type, Callable
 from dataclasses import dataclass, field
 from abc import ABC
+from contextvars import ContextVar
 import json
 import inspect
 from enum import Enum
 from utils.logger import logger
 
+# Progress callback for the tool call being executed, set by the ResponseProcessor
+tool_progress_callback: ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = ContextVar(
+    "tool_progress_callback", default=None
+)
+
 class SchemaType(Enum):
     """Enumeration of supported schema types for tool definitions."""
     OPENAPI = "openapi"
@@ -77,10 +83,23 @@ class ToolSchema:
         schema_type (SchemaType): Type of schema (OpenAPI, XML, or Custom)
         schema (Dict[str, Any]): The actual schema definition
         xml_schema (XMLTagSchema, optional): XML-specific schema if applicable
+        timeout (float, optional): Seconds a call may run before it is cancelled
     """
     schema_type: SchemaType
     schema: Dict[str, Any]
     xml_schema: Optional[XMLTagSchema] = None
+    timeout: Optional[float] = None
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """How results of an idempotent tool method are cached.
+    
+    Attributes:
+        ttl (int): Seconds a cached result stays valid
+        max_size (int): Longest output, in characters, that is cached
+    """
+    ttl: int
+    max_size: int = 100_000
 
 @dataclass
 class ToolResult:
@@ -106,6 +125,8 @@ class Tool(ABC):
         get_schemas: Get all registered tool schemas
         success_response: Create a successful result
         fail_response: Create a failed result
+        report_progress: Stream an intermediate update for the running call
+        save_full_output: Store a result too large to keep in the thread
     """
     
     def __init__(self):
@@ -157,6 +178,34 @@ class Tool(ABC):
         logger.debug(f"Tool {self.__class__.__name__} returned failed result: {msg}")
         return ToolResult(success=False, output=msg)
 
+    def report_progress(self, data: Dict[str, Any]) -> None:
+        """Send an intermediate update for the running tool call to the client stream.
+        
+        Updates are transient: they are streamed as tool_progress status messages
+        but not saved to the thread. Does nothing outside of a tool call.
+        
+        Args:
+            data: JSON-serializable progress payload
+        """
+        callback = tool_progress_callback.get()
+        if callback is not None:
+            callback(data)
+
+    async def save_full_output(self, name: str, content: str) -> Optional[str]:
+        """Store the full output of a result that is too large for the thread.
+        
+        Called by the ResponseProcessor before it shortens an oversized result.
+        Tools with somewhere to keep files override this.
+        
+        Args:
+            name: Unique name for the stored output
+            content: The complete result output
+            
+        Returns:
+            Where the output was stored, as a path the agent can read back, or None if the tool cannot store it
+        """
+        return None
+
 def _add_schema(func, schema: ToolSchema):
     """Helper to add schema to a function."""
     if not hasattr(func, 'tool_schemas'):
@@ -165,20 +214,27 @@ def _add_schema(func, schema: ToolSchema):
     logger.debug(f"Added {schema.schema_type.value} schema to function {func.__name__}")
     return func
 
-def openapi_schema(schema: Dict[str, Any]):
-    """Decorator for OpenAPI schema tools."""
+def openapi_schema(schema: Dict[str, Any], timeout: Optional[float] = None):
+    """Decorator for OpenAPI schema tools.
+    
+    Args:
+        schema: OpenAPI function schema
+        timeout: Seconds a call may run before it is cancelled (default: the processor's limit)
+    """
     def decorator(func):
         logger.debug(f"Applying OpenAPI schema to function {func.__name__}")
         return _add_schema(func, ToolSchema(
             schema_type=SchemaType.OPENAPI,
-            schema=schema
+            schema=schema,
+            timeout=timeout
         ))
     return decorator
 
 def xml_schema(
     tag_name: str,
     mappings: List[Dict[str, Any]] = None,
-    example: str = None
+    example: str = None,
+    timeout: Optional[float] = None
 ):
     """
     Decorator for XML schema tools with improved node mapping.
@@ -191,6 +247,7 @@ def xml_schema(
             - path: Path to the node (default "." for root)
             - required: Whether the parameter is required (default True)
         example: Optional example showing how to use the XML tag
+        timeout: Seconds a call may run before it is cancelled (default: the processor's limit)
     
     Example:
         @xml_schema(
@@ -225,7 +282,8 @@ def xml_schema(
         return _add_schema(func, ToolSchema(
             schema_type=SchemaType.XML,
             schema={},  # OpenAPI schema could be added here if needed
-            xml_schema=xml_schema
+            xml_schema=xml_schema,
+            timeout=timeout
         ))
     return decorator
 
@@ -238,3 +296,40 @@ def custom_schema(schema: Dict[str, Any]):
             schema=schema
         ))
     return decorator
+
+def tool_resources(reads: Optional[List[str]] = None, writes: Optional[List[str]] = None):
+    """
+    Decorator declaring the resources a tool method reads and writes.
+    
+    Used by the ResponseProcessor to run independent tool calls in parallel while
+    keeping conflicting ones in order; see agentpress.tool_scheduler for the
+    resource format.
+    
+    Example:
+        @tool_resources(writes=["path:{file_path}"])
+    """
+    def decorator(func):
+        func.tool_resources = {"reads": list(reads or []), "writes": list(writes or [])}
+        return func
+    return decorator
+
+def cache_result(ttl: int, max_size: int = 100_000):
+    """
+    Decorator marking a tool method as idempotent so its results can be cached.
+    
+    Successful results are stored in Redis, keyed by the function name, the
+    tool's project and the normalized arguments, and returned for identical
+    calls within ttl seconds without running the method; see
+    agentpress.tool_cache.
+    
+    Args:
+        ttl: Seconds a cached result stays valid
+        max_size: Results with longer output are not cached
+    
+    Example:
+        @cache_result(ttl=3600)
+    """
+    def decorator(func):
+        func.tool_cache = ToolCachePolicy(ttl=ttl, max_size=max_size)
+        return func
+    return decorator
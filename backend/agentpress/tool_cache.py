@@ -0,0 +1,107 @@
+"""
+Result cache for idempotent tool calls.
+
+Tool methods opt in with the @cache_result decorator. Their successful results
+are stored in Redis under the function name, the project of the tool instance
+and a hash of the normalized arguments, so repeating a web search, a scrape of
+the same URL or the same data provider call within the TTL, in the same run or a
+later run of the project, returns the stored result without calling out again.
+Hits and misses are counted per function in a Redis hash shared by all workers.
+"""
+
+import hashlib
+import inspect
+import json
+from typing import Any, Callable, Dict, Optional
+
+from agentpress.tool import ToolCachePolicy, ToolResult
+from services import redis
+from utils.logger import logger
+
+CACHE_KEY_PREFIX = "tool_cache:"
+STATS_KEY = "tool_cache_stats"
+# Tools without a project share their cached results
+GLOBAL_SCOPE = "global"
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        # JSON passed as a string, e.g. a data provider payload, compares by content
+        if value[:1] in ("{", "["):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        return value
+    if isinstance(value, dict):
+        return {key: _normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(item) for item in value]
+    return value
+
+
+def normalize_arguments(method: Callable, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments with defaults filled in and strings trimmed, so equivalent calls compare equal"""
+    try:
+        bound = inspect.signature(method).bind(**arguments)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except TypeError:
+        pass
+    return {name: _normalize_value(value) for name, value in arguments.items()}
+
+
+def cache_key(function_name: str, scope: str, arguments: Dict[str, Any]) -> str:
+    encoded = json.dumps(arguments, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    return f"{CACHE_KEY_PREFIX}{function_name}:{scope}:{digest}"
+
+
+async def _count(function_name: str, outcome: str) -> None:
+    try:
+        await redis.hincrby(STATS_KEY, f"{function_name}:{outcome}")
+    except Exception as e:
+        logger.debug(f"Could not record tool cache {outcome} for {function_name}: {str(e)}")
+
+
+async def get_cached_result(key: str, function_name: str) -> Optional[ToolResult]:
+    """The stored result for key, or None on a miss or when Redis is unavailable"""
+    try:
+        value = await redis.get(key)
+    except Exception as e:
+        logger.warning(f"Could not read tool cache for {function_name}: {str(e)}")
+        return None
+    if value is None:
+        await _count(function_name, "misses")
+        return None
+    await _count(function_name, "hits")
+    logger.info(f"Tool cache hit for {function_name}")
+    stored = json.loads(value)
+    return ToolResult(success=stored["success"], output=stored["output"])
+
+
+async def store_result(key: str, function_name: str, policy: ToolCachePolicy, result: ToolResult) -> None:
+    """Store a successful result that fits the policy's size limit"""
+    if not isinstance(result, ToolResult) or not result.success:
+        return
+    if len(result.output) > policy.max_size:
+        logger.debug(f"Not caching {function_name} result of {len(result.output)} characters (limit {policy.max_size})")
+        return
+    try:
+        await redis.set(key, json.dumps({"success": result.success, "output": result.output}), ex=policy.ttl)
+    except Exception as e:
+        logger.warning(f"Could not store tool cache for {function_name}: {str(e)}")
+
+
+async def get_tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hits, misses and hit rate per cached function, across all workers"""
+    counts = await redis.hgetall(STATS_KEY)
+    stats: Dict[str, Dict[str, Any]] = {}
+    for field, value in counts.items():
+        function_name, _, outcome = field.rpartition(":")
+        stats.setdefault(function_name, {"hits": 0, "misses": 0})[outcome] = int(value)
+    for entry in stats.values():
+        total = entry["hits"] + entry["misses"]
+        entry["hit_rate"] = round(entry["hits"] / total, 3) if total else 0.0
+    return stats
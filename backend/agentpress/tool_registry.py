@@ -1,8 +1,161 @@
-from typing import Dict, Type, Any, List, Optional, Callable
-from agentpress.tool import Tool, SchemaType, ToolSchema
+import inspect
+import json
+import typing
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Type, Any, List, Optional, Callable, Mapping
+from agentpress.tool import Tool, SchemaType, ToolSchema, ToolCachePolicy
 from utils.logger import logger
 
 
+class ToolArgumentError(ValueError):
+    """Raised when tool call arguments do not match the tool's parameters."""
+
+
+_BOOLEAN_STRINGS = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+_ANNOTATION_TYPES = {int: "integer", float: "number", bool: "boolean", str: "string", list: "array", dict: "object"}
+
+
+def _coerce_value(name: str, value: Any, param_type: Optional[str]) -> Any:
+    """Convert one argument to its declared JSON schema type."""
+    if value is None or param_type is None:
+        return value
+    try:
+        if param_type == "integer" and not isinstance(value, bool):
+            if isinstance(value, int):
+                return value
+            number = float(value)
+            if number.is_integer():
+                return int(number)
+        elif param_type == "number" and not isinstance(value, bool):
+            return value if isinstance(value, (int, float)) else float(value)
+        elif param_type == "boolean":
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.strip().lower() in _BOOLEAN_STRINGS:
+                return _BOOLEAN_STRINGS[value.strip().lower()]
+        elif param_type in ("array", "object"):
+            if isinstance(value, str):
+                # XML arguments carry JSON; other text is left for the tool to interpret
+                try:
+                    return json.loads(value)
+                except json.JSONDecodeError:
+                    return value
+            return value
+        elif param_type == "string":
+            return value if isinstance(value, str) else json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        else:
+            return value
+    except (TypeError, ValueError):
+        pass
+    raise ToolArgumentError(f"Argument '{name}' must be of type {param_type}, got {value!r}")
+
+
+def _annotation_type(annotation: Any) -> Optional[str]:
+    """JSON schema type of a simple parameter annotation such as Optional[int]."""
+    if typing.get_origin(annotation) is typing.Union:
+        types = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(types) != 1:
+            return None
+        annotation = types[0]
+    return _ANNOTATION_TYPES.get(typing.get_origin(annotation) or annotation)
+
+
+@dataclass(frozen=True)
+class ToolDispatch:
+    """Everything needed to call one tool function, compiled at registration.
+    
+    Attributes:
+        function_name: Name of the tool method
+        instance: Tool instance the method belongs to
+        method: Bound method to call
+        schemas: Schemas declared on the method
+        parameter_types: JSON schema type of each parameter, where known
+        required: Parameters without a default value
+        accepts_any: Whether the method takes **kwargs
+        enums: Allowed values of enum parameters
+    """
+    function_name: str
+    instance: Tool
+    method: Callable
+    schemas: tuple
+    parameter_types: Mapping[str, Optional[str]]
+    required: frozenset
+    accepts_any: bool
+    enums: Mapping[str, tuple]
+
+    @property
+    def timeout(self) -> Optional[float]:
+        """Longest timeout declared on the method's schemas."""
+        timeouts = [schema.timeout for schema in self.schemas if schema.timeout]
+        return max(timeouts) if timeouts else None
+
+    @property
+    def cache(self) -> Optional[ToolCachePolicy]:
+        """Caching policy declared with @cache_result, if the method's results may be cached."""
+        return getattr(self.method, "tool_cache", None)
+
+    def coerce_arguments(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate arguments and convert them to the declared parameter types.
+        
+        Raises:
+            ToolArgumentError: An argument is unknown, missing or of the wrong type
+        """
+        missing = [name for name in self.required if name not in arguments]
+        if missing:
+            raise ToolArgumentError(f"Missing required argument(s): {', '.join(sorted(missing))}")
+        coerced = {}
+        for name, value in arguments.items():
+            if name not in self.parameter_types:
+                if not self.accepts_any:
+                    raise ToolArgumentError(
+                        f"Unexpected argument '{name}'; expected one of: {', '.join(self.parameter_types)}"
+                    )
+                coerced[name] = value
+                continue
+            value = _coerce_value(name, value, self.parameter_types[name])
+            if name in self.enums and value is not None and value not in self.enums[name]:
+                raise ToolArgumentError(f"Argument '{name}' must be one of {list(self.enums[name])}, got {value!r}")
+            coerced[name] = value
+        return coerced
+
+    @classmethod
+    def compile(cls, function_name: str, instance: Tool, schemas: List[ToolSchema]) -> "ToolDispatch":
+        method = getattr(instance, function_name)
+        properties = {}
+        for schema in schemas:
+            if schema.schema_type == SchemaType.OPENAPI:
+                properties = schema.schema.get("function", {}).get("parameters", {}).get("properties", {})
+
+        parameter_types = {}
+        required = set()
+        accepts_any = False
+        for name, parameter in inspect.signature(method).parameters.items():
+            if parameter.kind == inspect.Parameter.VAR_KEYWORD:
+                accepts_any = True
+                continue
+            if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+                continue
+            declared = properties.get(name, {}).get("type")
+            parameter_types[name] = declared if isinstance(declared, str) else _annotation_type(parameter.annotation)
+            if parameter.default is inspect.Parameter.empty:
+                required.add(name)
+        enums = {
+            name: tuple(spec["enum"]) for name, spec in properties.items()
+            if name in parameter_types and isinstance(spec.get("enum"), list)
+        }
+        return cls(
+            function_name=function_name,
+            instance=instance,
+            method=method,
+            schemas=tuple(schemas),
+            parameter_types=MappingProxyType(parameter_types),
+            required=frozenset(required),
+            accepts_any=accepts_any,
+            enums=MappingProxyType(enums)
+        )
+
+
 class ToolRegistry:
     """Registry for managing and accessing tools.
     
@@ -12,9 +165,11 @@ class ToolRegistry:
     Attributes:
         tools (Dict[str, Dict[str, Any]]): OpenAPI-style tools and schemas
         xml_tools (Dict[str, Dict[str, Any]]): XML-style tools and schemas
+        dispatch_table (Mapping[str, ToolDispatch]): Read-only function name -> dispatch entry
         
     Methods:
         register_tool: Register a tool with optional function filtering
+        get_dispatch: Get the compiled dispatch entry of a function
         get_tool: Get a specific tool by name
         get_xml_tool: Get a tool by XML tag name
         get_openapi_schemas: Get OpenAPI schemas for function calling
@@ -25,6 +180,8 @@ class ToolRegistry:
         """Initialize a new ToolRegistry instance."""
         self.tools = {}
         self.xml_tools = {}
+        self._dispatch: Dict[str, ToolDispatch] = {}
+        self.dispatch_table: Mapping[str, ToolDispatch] = MappingProxyType(self._dispatch)
         logger.debug("Initialized new ToolRegistry instance")
     
     def register_tool(self, tool_class: Type[Tool], function_names: Optional[List[str]] = None, **kwargs):
@@ -50,6 +207,7 @@ class ToolRegistry:
         
         for func_name, schema_list in schemas.items():
             if function_names is None or func_name in function_names:
+                self._dispatch[func_name] = ToolDispatch.compile(func_name, tool_instance, schema_list)
                 for schema in schema_list:
                     if schema.schema_type == SchemaType.OPENAPI:
                         self.tools[func_name] = {
@@ -70,28 +228,24 @@ class ToolRegistry:
         
         logger.debug(f"Tool registration complete for {tool_class.__name__}: {registered_openapi} OpenAPI functions, {registered_xml} XML tags")
 
+    def get_dispatch(self, function_name: str) -> Optional[ToolDispatch]:
+        """Get the compiled dispatch entry of a tool function.
+        
+        Args:
+            function_name: Name of the tool function
+            
+        Returns:
+            The dispatch entry, or None if no such function is registered
+        """
+        return self._dispatch.get(function_name)
+
     def get_available_functions(self) -> Dict[str, Callable]:
         """Get all available tool functions.
         
         Returns:
             Dict mapping function names to their implementations
         """
-        available_functions = {}
-        
-        # Get OpenAPI tool functions
-        for tool_name, tool_info in self.tools.items():
-            tool_instance = tool_info['instance']
-            function_name = tool_name
-            function = getattr(tool_instance, function_name)
-            available_functions[function_name] = function
-            
-        # Get XML tool functions
-        for tag_name, tool_info in self.xml_tools.items():
-            tool_instance = tool_info['instance']
-            method_name = tool_info['method']
-            function = getattr(tool_instance, method_name)
-            available_functions[method_name] = function
-            
+        available_functions = {name: dispatch.method for name, dispatch in self._dispatch.items()}
         logger.debug(f"Retrieved {len(available_functions)} available functions")
         return available_functions
 
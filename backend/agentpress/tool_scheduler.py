@@ -0,0 +1,118 @@
+"""
+Conflict-aware scheduling of tool calls.
+
+Tool methods declare the resources they read and write with the
+@tool_resources decorator. When tool calls run in parallel, a call waits for
+every earlier call it conflicts with (both touch the same resource and at least
+one writes it), so conflicting calls run in the order the LLM emitted them while
+independent calls run concurrently.
+
+Resources are written as "kind" or "kind:key", where the key may refer to a
+call argument, e.g. "path:{file_path}":
+- path:<path>   A workspace path; covers everything below it
+- job:<id>      A background job of the shell tool
+- browser:<id>  A browser context
+- sandbox       The whole sandbox, e.g. for shell commands
+A kind without a key (or whose key argument was not given) covers every key of
+that kind.
+"""
+
+import asyncio
+import posixpath
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import logger
+
+# Calls touching the sandbox that may run at the same time
+DEFAULT_MAX_PARALLEL_TOOLS = 4
+
+TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+
+@dataclass(frozen=True)
+class ResourceAccess:
+    kind: str
+    key: Optional[str]  # None covers every key of the kind
+    write: bool
+
+
+def _normalize_path(path: str) -> str:
+    """Compare paths relative to the workspace root"""
+    path = posixpath.normpath(str(path).strip()).lstrip("/")
+    if path == "workspace" or path.startswith("workspace/"):
+        path = path[len("workspace"):].lstrip("/")
+    return "" if path == "." else path
+
+
+def _resolve(resource: str, arguments: Dict[str, Any], write: bool) -> ResourceAccess:
+    kind, _, template = resource.partition(":")
+    key = None
+    if template:
+        fields = TEMPLATE_FIELD.findall(template)
+        if all(arguments.get(name) not in (None, "") for name in fields):
+            key = TEMPLATE_FIELD.sub(lambda match: str(arguments[match.group(1)]), template)
+            if kind == "path":
+                key = _normalize_path(key)
+    return ResourceAccess(kind=kind, key=key, write=write)
+
+
+def resolve_accesses(resources: Optional[Dict[str, List[str]]], arguments: Dict[str, Any]) -> List[ResourceAccess]:
+    """Resource accesses of one tool call from its method's declaration and arguments"""
+    if not resources:
+        return []
+    arguments = arguments if isinstance(arguments, dict) else {}
+    return [_resolve(resource, arguments, False) for resource in resources.get("reads", [])] + \
+        [_resolve(resource, arguments, True) for resource in resources.get("writes", [])]
+
+
+def _overlaps(a: ResourceAccess, b: ResourceAccess) -> bool:
+    # The whole sandbox covers everything in it; browsers keep their own state
+    if a.kind == "sandbox" or b.kind == "sandbox":
+        return "browser" not in (a.kind, b.kind)
+    if a.kind != b.kind:
+        return False
+    if a.key is None or b.key is None or a.key == b.key:
+        return True
+    if a.kind == "path":
+        return a.key == "" or b.key == "" or a.key.startswith(b.key + "/") or b.key.startswith(a.key + "/")
+    return False
+
+
+def conflicts(first: List[ResourceAccess], second: List[ResourceAccess]) -> bool:
+    return any((a.write or b.write) and _overlaps(a, b) for a in first for b in second)
+
+
+class ToolScheduler:
+    """Starts tool calls in emission order, holding each back until the calls it conflicts with are done.
+
+    Calls that declare resources share a limit on how many run at once. With
+    sequential=True every call waits for all earlier ones.
+    """
+
+    def __init__(self, max_parallel: int = DEFAULT_MAX_PARALLEL_TOOLS, sequential: bool = False):
+        self.sequential = sequential
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._scheduled: List[Tuple[List[ResourceAccess], asyncio.Task]] = []
+
+    def schedule(self, accesses: List[ResourceAccess], run: Callable[[], Awaitable[Any]], name: str = "tool") -> asyncio.Task:
+        """Create a task that runs the call once nothing it conflicts with is pending"""
+        self._scheduled = [(scheduled, task) for scheduled, task in self._scheduled if not task.done()]
+        if self.sequential:
+            dependencies = [task for _, task in self._scheduled]
+        else:
+            dependencies = [task for scheduled, task in self._scheduled if conflicts(scheduled, accesses)]
+        if dependencies:
+            logger.debug(f"Tool call {name} waits for {len(dependencies)} conflicting earlier call(s)")
+        task = asyncio.create_task(self._run(dependencies, accesses, run))
+        self._scheduled.append((accesses, task))
+        return task
+
+    async def _run(self, dependencies: List[asyncio.Task], accesses: List[ResourceAccess], run: Callable[[], Awaitable[Any]]) -> Any:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        if not accesses:
+            return await run()
+        async with self._semaphore:
+            return await run()
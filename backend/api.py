@@ -69,6 +69,10 @@ async def lifespan(app: FastAPI):
         logger.info("Cleaning up agent resources")
         await agent_api.cleanup()
         
+        # Close pooled LLM provider connections
+        from services.llm import close_pooled_clients
+        await close_pooled_clients()
+        
         # Clean up Redis connection
         try:
             logger.info("Closing Redis connection")
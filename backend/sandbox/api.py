@@ -1,13 +1,19 @@
 import os
-from typing import List, Optional
+import asyncio
+import base64
+import re
+import shlex
+from typing import List, Optional, Tuple
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, APIRouter, Form, Depends, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from utils.logger import logger
 from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stream_auth, get_optional_user_id
 from sandbox.sandbox import get_or_start_sandbox
+from sandbox.manifest import mark_workspace_stale
+from sandbox.uploads import SandboxUploader
 from services.supabase import DBConnection
 from agent.api import get_or_create_project_sandbox
 
@@ -22,6 +28,11 @@ def initialize(_db: DBConnection):
     db = _db
     logger.info("Initialized sandbox API with database connection")
 
+# Ranged and large reads are cut inside the sandbox and streamed in chunks of this size
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
 class FileInfo(BaseModel):
     """Model for file information"""
     name: str
@@ -129,14 +140,13 @@ async def create_file(
         # Get sandbox using the safer method
         sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
         
-        # Read file content directly from the uploaded file
-        content = await file.read()
-        
-        # Create file using raw binary content
-        sandbox.fs.upload_file(path, content)
-        logger.info(f"File created at {path} in sandbox {sandbox_id}")
+        # Stream the upload in chunks and verify it against the sandbox's size and hash
+        result = await SandboxUploader(sandbox, sandbox_id).upload(file, path)
+        if not result.success:
+            raise RuntimeError(result.error)
+        logger.info(f"File {'unchanged' if result.skipped else 'created'} at {path} in sandbox {sandbox_id}")
         
-        return {"status": "success", "created": True, "path": path}
+        return {"status": "success", "created": not result.skipped, "path": path, "size": result.size, "sha256": result.hash}
     except Exception as e:
         logger.error(f"Error creating file in sandbox {sandbox_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -174,6 +184,7 @@ async def create_file_json(
         
         # Create file
         sandbox.fs.upload_file(path, content)
+        mark_workspace_stale(sandbox_id)
         logger.info(f"File created at {path} in sandbox {sandbox_id}")
         
         return {"status": "success", "created": True, "path": path}
@@ -223,6 +234,44 @@ async def list_files(
         logger.error(f"Error listing files in sandbox {sandbox_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range 'bytes=' header into inclusive (start, end), or None if unsatisfiable"""
+    match = RANGE_HEADER.match(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)) or size == 0:
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
+
+async def read_sandbox_bytes(sandbox, path: str, offset: int, length: int) -> bytes:
+    """Read a byte slice of a sandbox file without downloading the rest of it"""
+    command = f"tail -c +{offset + 1} {shlex.quote(path)} | head -c {length} | base64 -w0"
+    response = await asyncio.to_thread(
+        sandbox.process.exec, f"/bin/sh -c {shlex.quote(command)}", timeout=120
+    )
+    if response.exit_code != 0:
+        raise RuntimeError(f"Failed to read {path} at offset {offset}: {response.result}")
+    return base64.b64decode(response.result.strip())
+
+async def stream_sandbox_file(sandbox, path: str, start: int, end: int):
+    """Yield the inclusive byte range [start, end] of a sandbox file chunk by chunk"""
+    offset = start
+    while offset <= end:
+        chunk = await read_sandbox_bytes(sandbox, path, offset, min(STREAM_CHUNK_SIZE, end - offset + 1))
+        if not chunk:
+            break
+        yield chunk
+        offset += len(chunk)
+
 @router.get("/sandboxes/{sandbox_id}/files/content")
 async def read_file(
     sandbox_id: str, 
@@ -230,7 +279,13 @@ async def read_file(
     request: Request = None,
     user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    """Read a file from the sandbox"""
+    """
+    Read a file from the sandbox.
+    
+    Supports a single HTTP byte range ("Range: bytes=start-end"). Ranged reads and
+    files larger than STREAM_CHUNK_SIZE are streamed, so the backend never holds
+    more than one chunk in memory.
+    """
     logger.info(f"Received file read request for sandbox {sandbox_id}, path: {path}, user_id: {user_id}")
     client = await db.client
     
@@ -241,16 +296,52 @@ async def read_file(
         # Get sandbox using the safer method
         sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
         
-        # Read file
-        content = sandbox.fs.download_file(path)
+        file_info = await asyncio.to_thread(sandbox.fs.get_file_info, path)
+        size = file_info.size
+        filename = os.path.basename(path)
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Accept-Ranges": "bytes"
+        }
+        
+        range_header = request.headers.get("range") if request is not None else None
+        if range_header:
+            byte_range = parse_range_header(range_header, size)
+            if byte_range is None:
+                return Response(
+                    status_code=416,
+                    headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"}
+                )
+            start, end = byte_range
+            logger.info(f"Streaming bytes {start}-{end}/{size} of {filename} from sandbox {sandbox_id}")
+            return StreamingResponse(
+                stream_sandbox_file(sandbox, path, start, end),
+                status_code=206,
+                media_type="application/octet-stream",
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(end - start + 1)
+                }
+            )
+        
+        if size > STREAM_CHUNK_SIZE:
+            logger.info(f"Streaming {filename} ({size} bytes) from sandbox {sandbox_id}")
+            return StreamingResponse(
+                stream_sandbox_file(sandbox, path, 0, size - 1),
+                media_type="application/octet-stream",
+                headers={**headers, "Content-Length": str(size)}
+            )
+        
+        # Small files are fetched in one call
+        content = await asyncio.to_thread(sandbox.fs.download_file, path)
         
         # Return a Response object with the content directly
-        filename = os.path.basename(path)
         logger.info(f"Successfully read file {filename} from sandbox {sandbox_id}")
         return Response(
             content=content,
             media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers
         )
     except Exception as e:
         logger.error(f"Error reading file in sandbox {sandbox_id}: {str(e)}")
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Body
-from playwright.async_api import async_playwright, Browser, Page, ElementHandle
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, ElementHandle, Route
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Union
 import asyncio
@@ -7,15 +7,20 @@ import json
 import logging
 import re
 import base64
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from datetime import datetime
 import os
 import random
-from functools import cached_property
+import time
+from functools import cached_property, wraps
 import traceback
 import pytesseract
 from PIL import Image
 import io
+from urllib.parse import urlsplit
+from content_extraction import ContentExtractor, DEFAULT_MAX_CHARS
 
 #######################################################
 # Action model definitions
@@ -25,42 +30,46 @@ class Position(BaseModel):
     x: int
     y: int
 
-class ClickElementAction(BaseModel):
+class BrowserContextAction(BaseModel):
+    # Named browser context to run the action in; None means the default context
+    context_id: Optional[str] = None
+
+class ClickElementAction(BrowserContextAction):
     index: int
 
-class ClickCoordinatesAction(BaseModel):
+class ClickCoordinatesAction(BrowserContextAction):
     x: int
     y: int
 
-class GoToUrlAction(BaseModel):
+class GoToUrlAction(BrowserContextAction):
     url: str
 
-class InputTextAction(BaseModel):
+class InputTextAction(BrowserContextAction):
     index: int
     text: str
 
-class ScrollAction(BaseModel):
+class ScrollAction(BrowserContextAction):
     amount: Optional[int] = None
 
-class SendKeysAction(BaseModel):
+class SendKeysAction(BrowserContextAction):
     keys: str
 
-class SearchGoogleAction(BaseModel):
+class SearchGoogleAction(BrowserContextAction):
     query: str
 
-class SwitchTabAction(BaseModel):
+class SwitchTabAction(BrowserContextAction):
     page_id: int
 
-class OpenTabAction(BaseModel):
+class OpenTabAction(BrowserContextAction):
     url: str
 
-class CloseTabAction(BaseModel):
+class CloseTabAction(BrowserContextAction):
     page_id: int
 
-class NoParamsAction(BaseModel):
+class NoParamsAction(BrowserContextAction):
     pass
 
-class DragDropAction(BaseModel):
+class DragDropAction(BrowserContextAction):
     element_source: Optional[str] = None
     element_target: Optional[str] = None
     element_source_offset: Optional[Position] = None
@@ -76,6 +85,44 @@ class DoneAction(BaseModel):
     success: bool = True
     text: str = ""
 
+class CloseContextAction(BaseModel):
+    context_id: str
+
+class InterceptionProfileAction(BrowserContextAction):
+    profile: str
+
+# Parameter models for endpoints that take plain body fields, used by batches
+class WaitAction(BrowserContextAction):
+    seconds: int = 3
+
+class ExtractContentAction(BrowserContextAction):
+    goal: str
+    max_chars: int = DEFAULT_MAX_CHARS
+
+class ExtractUrlAction(BrowserContextAction):
+    url: str
+    goal: Optional[str] = None  # Without a goal the whole main content is returned
+    max_chars: int = 50_000
+
+class ScrollToTextAction(BrowserContextAction):
+    text: str
+
+class DropdownOptionsAction(BrowserContextAction):
+    index: int
+
+class SelectDropdownOptionAction(BrowserContextAction):
+    index: int
+    option_text: str
+
+class BatchStep(BaseModel):
+    action: str  # Name of an automation endpoint, e.g. "input_text"
+    params: Dict[str, Any] = {}
+    checkpoint: bool = False  # Capture browser state after this step
+
+class BatchAction(BrowserContextAction):
+    actions: List[BatchStep]
+    abort_on_failure: bool = True
+
 #######################################################
 # DOM Structure Models
 #######################################################
@@ -182,6 +229,63 @@ class DOMElementNode(DOMBaseNode):
         collect_text(self, 0)
         return '\n'.join(text_parts).strip()
     
+    def to_element_line(self, include_attributes: list[str] | None = None, max_text_length: int = 0) -> str:
+        """Format this element as a single `[index]<tag ...> text </>` line.
+        
+        Texts longer than max_text_length are truncated; 0 keeps the full text.
+        """
+        text = self.get_all_text_till_next_clickable_element()
+        
+        # Process attributes for display
+        display_attributes = []
+        if include_attributes:
+            for key, value in self.attributes.items():
+                if key in include_attributes and value and value != self.tag_name:
+                    if text and value in text:
+                        continue  # Skip if attribute value is already in the text
+                    display_attributes.append(str(value))
+        
+        attributes_str = ';'.join(display_attributes)
+        
+        # Build the element string
+        line = f'[{self.highlight_index}]<{self.tag_name}'
+        
+        # Add important attributes for identification
+        for attr_name in ['id', 'href', 'name', 'value', 'type']:
+            if attr_name in self.attributes and self.attributes[attr_name]:
+                line += f' {attr_name}="{truncate_text(self.attributes[attr_name], max_text_length)}"'
+        
+        # Add the text content if available
+        if text:
+            line += f'> {truncate_text(text, max_text_length)}'
+        elif attributes_str:
+            line += f'> {truncate_text(attributes_str, max_text_length)}'
+        else:
+            # If no text and no attributes, use the tag name
+            line += f'> {self.tag_name.upper()}'
+        
+        return line + ' </>'
+    
+    def viewport_distance(self, viewport_height: int) -> float:
+        """Vertical distance in pixels from the viewport, 0 when the element overlaps it"""
+        coords = self.viewport_coordinates
+        if coords is None or viewport_height <= 0:
+            return 0 if self.is_in_viewport else float('inf')
+        if coords.y + coords.height < 0:
+            return -(coords.y + coords.height)
+        if coords.y > viewport_height:
+            return coords.y - viewport_height
+        return 0
+    
+    def sibling_signature(self) -> tuple:
+        """Key shared by repetitive siblings such as the links of a long list"""
+        return (
+            self.tag_name,
+            self.attributes.get('class', ''),
+            self.attributes.get('role', ''),
+            self.attributes.get('type', '')
+        )
+    
     def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
         """Convert the processed DOM content to HTML."""
         formatted_text = []
@@ -190,39 +294,7 @@ class DOMElementNode(DOMBaseNode):
             if isinstance(node, DOMElementNode):
                 # Add element with highlight_index
                 if node.highlight_index is not None:
-                    attributes_str = ''
-                    text = node.get_all_text_till_next_clickable_element()
-                    
-                    # Process attributes for display
-                    display_attributes = []
-                    if include_attributes:
-                        for key, value in node.attributes.items():
-                            if key in include_attributes and value and value != node.tag_name:
-                                if text and value in text:
-                                    continue  # Skip if attribute value is already in the text
-                                display_attributes.append(str(value))
-                    
-                    attributes_str = ';'.join(display_attributes)
-                    
-                    # Build the element string
-                    line = f'[{node.highlight_index}]<{node.tag_name}'
-                    
-                    # Add important attributes for identification
-                    for attr_name in ['id', 'href', 'name', 'value', 'type']:
-                        if attr_name in node.attributes and node.attributes[attr_name]:
-                            line += f' {attr_name}="{node.attributes[attr_name]}"'
-                    
-                    # Add the text content if available
-                    if text:
-                        line += f'> {text}'
-                    elif attributes_str:
-                        line += f'> {attributes_str}'
-                    else:
-                        # If no text and no attributes, use the tag name
-                        line += f'> {node.tag_name.upper()}'
-                    
-                    line += ' </>'
-                    formatted_text.append(line)
+                    formatted_text.append(node.to_element_line(include_attributes))
                 
                 # Process children regardless
                 for child in node.children:
@@ -247,14 +319,359 @@ class DOMState:
     pixels_above: int = 0
     pixels_below: int = 0
 
+#######################################################
+# Element Serialization
+#######################################################
+
+# Approximate token budget for the element listing sent with every browser state
+ELEMENTS_TOKEN_BUDGET = int(os.getenv("BROWSER_ELEMENTS_TOKEN_BUDGET", "2000"))
+MAX_ELEMENT_TEXT_LENGTH = 80
+# Elements within this many viewport heights of the viewport count as near
+NEAR_VIEWPORT_SCREENS = 1.0
+# Runs of at least this many similar consecutive elements are collapsed,
+# keeping the first and last few
+SIBLING_COLLAPSE_THRESHOLD = 6
+SIBLING_COLLAPSE_KEEP_HEAD = 2
+SIBLING_COLLAPSE_KEEP_TAIL = 1
+
+def truncate_text(text: str, max_length: int) -> str:
+    text = ' '.join(text.split())
+    if max_length <= 0 or len(text) <= max_length:
+        return text
+    return text[:max_length - 1].rstrip() + '…'
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def element_line_key(line: str) -> str:
+    """Line without its index, so a shifted element still matches its previous line"""
+    return line.split(']', 1)[-1]
+
+@dataclass
+class SerializedElements:
+    text: str
+    shown_indices: List[int]
+    line_keys: set  # Keys of every element on the page, for the next diff
+    omitted: int = 0
+    changed: int = 0
+
+def serialize_elements_within_budget(
+    selector_map: Dict[int, DOMElementNode],
+    include_attributes: list[str] | None,
+    viewport_height: int,
+    token_budget: int = ELEMENTS_TOKEN_BUDGET,
+    previous_keys: Optional[set] = None,
+    changed_only: bool = False
+) -> SerializedElements:
+    """Serialize interactive elements so the listing stays within a token budget.
+    
+    In-viewport elements come first, then elements near the viewport, then the
+    rest of the page. Runs of repetitive siblings are collapsed to a summary line.
+    With previous_keys, elements that are new since the previous state are marked
+    with `*` and preferred over unchanged ones; changed_only drops unchanged ones.
+    """
+    indices = sorted(selector_map)
+    lines = {
+        index: selector_map[index].to_element_line(include_attributes, MAX_ELEMENT_TEXT_LENGTH)
+        for index in indices
+    }
+    line_keys = {element_line_key(line) for line in lines.values()}
+    changed = {
+        index for index in indices
+        if previous_keys is not None and element_line_key(lines[index]) not in previous_keys
+    }
+    near_px = viewport_height * NEAR_VIEWPORT_SCREENS
+    
+    def collapse_unit(members: List[int], tag_name: str) -> tuple:
+        if len(members) == 1:
+            return (members[0], lines[members[0]], members)
+        summary = f'... {len(members)} more similar <{tag_name}> elements [{members[0]}-{members[-1]}] collapsed ...'
+        return (members[0], summary, members)
+    
+    # Units are either one element or a collapsed run: (position, text, member indices)
+    units = []
+    position = 0
+    while position < len(indices):
+        signature = selector_map[indices[position]].sibling_signature()
+        end = position
+        while end + 1 < len(indices) and selector_map[indices[end + 1]].sibling_signature() == signature:
+            end += 1
+        run = indices[position:end + 1]
+        if len(run) >= SIBLING_COLLAPSE_THRESHOLD:
+            # Members in the viewport or changed since the previous state are
+            # still listed individually, the rest collapse into summary lines
+            collapsed = []
+            for offset, index in enumerate(run):
+                keep = (
+                    offset < SIBLING_COLLAPSE_KEEP_HEAD
+                    or offset >= len(run) - SIBLING_COLLAPSE_KEEP_TAIL
+                    or index in changed
+                    or selector_map[index].viewport_distance(viewport_height) == 0
+                )
+                if not keep:
+                    collapsed.append(index)
+                    continue
+                if collapsed:
+                    units.append(collapse_unit(collapsed, signature[0]))
+                    collapsed = []
+                units.append((index, lines[index], [index]))
+        else:
+            for index in run:
+                units.append((index, lines[index], [index]))
+        position = end + 1
+    
+    if changed_only and previous_keys is not None:
+        units = [unit for unit in units if any(index in changed for index in unit[2])]
+    
+    def priority(unit) -> tuple:
+        distance = min(selector_map[index].viewport_distance(viewport_height) for index in unit[2])
+        tier = 0 if distance == 0 else 1 if distance <= near_px else 2
+        is_changed = any(index in changed for index in unit[2])
+        return (tier, not is_changed, distance, unit[0])
+    
+    # Fill the budget by priority, then restore document order
+    selected = []
+    used = 0
+    for unit in sorted(units, key=priority):
+        cost = estimate_tokens(unit[1])
+        if used + cost > token_budget:
+            continue
+        selected.append(unit)
+        used += cost
+    selected.sort(key=lambda unit: unit[0])
+    
+    output = []
+    shown_indices = []
+    for _, text, members in selected:
+        if len(members) == 1:
+            shown_indices.append(members[0])
+            if members[0] in changed:
+                text = '*' + text
+        output.append(text)
+    
+    listed = sum(len(unit[2]) for unit in selected)
+    omitted = sum(len(unit[2]) for unit in units) - listed
+    if omitted:
+        output.append(f'... {omitted} more elements not shown, scroll to bring them into view ...')
+    if changed_only and previous_keys is not None:
+        unchanged = len(indices) - len(changed)
+        if unchanged:
+            output.append(f'... {unchanged} unchanged elements not repeated ...')
+    
+    text = '\n'.join(output)
+    return SerializedElements(
+        text=text if text.strip() else "No interactive elements found",
+        shown_indices=shown_indices,
+        line_keys=line_keys,
+        omitted=omitted,
+        changed=len(changed)
+    )
+
+#######################################################
+# Browser Context Models
+#######################################################
+
+DEFAULT_CONTEXT_ID = "default"
+
+# Upper bound on live browser contexts (including the default one) so parallel
+# tool calls cannot exhaust the sandbox's memory
+MAX_BROWSER_CONTEXTS = int(os.getenv("MAX_BROWSER_CONTEXTS", "4"))
+
+#######################################################
+# Request Interception Profiles
+#######################################################
+
+@dataclass
+class InterceptionProfile:
+    """Which requests a browser context aborts before they hit the network"""
+    name: str
+    blocked_resource_types: frozenset = frozenset()
+    block_trackers: bool = False
+
+INTERCEPTION_PROFILES: Dict[str, InterceptionProfile] = {
+    "full": InterceptionProfile(name="full"),
+    "no-media": InterceptionProfile(
+        name="no-media",
+        blocked_resource_types=frozenset({"image", "media", "font"}),
+        block_trackers=True
+    ),
+    "text-only": InterceptionProfile(
+        name="text-only",
+        blocked_resource_types=frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket"}),
+        block_trackers=True
+    ),
+}
+
+# Contexts load everything unless the caller opts in to blocking, so screenshots
+# show the page as a user would see it
+DEFAULT_INTERCEPTION_PROFILE = os.getenv("BROWSER_INTERCEPTION_PROFILE", "full")
+
+# Ad and tracker domains; subdomains are matched as well
+BLOCKED_DOMAINS = frozenset({
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "adsrvr.org",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "hotjar.com",
+    "mixpanel.com",
+    "segment.io",
+    "segment.com",
+    "optimizely.com",
+    "moatads.com",
+    "rubiconproject.com",
+    "pubmatic.com",
+    "openx.net",
+    "casalemedia.com",
+    "bidswitch.net",
+    "yieldmo.com",
+    "chartbeat.com",
+    "newrelic.com",
+    "nr-data.net",
+    "clarity.ms",
+    "bat.bing.com",
+    "ads.linkedin.com",
+    "analytics.tiktok.com",
+})
+
+# Aborted requests are never downloaded, so blocked bytes are estimated from
+# typical transfer sizes per resource type
+ESTIMATED_RESOURCE_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 15_000,
+    "script": 25_000,
+    "texttrack": 5_000,
+    "manifest": 2_000,
+}
+DEFAULT_ESTIMATED_RESOURCE_BYTES = 5_000
+
+def is_blocked_domain(url: str) -> bool:
+    """Check whether a URL's host is, or is a subdomain of, a blocked domain"""
+    host = (urlsplit(url).hostname or "").lower()
+    while host:
+        if host in BLOCKED_DOMAINS:
+            return True
+        _, _, host = host.partition(".")
+    return False
+
+@dataclass
+class BrowserContextSession:
+    """An isolated browser context with its own tabs and lock.
+
+    `leases` counts the requests currently using the context, including those
+    still waiting for its lock; a leased context is never evicted or closed.
+    """
+    context_id: str
+    context: BrowserContext
+    pages: List[Page] = field(default_factory=list)
+    current_page_index: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0
+    profile: InterceptionProfile = field(default_factory=lambda: INTERCEPTION_PROFILES["full"])
+    routed: bool = False
+    
+    # Blocked request counters, reset at the start of every action
+    requests_blocked: int = 0
+    bytes_blocked: int = 0
+    
+    # Element lines of the last captured state, used to mark changes
+    last_element_keys: Optional[set] = None
+    last_element_url: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "context_id": self.context_id,
+            "pages": [page.url for page in self.pages],
+            "current_page_index": self.current_page_index,
+            "interception_profile": self.profile.name,
+            "busy": self.leases > 0,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1)
+        }
+
+    def reset_interception_stats(self) -> None:
+        self.requests_blocked = 0
+        self.bytes_blocked = 0
+
+    async def handle_route(self, route: Route) -> None:
+        """Abort requests excluded by the context's interception profile"""
+        request = route.request
+        resource_type = request.resource_type
+        if resource_type in self.profile.blocked_resource_types or (
+            self.profile.block_trackers and is_blocked_domain(request.url)
+        ):
+            self.requests_blocked += 1
+            self.bytes_blocked += ESTIMATED_RESOURCE_BYTES.get(resource_type, DEFAULT_ESTIMATED_RESOURCE_BYTES)
+            await route.abort("blockedbyclient")
+            return
+        await route.continue_()
+
+# Session the current request operates on; set per request by with_browser_context
+_active_session: ContextVar[Optional[BrowserContextSession]] = ContextVar("active_browser_session", default=None)
+
+# Set while a batch runs so individual actions skip the DOM/screenshot/OCR capture
+_defer_state_capture: ContextVar[bool] = ContextVar("defer_state_capture", default=False)
+
+def with_browser_context(func):
+    """Run an endpoint inside the browser context named by its request.
+
+    The context id is taken from a `context_id` body field, either on the action
+    model or as a standalone parameter. Calls on the same context are serialized
+    by the context's lock; calls on different contexts run concurrently.
+    """
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        context_id = kwargs.get("context_id")
+        if not isinstance(context_id, str):
+            context_id = None
+            for value in list(args) + list(kwargs.values()):
+                if isinstance(value, BrowserContextAction):
+                    context_id = value.context_id
+                    break
+        async with self.use_context(context_id):
+            return await func(self, *args, **kwargs)
+    return wrapper
+
 #######################################################
 # Browser Action Result Model
 #######################################################
 
+class ExtractionResult(BaseModel):
+    success: bool = True
+    message: str = ""
+    error: str = ""
+    url: str = ""
+    title: str = ""
+    content: str = ""
+    chunks_total: int = 0
+    chunks_returned: int = 0
+    cached: bool = False  # Served from the extraction cache
+    reused_tab: bool = False  # Read from an open tab instead of loading the URL
+
 class BrowserActionResult(BaseModel):
     success: bool = True
     message: str = ""
     error: str = ""
+    context_id: Optional[str] = None
+    
+    # Request interception stats for this action
+    interception_profile: Optional[str] = None
+    requests_blocked: int = 0
+    bytes_blocked: int = 0  # Estimated, see ESTIMATED_RESOURCE_BYTES
     
     # Extended state information
     url: Optional[str] = None
@@ -266,8 +683,12 @@ class BrowserActionResult(BaseModel):
     content: Optional[str] = None
     ocr_text: Optional[str] = None  # Added field for OCR text
     
+    # Per-step results of a batch
+    steps: Optional[List[Dict[str, Any]]] = None
+    
     # Additional metadata
     element_count: int = 0  # Number of interactive elements found
+    elements_omitted: int = 0  # Elements left out of `elements` by the token budget
     interactive_elements: Optional[List[Dict[str, Any]]] = None  # Simplified list of interactive elements
     viewport_width: Optional[int] = None
     viewport_height: Optional[int] = None
@@ -283,9 +704,10 @@ class BrowserAutomation:
     def __init__(self):
         self.router = APIRouter()
         self.browser: Browser = None
-        self.pages: List[Page] = []
-        self.current_page_index: int = 0
+        self.contexts: Dict[str, BrowserContextSession] = {}
+        self._contexts_lock = asyncio.Lock()
         self.logger = logging.getLogger("browser_automation")
+        self.content_extractor = ContentExtractor()
         self.include_attributes = ["id", "href", "src", "alt", "aria-label", "placeholder", "name", "role", "title", "value"]
         self.screenshot_dir = os.path.join(os.getcwd(), "screenshots")
         os.makedirs(self.screenshot_dir, exist_ok=True)
@@ -326,6 +748,17 @@ class BrowserAutomation:
         
         # Drag and drop
         self.router.post("/automation/drag_drop")(self.drag_drop)
+        
+        # Batched actions
+        self.router.post("/automation/batch")(self.batch)
+        
+        # Content extraction without changing the browser state
+        self.router.post("/automation/extract_url")(self.extract_url)
+        
+        # Browser context management
+        self.router.get("/automation/contexts")(self.list_contexts)
+        self.router.post("/automation/close_context")(self.close_context)
+        self.router.post("/automation/set_interception_profile")(self.set_interception_profile)
 
     async def startup(self):
         """Initialize the browser instance on startup"""
@@ -351,21 +784,9 @@ class BrowserAutomation:
                 self.browser = await playwright.chromium.launch(**launch_options)
                 print("Browser launched with minimal options")
 
-            try:
-                await self.get_current_page()
-                print("Found existing page, using it")
-                self.current_page_index = 0
-            except Exception as page_error:
-                print(f"Error finding existing page, creating new one. ( {page_error})")
-                page = await self.browser.new_page()
-                print("New page created successfully")
-                self.pages.append(page)
-                self.current_page_index = 0
-                # Navigate to about:blank to ensure page is ready
-                # await page.goto("google.com", timeout=30000)
-                print("Navigated to google.com")
-                
-                print("Browser initialization completed successfully")
+            await self.create_context(DEFAULT_CONTEXT_ID)
+            print("Default browser context created successfully")
+            print("Browser initialization completed successfully")
         except Exception as e:
             print(f"Browser startup error: {str(e)}")
             traceback.print_exc()
@@ -373,15 +794,168 @@ class BrowserAutomation:
             
     async def shutdown(self):
         """Clean up browser instance on shutdown"""
+        for session in list(self.contexts.values()):
+            try:
+                await session.context.close()
+            except Exception as e:
+                print(f"Error closing browser context {session.context_id}: {e}")
+        self.contexts.clear()
         if self.browser:
             await self.browser.close()
     
+    async def create_context(self, context_id: str) -> BrowserContextSession:
+        """Create a new isolated browser context with a single blank page"""
+        context = await self.browser.new_context()
+        session = BrowserContextSession(context_id=context_id, context=context)
+        await self.apply_interception_profile(session, DEFAULT_INTERCEPTION_PROFILE)
+        session.pages.append(await context.new_page())
+        self.contexts[context_id] = session
+        print(f"Created browser context '{context_id}' ({len(self.contexts)}/{MAX_BROWSER_CONTEXTS})")
+        return session
+    
+    async def lease_context(self, context_id: Optional[str]) -> BrowserContextSession:
+        """Get a browser context by id, creating it if needed, and take a lease on it.
+        
+        The caller must give the lease back with release_context. When the context
+        cap is reached the least recently used context without leases is closed to
+        make room. If every context is leased the request is rejected.
+        """
+        context_id = context_id or DEFAULT_CONTEXT_ID
+        async with self._contexts_lock:
+            session = self.contexts.get(context_id)
+            if session is not None:
+                session.leases += 1
+                return session
+            if not self.browser:
+                raise HTTPException(status_code=500, detail="Browser not initialized")
+            
+            if len(self.contexts) >= MAX_BROWSER_CONTEXTS:
+                idle = [
+                    s for s in self.contexts.values()
+                    if s.context_id != DEFAULT_CONTEXT_ID and s.leases == 0
+                ]
+                if not idle:
+                    raise HTTPException(
+                        status_code=429,
+                        detail=f"Maximum of {MAX_BROWSER_CONTEXTS} browser contexts reached and all are busy"
+                    )
+                evicted = min(idle, key=lambda s: s.last_used)
+                print(f"Evicting idle browser context '{evicted.context_id}'")
+                self.contexts.pop(evicted.context_id, None)
+                try:
+                    await evicted.context.close()
+                except Exception as e:
+                    print(f"Error closing evicted browser context {evicted.context_id}: {e}")
+            
+            session = await self.create_context(context_id)
+            session.leases += 1
+            return session
+    
+    def release_context(self, session: BrowserContextSession) -> None:
+        """Give back a lease taken with lease_context"""
+        session.leases = max(session.leases - 1, 0)
+        session.last_used = time.monotonic()
+    
+    async def apply_interception_profile(self, session: BrowserContextSession, profile_name: str) -> None:
+        """Switch a context's interception profile, routing requests only when something is blocked"""
+        profile = INTERCEPTION_PROFILES.get(profile_name)
+        if profile is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown interception profile '{profile_name}'. Available: {', '.join(INTERCEPTION_PROFILES)}"
+            )
+        session.profile = profile
+        
+        # Routing disables the HTTP cache, so only route when the profile blocks something
+        needs_route = bool(profile.blocked_resource_types) or profile.block_trackers
+        if needs_route and not session.routed:
+            await session.context.route("**/*", session.handle_route)
+            session.routed = True
+        elif not needs_route and session.routed:
+            await session.context.unroute("**/*", session.handle_route)
+            session.routed = False
+    
+    @asynccontextmanager
+    async def use_context(self, context_id: Optional[str]):
+        """Make a browser context the active one for the current request, holding a lease and its lock"""
+        session = await self.lease_context(context_id)
+        try:
+            if _active_session.get() is session:
+                # Nested call from a batch that already holds this context's lock
+                yield session
+                return
+            async with session.lock:
+                session.last_used = time.monotonic()
+                session.reset_interception_stats()
+                token = _active_session.set(session)
+                try:
+                    yield session
+                finally:
+                    _active_session.reset(token)
+        finally:
+            self.release_context(session)
+    
+    def get_active_session(self) -> BrowserContextSession:
+        """Get the browser context for the current request, falling back to the default one"""
+        session = _active_session.get() or self.contexts.get(DEFAULT_CONTEXT_ID)
+        if session is None:
+            raise HTTPException(status_code=500, detail="No browser context available")
+        return session
+    
+    @property
+    def pages(self) -> List[Page]:
+        return self.get_active_session().pages
+    
+    @property
+    def current_page_index(self) -> int:
+        return self.get_active_session().current_page_index
+    
+    @current_page_index.setter
+    def current_page_index(self, value: int):
+        self.get_active_session().current_page_index = value
+    
     async def get_current_page(self) -> Page:
         """Get the current active page"""
         if not self.pages:
             raise HTTPException(status_code=500, detail="No browser pages available")
         return self.pages[self.current_page_index]
     
+    async def list_contexts(self):
+        """List the live browser contexts"""
+        return {
+            "contexts": [session.to_dict() for session in self.contexts.values()],
+            "max_contexts": MAX_BROWSER_CONTEXTS
+        }
+    
+    async def close_context(self, action: CloseContextAction = Body(...)):
+        """Close a named browser context and all of its tabs"""
+        if action.context_id == DEFAULT_CONTEXT_ID:
+            raise HTTPException(status_code=400, detail="The default browser context cannot be closed")
+        async with self._contexts_lock:
+            session = self.contexts.get(action.context_id)
+            if session is None:
+                raise HTTPException(status_code=404, detail=f"Browser context '{action.context_id}' not found")
+            if session.leases > 0:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Browser context '{action.context_id}' is in use by {session.leases} request(s)"
+                )
+            # Leases are only taken under the registry lock, so nothing can pick it up after this
+            self.contexts.pop(action.context_id, None)
+        await session.context.close()
+        return {"success": True, "message": f"Closed browser context '{action.context_id}'"}
+    
+    async def set_interception_profile(self, action: InterceptionProfileAction = Body(...)):
+        """Set the request interception profile of a browser context"""
+        async with self.use_context(action.context_id) as session:
+            await self.apply_interception_profile(session, action.profile)
+            return {
+                "success": True,
+                "message": f"Interception profile for context '{session.context_id}' set to '{session.profile.name}'",
+                "context_id": session.context_id,
+                "interception_profile": session.profile.name
+            }
+    
     async def get_selector_map(self) -> Dict[int, DOMElementNode]:
         """Get a map of selectable elements on the page"""
         page = await self.get_current_page()
@@ -657,10 +1231,16 @@ class BrowserAutomation:
             traceback.print_exc()
             return ""
     
-    async def get_updated_browser_state(self, action_name: str) -> tuple:
+    async def get_updated_browser_state(self, action_name: str, changed_only: bool = False) -> tuple:
         """Helper method to get updated browser state after any action
         Returns a tuple of (dom_state, screenshot, elements, metadata)
+        
+        With changed_only the element listing skips elements unchanged since
+        the previous state captured in this context.
         """
+        if _defer_state_capture.get():
+            # Inside a batch, state is captured once at the end or at checkpoints
+            return None, "", "", {}
         try:
             # Wait a moment for any potential async processes to settle
             await asyncio.sleep(0.5)
@@ -669,25 +1249,56 @@ class BrowserAutomation:
             dom_state = await self.get_current_dom_state()
             screenshot = await self.take_screenshot()
             
-            # Format elements for output
-            elements = dom_state.element_tree.clickable_elements_to_string(
-                include_attributes=self.include_attributes
-            )
-            
-            # Collect additional metadata
             page = await self.get_current_page()
             metadata = {}
             
+            # Get viewport dimensions - Fix syntax error in JavaScript
+            try:
+                viewport = await page.evaluate("""
+                () => {
+                    return {
+                        width: window.innerWidth,
+                        height: window.innerHeight
+                    };
+                }
+                """)
+                metadata['viewport_width'] = viewport.get('width', 0)
+                metadata['viewport_height'] = viewport.get('height', 0)
+            except Exception as e:
+                print(f"Error getting viewport dimensions: {e}")
+                metadata['viewport_width'] = 0
+                metadata['viewport_height'] = 0
+            
+            # Format elements for output within the token budget, marking what
+            # changed since the last state captured on the same page
+            session = _active_session.get()
+            previous_keys = None
+            if session and session.last_element_url == dom_state.url:
+                previous_keys = session.last_element_keys
+            serialized = serialize_elements_within_budget(
+                dom_state.selector_map,
+                self.include_attributes,
+                metadata['viewport_height'],
+                previous_keys=previous_keys,
+                changed_only=changed_only
+            )
+            elements = serialized.text
+            if session:
+                session.last_element_keys = serialized.line_keys
+                session.last_element_url = dom_state.url
+            
             # Get element count
             metadata['element_count'] = len(dom_state.selector_map)
+            metadata['elements_omitted'] = serialized.omitted
             
-            # Create simplified interactive elements list
+            # Create simplified interactive elements list for the elements shown
             interactive_elements = []
-            for idx, element in dom_state.selector_map.items():
+            for idx in serialized.shown_indices:
+                element = dom_state.selector_map[idx]
                 element_info = {
                     'index': idx,
                     'tag_name': element.tag_name,
-                    'text': element.get_all_text_till_next_clickable_element(),
+                    'text': truncate_text(element.get_all_text_till_next_clickable_element(), MAX_ELEMENT_TEXT_LENGTH),
                     'is_in_viewport': element.is_in_viewport
                 }
                 
@@ -700,23 +1311,6 @@ class BrowserAutomation:
             
             metadata['interactive_elements'] = interactive_elements
             
-            # Get viewport dimensions - Fix syntax error in JavaScript
-            try:
-                viewport = await page.evaluate("""
-                () => {
-                    return {
-                        width: window.innerWidth,
-                        height: window.innerHeight
-                    };
-                }
-                """)
-                metadata['viewport_width'] = viewport.get('width', 0)
-                metadata['viewport_height'] = viewport.get('height', 0)
-            except Exception as e:
-                print(f"Error getting viewport dimensions: {e}")
-                metadata['viewport_width'] = 0
-                metadata['viewport_height'] = 0
-            
             # Extract OCR text from screenshot if available
             ocr_text = ""
             if screenshot:
@@ -739,10 +1333,15 @@ class BrowserAutomation:
         if elements is None:
             elements = ""
             
+        session = _active_session.get()
         return BrowserActionResult(
             success=success,
             message=message,
             error=error,
+            context_id=session.context_id if session else None,
+            interception_profile=session.profile.name if session else None,
+            requests_blocked=session.requests_blocked if session else 0,
+            bytes_blocked=session.bytes_blocked if session else 0,
             url=dom_state.url if dom_state else fallback_url or "",
             title=dom_state.title if dom_state else "",
             elements=elements,
@@ -752,6 +1351,7 @@ class BrowserAutomation:
             content=content,
             ocr_text=metadata.get('ocr_text', ""),
             element_count=metadata.get('element_count', 0),
+            elements_omitted=metadata.get('elements_omitted', 0),
             interactive_elements=metadata.get('interactive_elements', []),
             viewport_width=metadata.get('viewport_width', 0),
             viewport_height=metadata.get('viewport_height', 0)
@@ -759,6 +1359,7 @@ class BrowserAutomation:
 
     # Basic Navigation Actions
     
+    @with_browser_context
     async def navigate_to(self, action: GoToUrlAction = Body(...)):
         """Navigate to a specified URL"""
         try:
@@ -810,6 +1411,7 @@ class BrowserAutomation:
                     content=None
                 )
     
+    @with_browser_context
     async def search_google(self, action: SearchGoogleAction = Body(...)):
         """Search Google with the provided query"""
         try:
@@ -859,6 +1461,7 @@ class BrowserAutomation:
                     content=None
                 )
     
+    @with_browser_context
     async def go_back(self, _: NoParamsAction = Body(...)):
         """Navigate back in browser history"""
         try:
@@ -891,7 +1494,8 @@ class BrowserAutomation:
                 content=None
             )
     
-    async def wait(self, seconds: int = Body(3)):
+    @with_browser_context
+    async def wait(self, seconds: int = Body(3), context_id: Optional[str] = Body(None)):
         """Wait for the specified number of seconds"""
         try:
             await asyncio.sleep(seconds)
@@ -923,6 +1527,7 @@ class BrowserAutomation:
     
     # Element Interaction Actions
     
+    @with_browser_context
     async def click_coordinates(self, action: ClickCoordinatesAction = Body(...)):
         """Click at specific x,y coordinates on the page"""
         try:
@@ -976,6 +1581,7 @@ class BrowserAutomation:
                     content=None
                 )
     
+    @with_browser_context
     async def click_element(self, action: ClickElementAction = Body(...)):
         """Click on an element by index"""
         try:
@@ -1103,6 +1709,7 @@ class BrowserAutomation:
                     fallback_url=current_url 
                 )
     
+    @with_browser_context
     async def input_text(self, action: InputTextAction = Body(...)):
         """Input text into an element"""
         try:
@@ -1162,6 +1769,7 @@ class BrowserAutomation:
                 content=None
             )
     
+    @with_browser_context
     async def send_keys(self, action: SendKeysAction = Body(...)):
         """Send keyboard keys"""
         try:
@@ -1195,6 +1803,7 @@ class BrowserAutomation:
     
     # Tab Management Actions
     
+    @with_browser_context
     async def switch_tab(self, action: SwitchTabAction = Body(...)):
         """Switch to a different tab by index"""
         try:
@@ -1238,12 +1847,13 @@ class BrowserAutomation:
                 content=None
             )
     
+    @with_browser_context
     async def open_tab(self, action: OpenTabAction = Body(...)):
         """Open a new tab with the specified URL"""
         try:
             print(f"Attempting to open new tab with URL: {action.url}")
             # Create new page in same browser instance
-            new_page = await self.browser.new_page()
+            new_page = await self.get_active_session().context.new_page()
             print(f"New page created successfully")
             
             # Navigate to the URL
@@ -1285,6 +1895,7 @@ class BrowserAutomation:
                 content=None
             )
     
+    @with_browser_context
     async def close_tab(self, action: CloseTabAction = Body(...)):
         """Close a tab by index"""
         try:
@@ -1338,34 +1949,24 @@ class BrowserAutomation:
     
     # Content Actions
     
-    async def extract_content(self, goal: str = Body(...)):
-        """Extract content from the current page based on the provided goal"""
+    @with_browser_context
+    async def extract_content(self, goal: str = Body(...), max_chars: int = Body(DEFAULT_MAX_CHARS), context_id: Optional[str] = Body(None)):
+        """Extract the sections of the current page most relevant to the goal as markdown"""
         try:
             page = await self.get_current_page()
-            content = await page.content()
+            html = await page.content()
             
-            # In a full implementation, we would use an LLM to extract specific content
-            # based on the goal. For this example, we'll extract visible text.
-            extracted_text = await page.evaluate("""
-            Array.from(document.querySelectorAll('p, h1, h2, h3, h4, h5, h6, li, span, div'))
-                .filter(el => {
-                    const style = window.getComputedStyle(el);
-                    return style.display !== 'none' && 
-                           style.visibility !== 'hidden' && 
-                           style.opacity !== '0' &&
-                           el.innerText && 
-                           el.innerText.trim().length > 0;
-                })
-                .map(el => el.innerText.trim())
-                .join('\\n\\n');
-            """)
+            document, cached = self.content_extractor.extract(html, page.url)
+            extracted_text, chunks_returned = self.content_extractor.select(document, goal, max_chars)
+            if chunks_returned < len(document.chunks):
+                extracted_text = f"(Showing {chunks_returned} of {len(document.chunks)} sections, ranked by relevance to the goal)\n\n{extracted_text}"
             
             # Get updated state
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"extract_content({goal})")
             
             return self.build_action_result(
                 True,
-                f"Content extracted based on goal: {goal}",
+                f"Content extracted based on goal: {goal}" + (" (cached)" if cached else ""),
                 dom_state,
                 screenshot,
                 elements,
@@ -1385,7 +1986,74 @@ class BrowserAutomation:
                 content=None
             )
     
-    async def save_pdf(self):
+    def find_open_page(self, session: BrowserContextSession, url: str) -> Optional[Page]:
+        """Find a tab of the browser context that currently shows the url"""
+        normalized = url.rstrip("/")
+        for page in session.pages:
+            if not page.is_closed() and page.url.rstrip("/") == normalized:
+                return page
+        return None
+    
+    async def extract_url(self, action: ExtractUrlAction = Body(...)):
+        """Extract readable content from a url without changing any open tab.
+        
+        A tab of the context already showing the url is read directly, if the
+        context is idle. Otherwise the url is loaded in a temporary tab of the
+        context, unless it was fetched recently. The temporary tab is not one of
+        the context's tabs, so the context is only leased while it loads, not
+        locked, and extractions run concurrently.
+        """
+        session = await self.lease_context(action.context_id)
+        try:
+            document = None
+            cached = False
+            reused_tab = False
+            
+            # An action holding the lock may be navigating the tab, so never wait for it
+            if not session.lock.locked():
+                async with session.lock:
+                    page = self.find_open_page(session, action.url)
+                    if page is not None:
+                        document, cached = self.content_extractor.extract(await page.content(), page.url)
+                        reused_tab = True
+            if document is None:
+                document = self.content_extractor.get_recent(action.url)
+                cached = document is not None
+            
+            if document is None:
+                page = await session.context.new_page()
+                try:
+                    response = await page.goto(action.url, wait_until="domcontentloaded", timeout=30000)
+                    if response is not None and response.status >= 400:
+                        raise Exception(f"HTTP {response.status} loading {action.url}")
+                    try:
+                        await page.wait_for_load_state("networkidle", timeout=5000)
+                    except Exception:
+                        pass  # Use whatever has rendered so far
+                    document, cached = self.content_extractor.extract(await page.content(), action.url)
+                finally:
+                    await page.close()
+                self.content_extractor.remember_fetch(document)
+            
+            content, chunks_returned = self.content_extractor.select(document, action.goal, action.max_chars)
+            return ExtractionResult(
+                message=f"Extracted {chunks_returned} of {len(document.chunks)} sections from {action.url}",
+                url=action.url,
+                title=document.title,
+                content=content,
+                chunks_total=len(document.chunks),
+                chunks_returned=chunks_returned,
+                cached=cached,
+                reused_tab=reused_tab
+            )
+        except Exception as e:
+            print(f"Error extracting content from {action.url}: {e}")
+            return ExtractionResult(success=False, message=str(e), error=str(e), url=action.url)
+        finally:
+            self.release_context(session)
+    
+    @with_browser_context
+    async def save_pdf(self, context_id: Optional[str] = Body(None, embed=True)):
         """Save the current page as a PDF"""
         try:
             page = await self.get_current_page()
@@ -1423,6 +2091,7 @@ class BrowserAutomation:
     
     # Scroll Actions
 
+    @with_browser_context
     async def scroll_down(self, action: ScrollAction = Body(...)):
         """Scroll down the page"""
         try:
@@ -1461,6 +2130,7 @@ class BrowserAutomation:
                 content=None
             )
     
+    @with_browser_context
     async def scroll_up(self, action: ScrollAction = Body(...)):
         """Scroll up the page"""
         try:
@@ -1499,7 +2169,8 @@ class BrowserAutomation:
                 content=None
             )
     
-    async def scroll_to_text(self, text: str = Body(...)):
+    @with_browser_context
+    async def scroll_to_text(self, text: str = Body(...), context_id: Optional[str] = Body(None)):
         """Scroll to text on the page"""
         try:
             page = await self.get_current_page()
@@ -1549,7 +2220,8 @@ class BrowserAutomation:
     
     # Dropdown Actions
     
-    async def get_dropdown_options(self, index: int = Body(...)):
+    @with_browser_context
+    async def get_dropdown_options(self, index: int = Body(...), context_id: Optional[str] = Body(None)):
         """Get all options from a dropdown"""
         try:
             page = await self.get_current_page()
@@ -1638,7 +2310,8 @@ class BrowserAutomation:
                 content=None
             )
     
-    async def select_dropdown_option(self, index: int = Body(...), option_text: str = Body(...)):
+    @with_browser_context
+    async def select_dropdown_option(self, index: int = Body(...), option_text: str = Body(...), context_id: Optional[str] = Body(None)):
         """Select an option from a dropdown by text"""
         try:
             page = await self.get_current_page()
@@ -1707,6 +2380,7 @@ class BrowserAutomation:
     
     # Drag and Drop
     
+    @with_browser_context
     async def drag_drop(self, action: DragDropAction = Body(...)):
         """Perform drag and drop operation"""
         try:
@@ -1791,6 +2465,125 @@ class BrowserAutomation:
                 content=None
             )
 
+    # Batched Actions
+    
+    def get_batch_handlers(self) -> Dict[str, tuple]:
+        """Map batchable action names to their endpoint and parameter model.
+        
+        The boolean marks endpoints that take the action model itself rather
+        than its fields as keyword arguments.
+        """
+        return {
+            "navigate_to": (self.navigate_to, GoToUrlAction, True),
+            "search_google": (self.search_google, SearchGoogleAction, True),
+            "go_back": (self.go_back, NoParamsAction, True),
+            "wait": (self.wait, WaitAction, False),
+            "click_element": (self.click_element, ClickElementAction, True),
+            "click_coordinates": (self.click_coordinates, ClickCoordinatesAction, True),
+            "input_text": (self.input_text, InputTextAction, True),
+            "send_keys": (self.send_keys, SendKeysAction, True),
+            "switch_tab": (self.switch_tab, SwitchTabAction, True),
+            "open_tab": (self.open_tab, OpenTabAction, True),
+            "close_tab": (self.close_tab, CloseTabAction, True),
+            "extract_content": (self.extract_content, ExtractContentAction, False),
+            "scroll_down": (self.scroll_down, ScrollAction, True),
+            "scroll_up": (self.scroll_up, ScrollAction, True),
+            "scroll_to_text": (self.scroll_to_text, ScrollToTextAction, False),
+            "get_dropdown_options": (self.get_dropdown_options, DropdownOptionsAction, False),
+            "select_dropdown_option": (self.select_dropdown_option, SelectDropdownOptionAction, False),
+            "drag_drop": (self.drag_drop, DragDropAction, True),
+        }
+    
+    async def run_batch_step(self, step: BatchStep, context_id: str) -> BrowserActionResult:
+        """Run a single batch step in the given context without capturing state"""
+        handler = self.get_batch_handlers().get(step.action)
+        if handler is None:
+            error = f"Unknown batch action '{step.action}'"
+            return BrowserActionResult(success=False, message=error, error=error)
+        
+        method, model_cls, takes_model = handler
+        try:
+            params = model_cls(**{**step.params, "context_id": context_id})
+        except Exception as e:
+            error = f"Invalid parameters for '{step.action}': {e}"
+            return BrowserActionResult(success=False, message=error, error=error)
+        
+        if takes_model:
+            return await method(params)
+        return await method(**params.model_dump())
+    
+    @with_browser_context
+    async def batch(self, action: BatchAction = Body(...)):
+        """Run a sequence of actions and capture browser state only once at the end.
+        
+        Steps flagged as checkpoints also record the page state at that point.
+        With abort_on_failure the batch stops at the first failed step.
+        """
+        session = self.get_active_session()
+        steps = []
+        aborted = False
+        
+        token = _defer_state_capture.set(True)
+        try:
+            for i, step in enumerate(action.actions):
+                result = await self.run_batch_step(step, session.context_id)
+                step_result = {
+                    "index": i,
+                    "action": step.action,
+                    "success": result.success,
+                    "message": result.message
+                }
+                if result.error:
+                    step_result["error"] = result.error
+                if result.content:
+                    step_result["content"] = result.content
+                
+                if step.checkpoint:
+                    _defer_state_capture.set(False)
+                    dom_state, _, elements, metadata = await self.get_updated_browser_state(f"batch_checkpoint({i}, {step.action})", changed_only=True)
+                    _defer_state_capture.set(True)
+                    step_result["state"] = {
+                        "url": dom_state.url if dom_state else "",
+                        "title": dom_state.title if dom_state else "",
+                        "elements": elements,
+                        "ocr_text": metadata.get("ocr_text", "")
+                    }
+                
+                steps.append(step_result)
+                
+                if not result.success and action.abort_on_failure:
+                    aborted = True
+                    break
+        finally:
+            _defer_state_capture.reset(token)
+        
+        # Single state capture for the whole batch
+        dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"batch({len(steps)} actions)")
+        
+        failed = [step for step in steps if not step["success"]]
+        message = f"Ran {len(steps)}/{len(action.actions)} batch actions"
+        error = ""
+        if aborted:
+            last = steps[-1]
+            error = f"Aborted at step {last['index']} ({last['action']}): {last.get('error') or last['message']}"
+            message += f", {error}"
+        elif failed:
+            error = f"{len(failed)} batch actions failed"
+            message += f", {error}"
+        
+        result = self.build_action_result(
+            not failed,
+            message,
+            dom_state,
+            screenshot,
+            elements,
+            metadata,
+            error=error,
+            content=None
+        )
+        result.steps = steps
+        return result
+
 # Create singleton instance
 automation_service = BrowserAutomation()
 
@@ -0,0 +1,512 @@
+"""
+Local page content extraction for the sandbox browser.
+
+Finds the main content of a page readability-style, converts it to markdown,
+splits it into heading-scoped chunks and ranks the chunks against a goal with
+BM25, so extraction only returns the sections that matter. Extracted documents
+are cached by URL and content hash.
+"""
+
+import hashlib
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+# Elements whose content is never part of the readable text
+SKIPPED_TAGS = {
+    "script", "style", "noscript", "svg", "canvas", "iframe", "template",
+    "head", "object", "embed", "button", "select", "option", "input", "textarea"
+}
+# Page chrome dropped before looking for the main content
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "form", "dialog"}
+# Skipped elements whose end tag may be omitted; they never contain themselves,
+# so a repeated start tag continues the same skip instead of nesting
+UNNESTED_SKIPPED_TAGS = {"option", "head"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr"
+}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "ul", "ol", "li",
+    "pre", "blockquote", "table", "tr", "td", "th", "h1", "h2", "h3", "h4",
+    "h5", "h6", "figure", "figcaption", "dl", "dt", "dd", "hr", "br"
+}
+
+NEGATIVE_HINTS = re.compile(
+    r"comment|meta|footer|footnote|nav|sidebar|menu|share|social|cookie|consent|"
+    r"banner|advert|\bads?\b|promo|related|recommend|subscribe|newsletter|popup|modal|breadcrumb",
+    re.IGNORECASE
+)
+POSITIVE_HINTS = re.compile(r"article|content|main|post|entry|story|body|text|blog", re.IGNORECASE)
+
+# Chunks are kept under this many characters, split on paragraph boundaries
+CHUNK_CHARS = 1500
+# Default size of the text returned for a goal
+DEFAULT_MAX_CHARS = 8000
+MAX_CACHED_DOCUMENTS = 64
+# Pages fetched by URL are reused for this long without reloading them
+RECENT_FETCH_TTL = 600
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it of on or that the "
+    "this to was what when where which who why will with about all any find get "
+    "extract information page show list".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Node:
+    tag: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+    children: List["Node | str"] = field(default_factory=list)
+    parent: Optional["Node"] = None
+
+    def text(self) -> str:
+        parts = []
+        for child in self.children:
+            parts.append(child if isinstance(child, str) else child.text())
+        return " ".join(" ".join(parts).split())
+
+    def link_text_length(self) -> int:
+        total = 0
+        for child in self.children:
+            if isinstance(child, Node):
+                total += len(child.text()) if child.tag == "a" else child.link_text_length()
+        return total
+
+    def iter_nodes(self):
+        yield self
+        for child in self.children:
+            if isinstance(child, Node):
+                yield from child.iter_nodes()
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds a lightweight element tree, dropping non-content elements"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("document")
+        self.current = self.root
+        # Element that started the current skip and how deeply it is nested in itself
+        self.skip_tag: Optional[str] = None
+        self.skip_depth = 0
+        self.title = ""
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if self.skip_tag == "head" and tag == "body":
+            # The head ends implicitly where the body starts
+            self.skip_tag, self.skip_depth = None, 0
+        if self.skip_tag:
+            # Only the skipped element itself nests; any other tag inside it may
+            # never be closed, e.g. the options of a select
+            if tag == self.skip_tag and tag not in UNNESTED_SKIPPED_TAGS:
+                self.skip_depth += 1
+            return
+        if tag in SKIPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip_tag, self.skip_depth = tag, 1
+            return
+        node = Node(tag, {k: v or "" for k, v in attrs}, parent=self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        if self.skip_tag or tag in SKIPPED_TAGS:
+            return
+        self.current.children.append(Node(tag, {k: v or "" for k, v in attrs}, parent=self.current))
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if not self.skip_depth:
+                    self.skip_tag = None
+            return
+        if tag in VOID_TAGS:
+            return
+        # Close up to the matching open element, tolerating unclosed tags
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if self.skip_tag or not data.strip():
+            if data and not data.strip() and self.current.children:
+                self.current.children.append(" ")
+            return
+        self.current.children.append(data)
+
+
+def _class_weight(node: Node) -> int:
+    hints = f"{node.attrs.get('class', '')} {node.attrs.get('id', '')}"
+    weight = 0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    return weight
+
+
+def _strip_boilerplate(node: Node) -> None:
+    kept = []
+    for child in node.children:
+        if isinstance(child, Node):
+            role = child.attrs.get("role", "")
+            if child.tag in BOILERPLATE_TAGS or role in ("navigation", "banner", "contentinfo", "complementary"):
+                continue
+            if _class_weight(child) < 0 and len(child.text()) < 1000:
+                continue
+            _strip_boilerplate(child)
+        kept.append(child)
+    node.children = kept
+
+
+def find_main_content(root: Node) -> Node:
+    """Pick the element most likely to hold the page's main content"""
+    _strip_boilerplate(root)
+
+    # Prefer semantic containers when they hold a substantial amount of text
+    semantic = [n for n in root.iter_nodes() if n.tag in ("article", "main") or n.attrs.get("role") == "main"]
+    semantic = [n for n in semantic if len(n.text()) >= 500]
+    if semantic:
+        return max(semantic, key=lambda n: len(n.text()))
+
+    scores: Dict[int, float] = {}
+    nodes: Dict[int, Node] = {}
+    for node in root.iter_nodes():
+        if node.tag not in ("p", "pre", "td", "blockquote", "li"):
+            continue
+        text = node.text()
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + min(len(text) / 100, 3)
+        parent = node.parent
+        for divider in (1, 2):
+            if parent is None or parent.tag == "document":
+                break
+            if id(parent) not in scores:
+                base = {"div": 5, "article": 10, "section": 5, "pre": 3, "td": 3, "blockquote": 3}.get(parent.tag, 0)
+                scores[id(parent)] = base + _class_weight(parent)
+                nodes[id(parent)] = parent
+            scores[id(parent)] += score / divider
+            parent = parent.parent
+
+    if not scores:
+        return root
+
+    def final_score(key: int) -> float:
+        node = nodes[key]
+        text_length = len(node.text()) or 1
+        link_density = node.link_text_length() / text_length
+        return scores[key] * (1 - link_density)
+
+    best = nodes[max(scores, key=final_score)]
+    # Widen to the parent when siblings carry comparable content
+    if best.parent is not None and best.parent.tag != "document":
+        threshold = max(10, final_score(id(best)) * 0.2)
+        strong_siblings = [
+            child for child in best.parent.children
+            if isinstance(child, Node) and child is not best
+            and id(child) in scores and final_score(id(child)) >= threshold
+        ]
+        if strong_siblings:
+            return best.parent
+    return best
+
+
+class _MarkdownWriter:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.blocks: List[str] = []
+
+    def inline(self, node: "Node | str") -> str:
+        if isinstance(node, str):
+            return node
+        content = "".join(self.inline(child) for child in node.children)
+        content = " ".join(content.split()) if node.tag != "pre" else content
+        if not content:
+            return " " if node.tag == "br" else ""
+        if node.tag == "a":
+            href = node.attrs.get("href", "")
+            if href and not href.startswith(("javascript:", "#")):
+                return f"[{content}]({urljoin(self.base_url, href)})"
+            return content
+        if node.tag in ("strong", "b"):
+            return f"**{content}**"
+        if node.tag in ("em", "i"):
+            return f"_{content}_"
+        if node.tag == "code":
+            return f"`{content}`"
+        if node.tag in BLOCK_TAGS:
+            return f" {content} "
+        return content
+
+    def has_block_children(self, node: Node) -> bool:
+        return any(isinstance(child, Node) and child.tag in BLOCK_TAGS for child in node.children)
+
+    def write(self, node: "Node | str", list_depth: int = 0) -> None:
+        if isinstance(node, str):
+            text = " ".join(node.split())
+            if text:
+                self.blocks.append(text)
+            return
+        tag = node.tag
+        if re.fullmatch(r"h[1-6]", tag):
+            text = " ".join(self.inline(node).split())
+            if text:
+                self.blocks.append(f"{'#' * int(tag[1])} {text}")
+        elif tag == "pre":
+            code = node.text() if not node.children else "".join(
+                child if isinstance(child, str) else child.text() for child in node.children
+            )
+            self.blocks.append(f"```\n{code.strip()}\n```")
+        elif tag in ("ul", "ol"):
+            items = []
+            for child in node.children:
+                if isinstance(child, Node) and child.tag == "li":
+                    marker = f"{len(items) + 1}." if tag == "ol" else "-"
+                    text = " ".join(self.inline(child).split())
+                    if text:
+                        items.append(f"{'  ' * list_depth}{marker} {text}")
+            if items:
+                self.blocks.append("\n".join(items))
+        elif tag == "table":
+            rows = [n for n in node.iter_nodes() if n.tag == "tr"]
+            lines = []
+            for row in rows:
+                cells = [
+                    " ".join(self.inline(cell).split()).replace("|", "\\|")
+                    for cell in row.children if isinstance(cell, Node) and cell.tag in ("td", "th")
+                ]
+                if cells:
+                    lines.append("| " + " | ".join(cells) + " |")
+                    if len(lines) == 1:
+                        lines.append("|" + " --- |" * len(cells))
+            if lines:
+                self.blocks.append("\n".join(lines))
+        elif tag == "blockquote":
+            text = " ".join(self.inline(node).split())
+            if text:
+                self.blocks.append(f"> {text}")
+        elif tag == "hr":
+            self.blocks.append("---")
+        elif self.has_block_children(node) or tag in ("document", "body", "html"):
+            # Containers: flush runs of inline content as paragraphs
+            inline_run = []
+            for child in node.children:
+                if isinstance(child, Node) and child.tag in BLOCK_TAGS:
+                    self.flush(inline_run)
+                    inline_run = []
+                    self.write(child, list_depth)
+                else:
+                    inline_run.append(child)
+            self.flush(inline_run)
+        else:
+            text = " ".join(self.inline(node).split())
+            if text:
+                self.blocks.append(text)
+
+    def flush(self, nodes: List["Node | str"]) -> None:
+        text = " ".join("".join(self.inline(n) for n in nodes).split())
+        if text:
+            self.blocks.append(text)
+
+
+def html_to_markdown(node: Node, base_url: str = "") -> str:
+    writer = _MarkdownWriter(base_url)
+    writer.write(node)
+    return "\n\n".join(writer.blocks)
+
+
+@dataclass
+class Chunk:
+    index: int
+    heading: str  # Heading path of the section, e.g. "Setup > Install"
+    text: str
+
+
+@dataclass
+class ExtractedDocument:
+    url: str
+    title: str
+    content_hash: str
+    markdown: str
+    chunks: List[Chunk]
+
+
+def chunk_markdown(markdown: str, max_chars: int = CHUNK_CHARS) -> List[Chunk]:
+    """Split markdown into heading-scoped chunks of at most max_chars"""
+    chunks: List[Chunk] = []
+    headings: List[Tuple[int, str]] = []
+    current: List[str] = []
+    size = 0
+
+    def emit():
+        nonlocal current, size
+        if current:
+            heading = " > ".join(title for _, title in headings)
+            chunks.append(Chunk(index=len(chunks), heading=heading, text="\n\n".join(current)))
+        current = []
+        size = 0
+
+    for block in markdown.split("\n\n"):
+        match = re.match(r"(#{1,6}) (.*)", block)
+        if match:
+            emit()
+            level = len(match.group(1))
+            headings = [(l, t) for l, t in headings if l < level] + [(level, match.group(2))]
+            current = [block]
+            size = len(block)
+            continue
+        if size + len(block) > max_chars and current:
+            emit()
+        # Hard-split blocks that are larger than a chunk on their own
+        while len(block) > max_chars:
+            current.append(block[:max_chars])
+            emit()
+            block = block[max_chars:]
+        current.append(block)
+        size += len(block)
+    emit()
+    return chunks
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def rank_chunks(chunks: List[Chunk], goal: str, k1: float = 1.5, b: float = 0.75) -> List[Tuple[float, Chunk]]:
+    """Score chunks against the goal with BM25, best first"""
+    query = set(tokenize(goal))
+    if not chunks or not query:
+        return [(0.0, chunk) for chunk in chunks]
+
+    documents = [Counter(tokenize(f"{chunk.heading} {chunk.text}")) for chunk in chunks]
+    lengths = [sum(document.values()) for document in documents]
+    average_length = (sum(lengths) / len(lengths)) or 1
+    document_frequency = Counter(term for document in documents for term in query if term in document)
+
+    scored = []
+    for chunk, document, length in zip(chunks, documents, lengths):
+        score = 0.0
+        for term in query:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(chunks) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scored.append((score, chunk))
+    scored.sort(key=lambda item: (-item[0], item[1].index))
+    return scored
+
+
+class ContentExtractor:
+    """Extracts and caches readable page content"""
+
+    def __init__(self, max_entries: int = MAX_CACHED_DOCUMENTS):
+        self.max_entries = max_entries
+        self._documents: "OrderedDict[Tuple[str, str], ExtractedDocument]" = OrderedDict()
+        self._recent_fetches: Dict[str, Tuple[float, str]] = {}  # url -> (fetched at, content hash)
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, html: str, url: str) -> Tuple[ExtractedDocument, bool]:
+        """Return the extracted document for the page and whether it came from the cache"""
+        content_hash = hashlib.sha256(html.encode("utf-8", "ignore")).hexdigest()
+        key = (url, content_hash)
+        document = self._documents.get(key)
+        if document is not None:
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return document, True
+
+        self.misses += 1
+        started = time.monotonic()
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        main = find_main_content(builder.root)
+        markdown = html_to_markdown(main, url)
+        document = ExtractedDocument(
+            url=url,
+            title=" ".join(builder.title.split()),
+            content_hash=content_hash,
+            markdown=markdown,
+            chunks=chunk_markdown(markdown)
+        )
+        print(f"Extracted {len(markdown)} chars in {len(document.chunks)} chunks from {url} in {time.monotonic() - started:.2f}s")
+
+        self._documents[key] = document
+        if len(self._documents) > self.max_entries:
+            self._documents.popitem(last=False)
+        return document, False
+
+    def get_recent(self, url: str, max_age: float = RECENT_FETCH_TTL) -> Optional[ExtractedDocument]:
+        """Return the document last fetched from url if it is recent enough"""
+        recent = self._recent_fetches.get(url)
+        if recent is None or time.monotonic() - recent[0] > max_age:
+            return None
+        document = self._documents.get((url, recent[1]))
+        if document is not None:
+            self.hits += 1
+        return document
+
+    def remember_fetch(self, document: ExtractedDocument) -> None:
+        self._recent_fetches[document.url] = (time.monotonic(), document.content_hash)
+        if len(self._recent_fetches) > self.max_entries:
+            oldest = min(self._recent_fetches, key=lambda url: self._recent_fetches[url][0])
+            self._recent_fetches.pop(oldest, None)
+
+    def select(self, document: ExtractedDocument, goal: Optional[str], max_chars: int = DEFAULT_MAX_CHARS) -> Tuple[str, int]:
+        """Return the chunks most relevant to the goal, in page order, within max_chars.
+
+        Without a goal the document is returned from the top. Returns the text
+        and the number of chunks included.
+        """
+        ranked = rank_chunks(document.chunks, goal or "")
+        if not any(score > 0 for score, _ in ranked):
+            ranked = [(0.0, chunk) for chunk in document.chunks]
+
+        selected = []
+        used = 0
+        for score, chunk in ranked:
+            if ranked[0][0] > 0 and score <= 0:
+                break
+            if used + len(chunk.text) > max_chars:
+                if selected:
+                    continue
+                # Always return something, even if the best chunk is oversized
+                selected.append(Chunk(chunk.index, chunk.heading, chunk.text[:max_chars]))
+                break
+            selected.append(chunk)
+            used += len(chunk.text)
+
+        selected.sort(key=lambda chunk: chunk.index)
+        parts = []
+        previous_index = -1
+        for chunk in selected:
+            if previous_index >= 0 and chunk.index != previous_index + 1:
+                parts.append("[...]")
+            # Keep the section heading visible when a chunk starts mid-section
+            if chunk.heading and not chunk.text.startswith("#"):
+                parts.append(f"_{chunk.heading}_")
+            parts.append(chunk.text)
+            previous_index = chunk.index
+        return "\n\n".join(parts), len(selected)
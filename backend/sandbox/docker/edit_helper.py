@@ -0,0 +1,228 @@
+"""
+In-sandbox file edit helper.
+
+Applies search/replace edits and unified diff hunks to files in place, so the
+backend only has to send the edits instead of round-tripping whole files.
+
+Usage: python3 edit_helper.py <request.json>
+
+The request is {"files": [{"path": ..., "edits": [...]}]} where each edit is
+either {"old_str": ..., "new_str": ...} or {"diff": "<unified diff of one file>"}.
+All edits are validated against every file before anything is written, and
+writes go through a temporary file and rename, so a request either applies
+completely or not at all. The result is printed as JSON and includes the line
+range of every edit in the new content. On failure it lists the first failing
+edit of each file under "errors", as {"path", "edit", "message"} with the
+1-based index of the edit, or no index when the file itself could not be read.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class EditError(Exception):
+    """A failed edit; path and edit (1-based index) locate it when known"""
+
+    def __init__(self, message, path=None, edit=None):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+        self.edit = edit
+
+    def __str__(self):
+        if self.edit is not None:
+            return f"{self.path}: edit {self.edit}: {self.message}"
+        return self.message
+
+    def to_dict(self):
+        return {"path": self.path, "edit": self.edit, "message": self.message}
+
+
+class EditRequestError(Exception):
+    """Every failed edit of a request"""
+
+    def __init__(self, errors):
+        super().__init__("\n".join(str(error) for error in errors))
+        self.errors = errors
+
+
+def line_of(content, offset):
+    return content.count("\n", 0, offset) + 1
+
+
+def apply_replace(content, old_str, new_str):
+    occurrences = content.count(old_str)
+    if occurrences == 0:
+        raise EditError(f"String '{old_str}' not found in file")
+    if occurrences > 1:
+        lines = [i + 1 for i, line in enumerate(content.split("\n")) if old_str in line]
+        raise EditError(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
+    offset = content.index(old_str)
+    new_content = content[:offset] + new_str + content[offset + len(old_str):]
+    start_line = line_of(new_content, offset)
+    delta = new_str.count("\n") - old_str.count("\n")
+    return new_content, [(start_line, start_line + new_str.count("\n"), delta)]
+
+
+def parse_hunks(diff):
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = {"old_start": int(match.group(1)), "old": [], "new": []}
+            hunks.append(current)
+            continue
+        # File headers only come before the first hunk; inside one, "--- x" is a removed "-- x"
+        if current is None or line.startswith("\\"):
+            continue
+        if line.startswith("-"):
+            current["old"].append(line[1:])
+        elif line.startswith("+"):
+            current["new"].append(line[1:])
+        else:
+            # Context line; tolerate a missing leading space on blank lines
+            text = line[1:] if line.startswith(" ") else line
+            current["old"].append(text)
+            current["new"].append(text)
+    if not hunks:
+        raise EditError("Diff contains no hunks")
+    return hunks
+
+
+def find_block(lines, block, expected):
+    """Index where block occurs in lines, preferring the one nearest to expected"""
+    if not block:
+        return min(max(expected, 0), len(lines))
+    candidates = [
+        i for i in range(len(lines) - len(block) + 1)
+        if lines[i:i + len(block)] == block
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda i: abs(i - expected))
+
+
+def apply_diff(content, diff):
+    lines = content.split("\n")
+    ranges = []
+    shift = 0
+    for number, hunk in enumerate(parse_hunks(diff), 1):
+        expected = hunk["old_start"] - 1 + shift
+        index = find_block(lines, hunk["old"], expected)
+        if index is None:
+            preview = "\n".join(hunk["old"][:3])
+            raise EditError(f"Hunk {number} does not match the file near line {hunk['old_start']}:\n{preview}")
+        lines[index:index + len(hunk["old"])] = hunk["new"]
+        shift += len(hunk["new"]) - len(hunk["old"])
+        ranges.append((index + 1, index + max(len(hunk["new"]), 1), len(hunk["new"]) - len(hunk["old"])))
+    return "\n".join(lines), ranges
+
+
+def write_atomically(path, content):
+    directory = os.path.dirname(path)
+    mode = os.stat(path).st_mode
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".edit-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def run(request):
+    planned = []
+    results = []
+    errors = []
+    for file_request in request["files"]:
+        path = file_request["path"]
+        try:
+            with open(path, encoding="utf-8", newline="") as f:
+                original = f.read()
+        except FileNotFoundError:
+            errors.append(EditError(f"File '{path}' does not exist", path))
+            continue
+        except UnicodeDecodeError:
+            errors.append(EditError(f"File '{path}' is not a UTF-8 text file", path))
+            continue
+
+        content = original
+        edits = []
+        failed = False
+        for number, edit in enumerate(file_request["edits"], 1):
+            try:
+                if "diff" in edit:
+                    content, ranges = apply_diff(content, edit["diff"])
+                else:
+                    content, ranges = apply_replace(content, edit["old_str"], edit["new_str"])
+            except EditError as e:
+                # Later edits of the file depend on this one, so stop checking it
+                errors.append(EditError(e.message, path, number))
+                failed = True
+                break
+            for start, end, delta in ranges:
+                # Keep earlier ranges pointing at the final content
+                for previous in edits:
+                    if previous["start_line"] > start:
+                        previous["start_line"] += delta
+                        previous["end_line"] += delta
+                edits.append({"start_line": start, "end_line": end})
+        if failed:
+            continue
+
+        planned.append((path, original, content))
+        data = content.encode("utf-8")
+        results.append({
+            "path": path,
+            "edits": edits,
+            "size": len(data),
+            "hash": hashlib.sha256(data).hexdigest()
+        })
+    if errors:
+        raise EditRequestError(errors)
+
+    written = []
+    for path, original, content in planned:
+        try:
+            write_atomically(path, content)
+        except Exception as e:
+            # Roll back files already replaced so the request stays all-or-nothing
+            for written_path, written_original in written:
+                write_atomically(written_path, written_original)
+            raise EditError(f"Failed writing {path}: {e}")
+        written.append((path, original))
+    return results
+
+
+def main():
+    request_path = sys.argv[1]
+    try:
+        with open(request_path, encoding="utf-8") as f:
+            request = json.load(f)
+        output = {"success": True, "files": run(request)}
+    except EditRequestError as e:
+        output = {"success": False, "error": str(e), "errors": [error.to_dict() for error in e.errors]}
+    except EditError as e:
+        output = {"success": False, "error": str(e), "errors": [e.to_dict()]}
+    except Exception as e:
+        output = {"success": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        try:
+            os.unlink(request_path)
+        except OSError:
+            pass
+    print(json.dumps(output))
+
+
+if __name__ == "__main__":
+    main()
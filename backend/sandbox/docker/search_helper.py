@@ -0,0 +1,187 @@
+"""
+In-sandbox workspace search helper.
+
+Runs ripgrep (or a plain Python scan when rg is not installed) and prints one
+page of matches as JSON. Context lines are read from the matched files for that
+page only, so the backend receives a bounded result however many lines match.
+
+Usage: python3 search_helper.py '<request json>'
+
+The request is {"root", "pattern", "path", "include": [globs],
+"exclude_dirs": [...], "exclude_ext": [...], "fixed_strings", "case_sensitive",
+"context_lines", "cursor", "max_results"}. Matches are ordered by path and line,
+and "cursor" is the number of matches to skip, as returned in "next_cursor".
+Both search paths skip exactly "exclude_dirs" and "exclude_ext": hidden files
+and directories are searched and ignore files are not applied.
+"""
+
+import fnmatch
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+MAX_LINE_LENGTH = 300
+# Stop counting matches past this many; the total is then reported as capped
+MAX_TOTAL_MATCHES = 10000
+BINARY_SNIFF_BYTES = 8192
+
+
+class SearchError(Exception):
+    pass
+
+
+def truncate(line):
+    line = line.rstrip("\r\n")
+    if len(line) > MAX_LINE_LENGTH:
+        return line[:MAX_LINE_LENGTH] + "..."
+    return line
+
+
+def rg_matches(request):
+    # Search hidden and git-ignored files too, like the Python scan does
+    command = ["rg", "--json", "--sort", "path", "--hidden", "--no-ignore"]
+    if request.get("fixed_strings"):
+        command.append("--fixed-strings")
+    if not request.get("case_sensitive"):
+        command.append("--ignore-case")
+    for glob in request.get("include") or []:
+        command += ["--glob", glob]
+    for directory in request.get("exclude_dirs") or []:
+        command += ["--glob", f"!{directory}/"]
+    for ext in request.get("exclude_ext") or []:
+        command += ["--glob", f"!*{ext}"]
+    command += ["--regexp", request["pattern"], "--", request.get("path") or "."]
+
+    # stderr goes to a file; a pipe nobody reads could fill up and block rg
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True, errors="replace")
+    try:
+        for line in process.stdout:
+            event = json.loads(line)
+            if event["type"] != "match":
+                continue
+            data = event["data"]
+            path = data["path"].get("text")
+            if path is None:
+                continue
+            yield os.path.normpath(path), data["line_number"], data["lines"].get("text", "")
+        process.wait()
+        if process.returncode == 2:
+            stderr.seek(0)
+            raise SearchError(stderr.read().decode("utf-8", "replace").strip() or "ripgrep failed")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr.close()
+
+
+def scan_matches(request):
+    """Fallback for images without ripgrep"""
+    flags = 0 if request.get("case_sensitive") else re.IGNORECASE
+    pattern = re.escape(request["pattern"]) if request.get("fixed_strings") else request["pattern"]
+    try:
+        regex = re.compile(pattern, flags)
+    except re.error as e:
+        raise SearchError(f"Invalid regular expression: {e}")
+    exclude_dirs = set(request.get("exclude_dirs") or [])
+    exclude_ext = tuple(request.get("exclude_ext") or [])
+    include = request.get("include") or []
+    start = request.get("path") or "."
+
+    if os.path.isfile(start):
+        paths = [start]
+    else:
+        paths = []
+        for directory, dirnames, filenames in os.walk(start):
+            dirnames[:] = sorted(d for d in dirnames if d not in exclude_dirs)
+            for filename in sorted(filenames):
+                paths.append(os.path.join(directory, filename))
+
+    for path in paths:
+        path = os.path.normpath(path)
+        if path.lower().endswith(exclude_ext):
+            continue
+        if include and not any(fnmatch.fnmatch(path, g) or fnmatch.fnmatch(os.path.basename(path), g) for g in include):
+            continue
+        try:
+            with open(path, "rb") as f:
+                if b"\0" in f.read(BINARY_SNIFF_BYTES):
+                    continue
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for number, line in enumerate(f, 1):
+                    if regex.search(line):
+                        yield path, number, line
+        except OSError:
+            continue
+
+
+def read_lines(path, cache):
+    if path not in cache:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                cache[path] = f.read().split("\n")
+        except OSError:
+            cache[path] = []
+    return cache[path]
+
+
+def search(request):
+    cursor = max(int(request.get("cursor") or 0), 0)
+    max_results = int(request.get("max_results") or 50)
+    context_lines = int(request.get("context_lines") or 0)
+    matches = rg_matches(request) if shutil.which("rg") else scan_matches(request)
+
+    total = 0
+    files = set()
+    page = []
+    capped = False
+    for path, line_number, text in matches:
+        if total >= MAX_TOTAL_MATCHES:
+            capped = True
+            break
+        if cursor <= total < cursor + max_results:
+            page.append((path, line_number, text))
+        total += 1
+        files.add(path)
+
+    cache = {}
+    results = []
+    for path, line_number, text in page:
+        match = {"file": path, "line": line_number, "text": truncate(text)}
+        if context_lines:
+            lines = read_lines(path, cache)
+            first = max(line_number - 1 - context_lines, 0)
+            match["before"] = [truncate(line) for line in lines[first:line_number - 1]]
+            match["after"] = [truncate(line) for line in lines[line_number:line_number + context_lines]]
+        results.append(match)
+
+    next_cursor = cursor + len(page)
+    return {
+        "success": True,
+        "total": total,
+        "total_capped": capped,
+        "files": len(files),
+        "matches": results,
+        "next_cursor": next_cursor if next_cursor < total else None
+    }
+
+
+def main():
+    try:
+        request = json.loads(sys.argv[1])
+        os.chdir(request.get("root") or ".")
+        output = search(request)
+    except SearchError as e:
+        output = {"success": False, "error": str(e)}
+    except Exception as e:
+        output = {"success": False, "error": f"{type(e).__name__}: {e}"}
+    print(json.dumps(output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Per-sandbox workspace manifest.
+
+Caches the path, size, mtime and (when known) content hash of every entry in a
+sandbox workspace so directory listings can be answered without a Daytona FS
+round trip. The files tool updates the manifest on its own writes; anything
+else that may change the workspace (shell commands, git, uploads) marks it
+stale, and it is rebuilt with a single `find -printf` exec. Existence checks do
+not use it, since files changed by other workers or background jobs are only
+seen after the next refresh.
+"""
+
+import asyncio
+import hashlib
+import posixpath
+import shlex
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from utils.files_utils import WORKSPACE_EXCLUDES
+from utils.logger import logger
+
+# Even without known external writes, rebuild the manifest after this long
+MANIFEST_TTL_SECONDS = 30
+# Manifests kept per process; the least recently used is dropped beyond this
+MAX_MANIFESTS = 64
+# Manifests of sandboxes not used for this long are dropped
+MANIFEST_IDLE_SECONDS = 3600
+
+
+@dataclass
+class ManifestEntry:
+    path: str  # Relative to the workspace
+    is_dir: bool
+    size: int
+    mtime: Optional[float]  # None until confirmed by a refresh
+    hash: Optional[str] = None  # sha256 of the content, known for files the tool wrote
+
+    def to_dict(self) -> dict:
+        return {
+            "name": posixpath.basename(self.path),
+            "is_dir": self.is_dir,
+            "size": self.size,
+            "mod_time": self.mtime
+        }
+
+
+class WorkspaceManifest:
+    """Cached index of a sandbox workspace"""
+
+    def __init__(self, sandbox_id: str, workspace_path: str = "/workspace"):
+        self.sandbox_id = sandbox_id
+        self.workspace_path = workspace_path
+        self.entries: Dict[str, ManifestEntry] = {}
+        # Directories whose contents are not indexed, such as node_modules
+        self.pruned_dirs: Set[str] = set()
+        self.refreshed_at = 0.0
+        self.last_used = time.monotonic()
+        self.stale = True
+        self.hits = 0
+        self.misses = 0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return not self.stale and time.monotonic() - self.refreshed_at < MANIFEST_TTL_SECONDS
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    def _refresh_command(self) -> str:
+        line_format = shlex.quote("%y\\t%s\\t%T@\\t%P\\n")
+        return (
+            f"find {self.workspace_path} -mindepth 1 "
+            f"\\( {WORKSPACE_EXCLUDES.find_prune(self.workspace_path)} -printf {line_format} -prune \\) "
+            f"-o -printf {line_format}"
+        )
+
+    async def ensure_fresh(self, sandbox) -> None:
+        """Rebuild the manifest from the sandbox if it is stale or expired"""
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                return
+            started = time.monotonic()
+            response = await asyncio.to_thread(
+                sandbox.process.exec,
+                f"/bin/sh -c {shlex.quote(self._refresh_command())}",
+                timeout=60
+            )
+            if response.exit_code != 0:
+                raise RuntimeError(f"Manifest refresh failed: {response.result}")
+
+            entries: Dict[str, ManifestEntry] = {}
+            pruned_dirs: Set[str] = set()
+            for line in response.result.splitlines():
+                parts = line.split("\t", 3)
+                if len(parts) != 4 or not parts[3]:
+                    continue
+                kind, size, mtime, path = parts
+                previous = self.entries.get(path)
+                entry = ManifestEntry(
+                    path=path,
+                    is_dir=kind == "d",
+                    size=int(size),
+                    mtime=float(mtime)
+                )
+                # Keep hashes of files that were not modified since they were recorded
+                if previous and previous.hash and previous.size == entry.size and previous.mtime in (None, entry.mtime):
+                    entry.hash = previous.hash
+                entries[path] = entry
+                if entry.is_dir and WORKSPACE_EXCLUDES.matches_dir(path):
+                    pruned_dirs.add(path)
+
+            self.entries = entries
+            self.pruned_dirs = pruned_dirs
+            self.refreshed_at = time.monotonic()
+            self.stale = False
+            logger.debug(f"Refreshed workspace manifest for sandbox {self.sandbox_id}: {len(entries)} entries in {time.monotonic() - started:.2f}s")
+
+    def _is_indexed(self, path: str) -> bool:
+        return not any(path.startswith(d + "/") for d in self.pruned_dirs)
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        return self.entries.get(path.strip("/"))
+
+    def list_dir(self, path: str) -> Optional[List[ManifestEntry]]:
+        """Direct children of a directory, or None when the manifest cannot tell"""
+        path = path.strip("/")
+        if path and (path in self.pruned_dirs or not self._is_indexed(path)):
+            self.misses += 1
+            return None
+        if path and (path not in self.entries or not self.entries[path].is_dir):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return sorted(
+            (entry for entry in self.entries.values() if posixpath.dirname(entry.path) == path),
+            key=lambda entry: entry.path
+        )
+
+    def _record_parents(self, path: str) -> None:
+        parent = posixpath.dirname(path)
+        while parent and parent not in self.entries:
+            self.entries[parent] = ManifestEntry(path=parent, is_dir=True, size=0, mtime=None)
+            parent = posixpath.dirname(parent)
+
+    def record_write(self, path: str, data: bytes) -> None:
+        """Record a file written by the files tool"""
+        self.record_file(path, len(data), hashlib.sha256(data).hexdigest())
+
+    def record_file(self, path: str, size: int, content_hash: str) -> None:
+        """Record a file changed in the sandbox whose new size and hash are known"""
+        path = path.strip("/")
+        self._record_parents(path)
+        self.entries[path] = ManifestEntry(
+            path=path,
+            is_dir=False,
+            size=size,
+            mtime=None,
+            hash=content_hash
+        )
+
+    def record_folder(self, path: str) -> None:
+        path = path.strip("/")
+        self._record_parents(path)
+        self.entries[path] = ManifestEntry(path=path, is_dir=True, size=0, mtime=None)
+
+    def record_delete(self, path: str) -> None:
+        """Remove a file or a whole folder from the manifest"""
+        path = path.strip("/")
+        self.entries.pop(path, None)
+        prefix = path + "/"
+        for entry_path in [p for p in self.entries if p.startswith(prefix)]:
+            del self.entries[entry_path]
+        self.pruned_dirs.discard(path)
+
+
+# Manifests outlive individual agent runs, keyed by sandbox id, least recently used first
+_manifests: "OrderedDict[str, WorkspaceManifest]" = OrderedDict()
+
+
+def _evict_manifests() -> None:
+    now = time.monotonic()
+    while _manifests:
+        sandbox_id, manifest = next(iter(_manifests.items()))
+        if len(_manifests) <= MAX_MANIFESTS and now - manifest.last_used < MANIFEST_IDLE_SECONDS:
+            break
+        del _manifests[sandbox_id]
+        logger.debug(f"Dropped workspace manifest for sandbox {sandbox_id}")
+
+
+def get_workspace_manifest(sandbox_id: str, workspace_path: str = "/workspace") -> WorkspaceManifest:
+    manifest = _manifests.get(sandbox_id)
+    if manifest is None:
+        manifest = WorkspaceManifest(sandbox_id, workspace_path)
+        _manifests[sandbox_id] = manifest
+    else:
+        _manifests.move_to_end(sandbox_id)
+    manifest.last_used = time.monotonic()
+    _evict_manifests()
+    return manifest
+
+
+def mark_workspace_stale(sandbox_id: str) -> None:
+    """Invalidate the manifest after changes made outside the files tool"""
+    manifest = _manifests.get(sandbox_id)
+    if manifest is not None:
+        manifest.mark_stale()
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from typing import Optional
 
 from daytona_sdk import Daytona, DaytonaConfig, CreateSandboxParams, Sandbox, SessionExecuteRequest
@@ -9,10 +10,14 @@ from agentpress.tool import Tool
 from utils.logger import logger
 from utils.config import config
 from utils.files_utils import clean_path
+from sandbox.sessions import forget_shell_sessions
 from agentpress.thread_manager import ThreadManager
 
 load_dotenv()
 
+# Full outputs of tool results too large for the thread, relative to /workspace
+TOOL_OUTPUT_DIR = ".tool_outputs"
+
 logger.debug("Initializing Daytona sandbox configuration")
 daytona_config = DaytonaConfig(
     api_key=config.DAYTONA_API_KEY,
@@ -58,6 +63,8 @@ async def get_or_start_sandbox(sandbox_id: str):
                 
                 # Start supervisord in a session when restarting
                 start_supervisord_session(sandbox)
+                # Shell sessions did not survive the restart
+                await forget_shell_sessions(sandbox_id)
             except Exception as e:
                 logger.error(f"Error starting sandbox: {e}")
                 raise e
@@ -207,6 +214,13 @@ class SandboxToolsBase(Tool):
             raise RuntimeError("Sandbox ID not initialized. Call _ensure_sandbox() first.")
         return self._sandbox_id
 
+    async def save_full_output(self, name: str, content: str) -> Optional[str]:
+        """Save an oversized tool result to the workspace so the agent can read it back."""
+        await self._ensure_sandbox()
+        path = f"{self.workspace_path}/{TOOL_OUTPUT_DIR}/{name}.txt"
+        await asyncio.to_thread(self.sandbox.fs.upload_file, path, content.encode("utf-8"))
+        return path
+
     def clean_path(self, path: str) -> str:
         """Clean and normalize a path to be relative to /workspace."""
         cleaned_path = clean_path(path, self.workspace_path)
@@ -0,0 +1,172 @@
+"""
+Shell sessions shared across agent runs.
+
+The shell tool is created anew for every agent run, but the Daytona sessions it
+runs commands in are kept: their ids are stored per sandbox in a Redis hash, so
+the next run reuses the same shell, with its exported variables and activated
+environments, instead of paying `create_session` again. Every use refreshes the
+session's last-used time and sessions idle for longer than
+SESSION_IDLE_TIMEOUT are deleted the next time the sandbox is used.
+
+Background jobs started by the shell tool are stored per sandbox the same way,
+so a later run can still check, read, wait for and kill them.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Dict, Optional, Set
+from uuid import uuid4
+
+from services import redis
+from utils.logger import logger
+
+# Sessions unused for this long are deleted from the sandbox
+SESSION_IDLE_TIMEOUT = 30 * 60
+# Idle sessions are looked for at most this often per sandbox
+REAP_INTERVAL = 5 * 60
+SESSION_KEY_PREFIX = "shell_sessions:"
+JOB_KEY_PREFIX = "shell_jobs:"
+
+# Session ids known to this process, keyed by (sandbox_id, name), so the common
+# case does not wait on Redis before running a command
+_sessions: Dict[tuple, str] = {}
+_last_reaped: Dict[str, float] = {}
+_locks: Dict[tuple, asyncio.Lock] = {}
+# Running reap tasks; the event loop only keeps weak references to tasks
+_reap_tasks: Set[asyncio.Task] = set()
+
+
+def _key(sandbox_id: str) -> str:
+    return f"{SESSION_KEY_PREFIX}{sandbox_id}"
+
+
+def _jobs_key(sandbox_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{sandbox_id}"
+
+
+async def _load(sandbox_id: str, name: str) -> Optional[dict]:
+    try:
+        value = await redis.hget(_key(sandbox_id), name)
+        return json.loads(value) if value else None
+    except Exception as e:
+        logger.warning(f"Could not load shell session {name} of sandbox {sandbox_id}: {str(e)}")
+        return None
+
+
+async def touch_shell_session(sandbox_id: str, name: str, session_id: str) -> None:
+    """Record that a session was just used"""
+    try:
+        await redis.hset(_key(sandbox_id), name, json.dumps({"session_id": session_id, "last_used": time.time()}))
+        await redis.expire(_key(sandbox_id), redis.REDIS_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Could not store shell session {name} of sandbox {sandbox_id}: {str(e)}")
+
+
+async def get_shell_session(sandbox, sandbox_id: str, name: str = "default") -> str:
+    """Id of the named session in the sandbox, creating it only when there is no live one"""
+    session_id = _sessions.get((sandbox_id, name))
+    if session_id is None:
+        lock = _locks.setdefault((sandbox_id, name), asyncio.Lock())
+        async with lock:
+            session_id = _sessions.get((sandbox_id, name))
+            if session_id is None:
+                stored = await _load(sandbox_id, name)
+                if stored and time.time() - stored["last_used"] < SESSION_IDLE_TIMEOUT:
+                    session_id = stored["session_id"]
+                    logger.debug(f"Reusing shell session {session_id} ({name}) in sandbox {sandbox_id}")
+                else:
+                    session_id = f"shell-{re.sub(r'[^A-Za-z0-9_-]', '_', name)}-{uuid4().hex[:12]}"
+                    await asyncio.to_thread(sandbox.process.create_session, session_id)
+                    logger.debug(f"Created shell session {session_id} ({name}) in sandbox {sandbox_id}")
+                _sessions[(sandbox_id, name)] = session_id
+    await touch_shell_session(sandbox_id, name, session_id)
+    if time.time() - _last_reaped.get(sandbox_id, 0) >= REAP_INTERVAL:
+        task = asyncio.create_task(reap_idle_sessions(sandbox, sandbox_id))
+        _reap_tasks.add(task)
+        task.add_done_callback(_reap_done)
+    return session_id
+
+
+def _reap_done(task: asyncio.Task) -> None:
+    _reap_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Reaping idle shell sessions failed: {str(task.exception())}")
+
+
+async def discard_shell_session(sandbox_id: str, name: str) -> None:
+    """Forget a session that no longer exists in the sandbox"""
+    _sessions.pop((sandbox_id, name), None)
+    try:
+        await redis.hdel(_key(sandbox_id), name)
+    except Exception as e:
+        logger.warning(f"Could not remove shell session {name} of sandbox {sandbox_id}: {str(e)}")
+
+
+async def shell_session_missing(sandbox, session_id: str) -> bool:
+    """Whether the sandbox confirms that the session no longer exists.
+
+    Any other outcome, including a failed lookup, is False, so callers never
+    rerun a command that may already have started.
+    """
+    try:
+        await asyncio.to_thread(sandbox.process.get_session, session_id)
+        return False
+    except Exception as e:
+        message = str(e).lower()
+        return "not found" in message or "404" in message or "does not exist" in message
+
+
+async def forget_shell_sessions(sandbox_id: str) -> None:
+    """Forget every session of a sandbox, e.g. after it was restarted and they are gone"""
+    for key in [key for key in _sessions if key[0] == sandbox_id]:
+        del _sessions[key]
+    try:
+        await redis.delete(_key(sandbox_id))
+        # Jobs ran in those sessions, and their logs in /tmp are gone as well
+        await redis.delete(_jobs_key(sandbox_id))
+    except Exception as e:
+        logger.warning(f"Could not clear shell sessions of sandbox {sandbox_id}: {str(e)}")
+
+
+async def load_jobs(sandbox_id: str) -> Dict[str, dict]:
+    """Stored background jobs of the sandbox, by job id"""
+    try:
+        stored = await redis.hgetall(_jobs_key(sandbox_id))
+    except Exception as e:
+        logger.warning(f"Could not load background jobs of sandbox {sandbox_id}: {str(e)}")
+        return {}
+    return {job_id: json.loads(value) for job_id, value in stored.items()}
+
+
+async def store_job(sandbox_id: str, job_id: str, job: dict) -> None:
+    """Record the current state of a background job"""
+    try:
+        await redis.hset(_jobs_key(sandbox_id), job_id, json.dumps(job))
+        await redis.expire(_jobs_key(sandbox_id), redis.REDIS_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Could not store background job {job_id} of sandbox {sandbox_id}: {str(e)}")
+
+
+async def reap_idle_sessions(sandbox, sandbox_id: str) -> None:
+    """Delete sessions of the sandbox that have been idle longer than SESSION_IDLE_TIMEOUT"""
+    now = time.time()
+    if now - _last_reaped.get(sandbox_id, 0) < REAP_INTERVAL:
+        return
+    _last_reaped[sandbox_id] = now
+    try:
+        stored = await redis.hgetall(_key(sandbox_id))
+    except Exception as e:
+        logger.warning(f"Could not list shell sessions of sandbox {sandbox_id}: {str(e)}")
+        return
+    for name, value in stored.items():
+        session = json.loads(value)
+        if now - session["last_used"] < SESSION_IDLE_TIMEOUT:
+            continue
+        await discard_shell_session(sandbox_id, name)
+        try:
+            await asyncio.to_thread(sandbox.process.delete_session, session["session_id"])
+            logger.info(f"Deleted shell session {session['session_id']} ({name}) of sandbox {sandbox_id} after {int(now - session['last_used'])}s idle")
+        except Exception as e:
+            logger.debug(f"Shell session {session['session_id']} of sandbox {sandbox_id} was already gone: {str(e)}")
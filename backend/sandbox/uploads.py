@@ -0,0 +1,202 @@
+"""
+Streaming uploads into a sandbox.
+
+Uploaded files are read in fixed-size chunks, so the backend never holds a whole
+file in memory. Each chunk is uploaded as a part file and the parts are joined
+in the sandbox by one exec, which also prints the final size and sha256 of the
+file. That output is compared with what was hashed locally. Files whose content
+already sits at the target path are skipped. Identical files in the same batch
+are uploaded once and copied inside the sandbox. When several files in a batch
+target the same path, only the last one is written.
+"""
+
+import asyncio
+import hashlib
+import posixpath
+import shlex
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from sandbox.manifest import get_workspace_manifest
+from utils.logger import logger
+
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_PARALLEL_UPLOADS = 4
+
+
+@dataclass
+class UploadResult:
+    path: str
+    size: int = 0
+    hash: Optional[str] = None
+    skipped: bool = False  # Identical content was already at path
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class SandboxUploader:
+    """Uploads files to one sandbox with bounded parallelism and hash dedupe"""
+
+    def __init__(self, sandbox, sandbox_id: str, workspace_path: str = "/workspace"):
+        self.sandbox = sandbox
+        self.sandbox_id = sandbox_id
+        self.workspace_path = workspace_path
+        self._semaphore = asyncio.Semaphore(MAX_PARALLEL_UPLOADS)
+
+    async def _exec(self, command: str, timeout: int = 120):
+        return await asyncio.to_thread(
+            self.sandbox.process.exec, f"/bin/sh -c {shlex.quote(command)}", timeout=timeout
+        )
+
+    @staticmethod
+    async def _hash_upload(file: UploadFile) -> Tuple[int, str]:
+        """Size and sha256 of an upload, read chunk by chunk"""
+        digest = hashlib.sha256()
+        size = 0
+        await file.seek(0)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        await file.seek(0)
+        return size, digest.hexdigest()
+
+    def _workspace_relative(self, path: str) -> Optional[str]:
+        prefix = self.workspace_path.rstrip("/") + "/"
+        return path[len(prefix):] if path.startswith(prefix) else None
+
+    async def _existing_hashes(self, paths: List[str]) -> Dict[str, str]:
+        """sha256 of the files already at paths. Uses the manifest where it knows, else one exec"""
+        manifest = get_workspace_manifest(self.sandbox_id, self.workspace_path)
+        hashes: Dict[str, str] = {}
+        unknown = []
+        for path in paths:
+            relative = self._workspace_relative(path)
+            if relative is not None and manifest.is_fresh():
+                entry = manifest.get(relative)
+                if entry is not None and entry.hash:
+                    hashes[path] = entry.hash
+                    continue
+            unknown.append(path)
+        if unknown:
+            quoted = " ".join(shlex.quote(path) for path in unknown)
+            response = await self._exec(f"sha256sum -- {quoted} 2>/dev/null; true")
+            for line in response.result.splitlines():
+                digest, _, path = line.partition("  ")
+                if path in unknown:
+                    hashes[path] = digest
+        return hashes
+
+    async def _upload_parts(self, file: UploadFile, target_path: str) -> Tuple[int, str]:
+        """Stream file to target_path and return the size and sha256 reported by the sandbox"""
+        parts_dir = f"/tmp/upload-{uuid.uuid4().hex}"
+        await file.seek(0)
+        index = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await asyncio.to_thread(self.sandbox.fs.upload_file, f"{parts_dir}/part-{index:06d}", chunk)
+            index += 1
+
+        target = shlex.quote(target_path)
+        tmp_target = shlex.quote(f"{target_path}.upload-{uuid.uuid4().hex[:8]}")
+        parts = f"{parts_dir}/part-*" if index else "/dev/null"
+        response = await self._exec(
+            f"mkdir -p {shlex.quote(posixpath.dirname(target_path))} && "
+            f"cat {parts} > {tmp_target} && mv -f {tmp_target} {target}; "
+            f"status=$?; rm -rf {parts_dir}; [ $status -eq 0 ] || exit $status; "
+            f"stat -c %s {target} && sha256sum {target}"
+        )
+        if response.exit_code != 0:
+            raise RuntimeError(f"Failed to assemble upload: {response.result}")
+        size_line, hash_line = response.result.strip().splitlines()[-2:]
+        return int(size_line), hash_line.split()[0]
+
+    async def _copy(self, source_path: str, target_path: str) -> None:
+        response = await self._exec(
+            f"mkdir -p {shlex.quote(posixpath.dirname(target_path))} && "
+            f"cp -f {shlex.quote(source_path)} {shlex.quote(target_path)}"
+        )
+        if response.exit_code != 0:
+            raise RuntimeError(f"Failed to copy {source_path}: {response.result}")
+
+    async def upload_many(self, uploads: List[Tuple[UploadFile, str]]) -> List[UploadResult]:
+        """Upload (file, target_path) pairs and return one result per pair, in order.
+
+        A file followed by another one with the same target path is not uploaded
+        and gets an error result, as the later file would replace it.
+        """
+        # Index of the last pair writing each path; earlier ones are superseded
+        last_for_path = {path: index for index, (_, path) in enumerate(uploads)}
+        unique = [(file, path) for index, (file, path) in enumerate(uploads) if last_for_path[path] == index]
+
+        async def hash_one(file: UploadFile) -> Tuple[int, str]:
+            async with self._semaphore:
+                return await self._hash_upload(file)
+
+        local = await asyncio.gather(*(hash_one(file) for file, _ in unique), return_exceptions=True)
+        try:
+            existing = await self._existing_hashes(list(last_for_path))
+        except Exception as e:
+            # Without the current hashes every file is uploaded, nothing is skipped
+            logger.warning(f"Could not read existing file hashes in sandbox {self.sandbox_id}, uploading everything: {str(e)}")
+            existing = {}
+        manifest = get_workspace_manifest(self.sandbox_id, self.workspace_path)
+
+        # First upload of each content hash; later identical files copy from it
+        primaries: Dict[str, asyncio.Future] = {}
+
+        async def upload_one(file: UploadFile, path: str, hashed) -> UploadResult:
+            if isinstance(hashed, Exception):
+                return UploadResult(path=path, error=str(hashed))
+            size, digest = hashed
+            if existing.get(path) == digest:
+                logger.info(f"Skipping upload of {path}: identical content already in sandbox {self.sandbox_id}")
+                return UploadResult(path=path, size=size, hash=digest, skipped=True)
+            try:
+                primary = primaries.get(digest)
+                if primary is not None:
+                    source = await primary
+                    if source is not None:
+                        await self._copy(source, path)
+                        return UploadResult(path=path, size=size, hash=digest)
+
+                future = asyncio.get_running_loop().create_future()
+                primaries[digest] = future
+                source = None
+                try:
+                    async with self._semaphore:
+                        uploaded_size, uploaded_hash = await self._upload_parts(file, path)
+                    if (uploaded_size, uploaded_hash) != (size, digest):
+                        raise RuntimeError(
+                            f"Verification failed: sandbox has {uploaded_size} bytes ({uploaded_hash[:12]}), "
+                            f"expected {size} bytes ({digest[:12]})"
+                        )
+                    source = path
+                finally:
+                    future.set_result(source)
+                return UploadResult(path=path, size=size, hash=digest)
+            except Exception as e:
+                logger.error(f"Error uploading {path} to sandbox {self.sandbox_id}: {str(e)}", exc_info=True)
+                return UploadResult(path=path, error=str(e))
+
+        uploaded = dict(zip(
+            (path for _, path in unique),
+            await asyncio.gather(*(upload_one(file, path, hashed) for (file, path), hashed in zip(unique, local)))
+        ))
+        results = [
+            uploaded[path] if last_for_path[path] == index
+            else UploadResult(path=path, error="Replaced by a later file uploaded to the same path")
+            for index, (_, path) in enumerate(uploads)
+        ]
+        for result in uploaded.values():
+            relative = self._workspace_relative(result.path)
+            if result.success and relative is not None:
+                manifest.record_file(relative, result.size, result.hash)
+        return results
+
+    async def upload(self, file: UploadFile, target_path: str) -> UploadResult:
+        return (await self.upload_many([(file, target_path)]))[0]
@@ -5,20 +5,31 @@ This module provides a unified interface for making API calls to different LLM p
 (OpenAI, Anthropic, Groq, etc.) using LiteLLM. It includes support for:
 - Streaming responses
 - Tool calls and function calling
-- Retry logic with exponential backoff
+- Retry logic with jittered backoff that honors Retry-After
+- Per-model circuit breakers and fallback models
 - Model-specific configurations
+- Pooled, long-lived HTTP connections per provider
 - Comprehensive error handling and logging
 """
 
-from typing import Union, Dict, Any, Optional, AsyncGenerator, List
+from typing import Union, Dict, Any, Optional, AsyncGenerator, List, Tuple
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+import importlib.util
 import os
 import json
 import asyncio
-from openai import OpenAIError
+import random
+import time
+import httpx
+from openai import AsyncOpenAI, OpenAIError
 import litellm
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+from services import redis
+from services.prompt_cache import plan_cache_breakpoints, record_cache_usage
 from utils.logger import logger
 from utils.config import config
-from datetime import datetime
+from datetime import datetime, timezone
 import traceback
 
 # litellm.set_verbose=True
@@ -26,8 +37,21 @@ litellm.modify_params=True
 
 # Constants
 MAX_RETRIES = 3
-RATE_LIMIT_DELAY = 30
-RETRY_DELAY = 5
+# Decorrelated jitter backoff bounds, in seconds
+BASE_RETRY_DELAY = 1
+MAX_RETRY_DELAY = 30
+# Longer server-indicated waits open the circuit instead of blocking the call
+MAX_RETRY_AFTER = 60
+# Consecutive failed attempts that open a model's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+# Longest a call queues for its provider's rate limit before it is sent anyway
+MAX_RATE_LIMIT_WAIT = 60
+RATE_LIMIT_KEY_PREFIX = "llm_rate_limit:"
+
+# Seconds an LLM request may take; long generations stream for minutes
+LLM_REQUEST_TIMEOUT = 600
+LLM_CONNECT_TIMEOUT = 10
 
 class LLMError(Exception):
     """Base exception for LLM-related errors."""
@@ -66,12 +90,400 @@ def setup_api_keys() -> None:
     else:
         logger.warning(f"Missing AWS credentials for Bedrock integration - access_key: {bool(aws_access_key)}, secret_key: {bool(aws_secret_key)}, region: {aws_region}")
 
-async def handle_error(error: Exception, attempt: int, max_attempts: int) -> None:
-    """Handle API errors with appropriate delays and logging."""
-    delay = RATE_LIMIT_DELAY if isinstance(error, litellm.exceptions.RateLimitError) else RETRY_DELAY
+@dataclass
+class ConnectionStats:
+    """Requests sent over a pooled client and connections it had to open for them"""
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        if not self.requests:
+            return 0.0
+        return max(self.requests - self.connections, 0) / self.requests
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """Transport that counts requests and newly opened connections"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self.stats.connections += 1
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+# Long-lived clients keyed by (provider, base URL, API key), each bound to the event loop that created it
+_pooled_clients: Dict[Tuple[str, str, Optional[str]], Tuple[asyncio.AbstractEventLoop, Any, httpx.AsyncClient]] = {}
+_connection_stats: Dict[str, ConnectionStats] = {}
+
+def _http2_enabled() -> bool:
+    return config.LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+
+def _create_http_client(base_url: str) -> httpx.AsyncClient:
+    """Keep-alive connection pool to one provider base URL"""
+    stats = _connection_stats.setdefault(base_url, ConnectionStats())
+    limits = httpx.Limits(
+        max_connections=config.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY
+    )
+    http2 = _http2_enabled()
+    logger.debug(f"Creating pooled LLM client for {base_url} (HTTP/2: {http2})")
+    return httpx.AsyncClient(
+        transport=_CountingTransport(stats, http2=http2, limits=limits),
+        timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    )
+
+def _provider_endpoint(model_name: str, api_key: Optional[str], api_base: Optional[str]) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Provider, base URL and API key a model is called with, for the providers with pooled clients"""
+    if model_name.startswith("openrouter/"):
+        return "openrouter", api_base or config.OPENROUTER_API_BASE, api_key or config.OPENROUTER_API_KEY
+    if model_name.startswith("bedrock/"):
+        if not config.AWS_REGION_NAME:
+            return None
+        return "bedrock", api_base or f"https://bedrock-runtime.{config.AWS_REGION_NAME}.amazonaws.com", None
+    if model_name.startswith("anthropic/") or model_name.startswith("claude"):
+        return "anthropic", api_base or "https://api.anthropic.com", None
+    if model_name.startswith("openai/") or model_name.startswith(("gpt-", "o1", "o3", "o4")):
+        return "openai", api_base or "https://api.openai.com/v1", api_key or config.OPENAI_API_KEY
+    return None
+
+def get_pooled_client(model_name: str, api_key: Optional[str] = None, api_base: Optional[str] = None) -> Optional[Any]:
+    """Long-lived client for the model's provider, in the form LiteLLM accepts as `client`.
+
+    OpenAI-compatible providers get an AsyncOpenAI client, Anthropic and Bedrock
+    LiteLLM's own HTTP handler; both send requests over a shared keep-alive pool
+    for the provider's base URL. Returns None for providers without one, which
+    LiteLLM then connects to itself.
+    """
+    endpoint = _provider_endpoint(model_name, api_key, api_base)
+    if endpoint is None:
+        return None
+    provider, base_url, key = endpoint
+    if provider in ("openai", "openrouter") and not key:
+        return None
+
+    loop = asyncio.get_running_loop()
+    cached = _pooled_clients.get(endpoint)
+    if cached and cached[0] is loop:
+        return cached[1]
+
+    http_client = _create_http_client(base_url)
+    if provider in ("openai", "openrouter"):
+        # LiteLLM retries itself; the SDK should not retry underneath it
+        client = AsyncOpenAI(api_key=key, base_url=base_url, http_client=http_client, max_retries=0)
+    else:
+        client = AsyncHTTPHandler(timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT))
+        client.client = http_client
+    _pooled_clients[endpoint] = (loop, client, http_client)
+    return client
+
+def get_connection_stats() -> Dict[str, Dict[str, Any]]:
+    """Requests, new connections and connection reuse rate per provider base URL"""
+    return {
+        base_url: {
+            "requests": stats.requests,
+            "new_connections": stats.connections,
+            "reuse_rate": round(stats.reuse_rate, 3)
+        }
+        for base_url, stats in _connection_stats.items()
+    }
+
+async def close_pooled_clients() -> None:
+    """Close the pooled provider connections of the running event loop"""
+    loop = asyncio.get_running_loop()
+    for endpoint, (client_loop, _, http_client) in list(_pooled_clients.items()):
+        if client_loop is loop:
+            await http_client.aclose()
+            del _pooled_clients[endpoint]
+
+# Errors a retry cannot fix; they neither retry nor count against the circuit
+NON_RETRYABLE_ERRORS = (
+    litellm.exceptions.BadRequestError,
+    litellm.exceptions.AuthenticationError,
+    litellm.exceptions.PermissionDeniedError,
+    litellm.exceptions.NotFoundError,
+    litellm.exceptions.UnprocessableEntityError
+)
+
+class CircuitBreaker:
+    """Fails calls to a model fast while its provider keeps failing.
+
+    After CIRCUIT_FAILURE_THRESHOLD consecutive failed attempts the circuit
+    opens and calls are refused for CIRCUIT_RESET_TIMEOUT seconds. Then one
+    trial call is let through: success closes the circuit, failure opens it again,
+    and a trial that ends without an outcome, such as a cancelled one, lets the
+    next call be the trial.
+    """
+
+    def __init__(self, model_name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.model_name = model_name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until is not None and time.monotonic() < self.open_until
+
+    def allow_request(self) -> bool:
+        if self.open_until is None:
+            return True
+        if self.is_open or self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        logger.info(f"Circuit for {self.model_name} is half-open, sending a trial call")
+        return True
+
+    def record_success(self) -> None:
+        if self.open_until is not None:
+            logger.info(f"Circuit for {self.model_name} closed")
+        self.failures = 0
+        self.open_until = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.open_for(self.reset_timeout)
+
+    def release_trial(self) -> None:
+        """End a trial call that neither succeeded nor failed, so the next call can be the trial"""
+        if self._trial_in_flight:
+            self._trial_in_flight = False
+            logger.debug(f"Trial call for {self.model_name} ended without an outcome")
+
+    def open_for(self, seconds: float) -> None:
+        self._trial_in_flight = False
+        self.open_until = time.monotonic() + seconds
+        logger.warning(f"Circuit for {self.model_name} opened for {seconds:.0f}s after {self.failures} failed attempt(s)")
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    breaker = _circuit_breakers.get(model_name)
+    if breaker is None:
+        breaker = _circuit_breakers[model_name] = CircuitBreaker(model_name)
+    return breaker
+
+_fallback_models: Optional[Dict[str, List[str]]] = None
+
+def get_fallback_models(model_name: str) -> List[str]:
+    """Models to try, in order, when the model's circuit is open (LLM_FALLBACK_MODELS)"""
+    global _fallback_models
+    if _fallback_models is None:
+        _fallback_models = {}
+        if config.LLM_FALLBACK_MODELS:
+            try:
+                _fallback_models = json.loads(config.LLM_FALLBACK_MODELS)
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid LLM_FALLBACK_MODELS, ignoring it: {str(e)}")
+    return list(_fallback_models.get(model_name, []))
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait before retrying, from the Retry-After headers"""
+    headers = getattr(error, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "Retry-After-Ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(float(value) / 1000, 0)
+            except ValueError:
+                pass
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+# Refills a request and a token bucket by their per-minute limits, then debits the costs.
+# With ARGV[5] == 1 it only debits when both buckets can afford it and otherwise
+# returns the seconds until they can; with 0 it always applies the (possibly
+# negative) costs, to reconcile an estimate with actual usage. A limit of 0 is unlimited.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local request_limit = tonumber(ARGV[1])
+local token_limit = tonumber(ARGV[2])
+local request_cost = tonumber(ARGV[3])
+local token_cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated')
+local elapsed = math.max(now - (tonumber(state[3]) or now), 0)
+local requests = math.min(request_limit, (tonumber(state[1]) or request_limit) + elapsed * request_limit / 60)
+local tokens = math.min(token_limit, (tonumber(state[2]) or token_limit) + elapsed * token_limit / 60)
+local wait = 0
+if ARGV[5] == '1' then
+    if request_limit > 0 and requests < request_cost then
+        wait = (request_cost - requests) * 60 / request_limit
+    end
+    if token_limit > 0 and tokens < token_cost then
+        wait = math.max(wait, (token_cost - tokens) * 60 / token_limit)
+    end
+end
+if wait == 0 then
+    requests = requests - request_cost
+    tokens = math.min(token_limit, tokens - token_cost)
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return tostring(wait)
+"""
+
+@dataclass
+class RateLimit:
+    """Per-minute limits of one bucket, shared by every backend instance"""
+    bucket: str
+    rpm: int = 0
+    tpm: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{RATE_LIMIT_KEY_PREFIX}{self.bucket}"
+
+_rate_limits: Optional[Dict[str, Dict[str, int]]] = None
+
+def get_rate_limit(model_name: str) -> Optional[RateLimit]:
+    """Limits configured in LLM_RATE_LIMITS for the model, or else for its provider"""
+    global _rate_limits
+    if _rate_limits is None:
+        _rate_limits = {}
+        if config.LLM_RATE_LIMITS:
+            try:
+                _rate_limits = json.loads(config.LLM_RATE_LIMITS)
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid LLM_RATE_LIMITS, ignoring it: {str(e)}")
+    endpoint = _provider_endpoint(model_name, None, None)
+    provider = endpoint[0] if endpoint else model_name.split("/", 1)[0]
+    if model_name in _rate_limits:
+        limits, bucket = _rate_limits[model_name], f"{provider}:{model_name}"
+    elif provider in _rate_limits:
+        limits, bucket = _rate_limits[provider], provider
+    else:
+        return None
+    return RateLimit(bucket=bucket, rpm=int(limits.get("rpm", 0)), tpm=int(limits.get("tpm", 0)))
+
+def estimate_prompt_tokens(model_name: str, messages: List[Dict[str, Any]]) -> int:
+    try:
+        return litellm.token_counter(model=model_name, messages=messages)
+    except Exception:
+        return len(json.dumps(messages, default=str)) // 4
+
+def _usage_tokens(usage: Any) -> Optional[int]:
+    """Total tokens of a response's usage, or None when it did not report any"""
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    total = get("total_tokens")
+    if total is None:
+        prompt, completion = get("prompt_tokens"), get("completion_tokens")
+        if prompt is None and completion is None:
+            return None
+        total = (prompt or 0) + (completion or 0)
+    return int(total)
+
+class RateLimitReservation:
+    """Tokens debited from a bucket for one call, settled once its actual usage is known"""
+
+    def __init__(self, limit: RateLimit, estimated_tokens: int):
+        self.limit = limit
+        self.estimated_tokens = estimated_tokens
+        self._settled = False
+
+    async def settle(self, actual_tokens: Optional[int]) -> None:
+        """Debit or refund the difference between the estimate and actual usage (None keeps the estimate)"""
+        if self._settled or actual_tokens is None or not self.limit.tpm:
+            return
+        self._settled = True
+        try:
+            await redis.eval(TOKEN_BUCKET_SCRIPT, [self.limit.key], [self.limit.rpm, self.limit.tpm, 0, actual_tokens - self.estimated_tokens, 0])
+        except Exception as e:
+            logger.debug(f"Could not reconcile rate limit for {self.limit.bucket}: {str(e)}")
+
+async def acquire_rate_limit(limit: RateLimit, estimated_tokens: int) -> Optional[RateLimitReservation]:
+    """Wait until the bucket can afford one request of estimated_tokens and debit it.
+
+    Concurrent calls across instances queue here instead of all getting 429s.
+    After MAX_RATE_LIMIT_WAIT, or when Redis is unavailable, the call goes ahead
+    without a reservation.
+    """
+    cost = min(estimated_tokens, limit.tpm) if limit.tpm else 0
+    waited = 0.0
+    while True:
+        try:
+            wait = float(await redis.eval(TOKEN_BUCKET_SCRIPT, [limit.key], [limit.rpm, limit.tpm, 1, cost, 1]))
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable for {limit.bucket}, calling without it: {str(e)}")
+            return None
+        if wait <= 0:
+            if waited:
+                logger.info(f"Rate limit for {limit.bucket} cleared after {waited:.1f}s")
+            return RateLimitReservation(limit, cost)
+        if waited + wait > MAX_RATE_LIMIT_WAIT:
+            logger.warning(f"Rate limit for {limit.bucket} needs {wait:.1f}s more after {waited:.1f}s, calling anyway")
+            return None
+        # Jitter so queued calls do not all retry at the same refill
+        wait += random.uniform(0, min(wait * 0.2, 1))
+        logger.info(f"Rate limit for {limit.bucket} reached, waiting {wait:.1f}s")
+        await asyncio.sleep(wait)
+        waited += wait
+
+async def _record_usage(model_name: str, usage: Any, reservation: Optional[RateLimitReservation], track_cache: bool) -> None:
+    """Settle the call's rate limit reservation and record its prompt cache reads and writes"""
+    if track_cache:
+        await record_cache_usage(model_name, usage)
+    if reservation:
+        await reservation.settle(_usage_tokens(usage))
+
+async def _watch_stream_usage(stream: Any, model_name: str, reservation: Optional[RateLimitReservation], track_cache: bool) -> AsyncGenerator:
+    """Pass a stream through and record the usage sent in its last chunk once it ends"""
+    usage = None
+    try:
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            yield chunk
+    finally:
+        if hasattr(stream, "aclose"):
+            await stream.aclose()
+        await _record_usage(model_name, usage, reservation, track_cache)
+
+async def handle_error(error: Exception, attempt: int, max_attempts: int, previous_delay: float = BASE_RETRY_DELAY) -> float:
+    """Wait before retrying a failed call and return the delay used.
+
+    Waits as long as the provider's Retry-After asks, plus a little jitter;
+    otherwise uses decorrelated jitter backoff so calls that failed together do
+    not retry together.
+    """
+    retry_after = get_retry_after(error)
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, min(retry_after * 0.1, 1))
+    else:
+        delay = min(MAX_RETRY_DELAY, random.uniform(BASE_RETRY_DELAY, previous_delay * 3))
     logger.warning(f"Error on attempt {attempt + 1}/{max_attempts}: {str(error)}")
-    logger.debug(f"Waiting {delay} seconds before retry...")
+    logger.debug(f"Waiting {delay:.1f} seconds before retry{' (Retry-After)' if retry_after is not None else ''}...")
     await asyncio.sleep(delay)
+    return delay
 
 def prepare_params(
     messages: List[Dict[str, Any]],
@@ -87,7 +499,8 @@ def prepare_params(
     top_p: Optional[float] = None,
     model_id: Optional[str] = None,
     enable_thinking: Optional[bool] = False,
-    reasoning_effort: Optional[str] = 'low'
+    reasoning_effort: Optional[str] = 'low',
+    ephemeral_start: Optional[int] = None
 ) -> Dict[str, Any]:
     """Prepare parameters for the API call."""
     params = {
@@ -161,70 +574,9 @@ def prepare_params(
     # Check model name *after* potential modifications (like adding bedrock/ prefix)
     effective_model_name = params.get("model", model_name) # Use model from params if set, else original
     if "claude" in effective_model_name.lower() or "anthropic" in effective_model_name.lower():
-        messages = params["messages"] # Direct reference, modification affects params
-
-        # Ensure messages is a list
-        if not isinstance(messages, list):
-            return params # Return early if messages format is unexpected
-
-        # 1. Process the first message if it's a system prompt with string content
-        if messages and messages[0].get("role") == "system":
-            content = messages[0].get("content")
-            if isinstance(content, str):
-                # Wrap the string content in the required list structure
-                messages[0]["content"] = [
-                    {"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}
-                ]
-            elif isinstance(content, list):
-                 # If content is already a list, check if the first text block needs cache_control
-                 for item in content:
-                     if isinstance(item, dict) and item.get("type") == "text":
-                         if "cache_control" not in item:
-                             item["cache_control"] = {"type": "ephemeral"}
-                             break # Apply to the first text block only for system prompt
-
-        # 2. Find and process relevant user and assistant messages
-        last_user_idx = -1
-        second_last_user_idx = -1
-        last_assistant_idx = -1
-
-        for i in range(len(messages) - 1, -1, -1):
-            role = messages[i].get("role")
-            if role == "user":
-                if last_user_idx == -1:
-                    last_user_idx = i
-                elif second_last_user_idx == -1:
-                    second_last_user_idx = i
-            elif role == "assistant":
-                if last_assistant_idx == -1:
-                    last_assistant_idx = i
-
-            # Stop searching if we've found all needed messages
-            if last_user_idx != -1 and second_last_user_idx != -1 and last_assistant_idx != -1:
-                 break
-
-        # Helper function to apply cache control
-        def apply_cache_control(message_idx: int, message_role: str):
-            if message_idx == -1:
-                return
-
-            message = messages[message_idx]
-            content = message.get("content")
-
-            if isinstance(content, str):
-                message["content"] = [
-                    {"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}
-                ]
-            elif isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        if "cache_control" not in item:
-                           item["cache_control"] = {"type": "ephemeral"}
-
-        # Apply cache control to the identified messages
-        apply_cache_control(last_user_idx, "last user")
-        apply_cache_control(second_last_user_idx, "second last user")
-        apply_cache_control(last_assistant_idx, "last assistant")
+        # Breakpoints on the stable prefix only; ephemeral messages stay after them
+        if isinstance(params["messages"], list):
+            params["messages"] = plan_cache_breakpoints(params["messages"], ephemeral_start)
 
     # Add reasoning_effort for Anthropic models if enabled
     use_thinking = enable_thinking if enable_thinking is not None else False
@@ -252,7 +604,9 @@ async def make_llm_api_call(
     top_p: Optional[float] = None,
     model_id: Optional[str] = None,
     enable_thinking: Optional[bool] = False,
-    reasoning_effort: Optional[str] = 'low'
+    reasoning_effort: Optional[str] = 'low',
+    fallback_models: Optional[List[str]] = None,
+    ephemeral_start: Optional[int] = None
 ) -> Union[Dict[str, Any], AsyncGenerator]:
     """
     Make an API call to a language model using LiteLLM.
@@ -272,56 +626,131 @@ async def make_llm_api_call(
         model_id: Optional ARN for Bedrock inference profiles
         enable_thinking: Whether to enable thinking
         reasoning_effort: Level of reasoning effort
+        fallback_models: Models to try in order while the model's circuit is open (default: LLM_FALLBACK_MODELS)
+        ephemeral_start: Index of the first message that changes between calls, kept out of the prompt cache
 
     Returns:
         Union[Dict[str, Any], AsyncGenerator]: API response or stream
 
     Raises:
-        LLMRetryError: If API call fails after retries
+        LLMRetryError: If API call fails after retries, or every model's circuit is open
         LLMError: For other API-related errors
     """
     # debug <timestamp>.json messages
     logger.info(f"Making LLM API call to model: {model_name} (Thinking: {enable_thinking}, Effort: {reasoning_effort})")
     logger.info(f"📡 API Call: Using model {model_name}")
-    params = prepare_params(
-        messages=messages,
-        model_name=model_name,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        response_format=response_format,
-        tools=tools,
-        tool_choice=tool_choice,
-        api_key=api_key,
-        api_base=api_base,
-        stream=stream,
-        top_p=top_p,
-        model_id=model_id,
-        enable_thinking=enable_thinking,
-        reasoning_effort=reasoning_effort
-    )
+    if fallback_models is None:
+        fallback_models = get_fallback_models(model_name)
+    errors = []
+    for index, candidate in enumerate([model_name] + fallback_models):
+        breaker = get_circuit_breaker(candidate)
+        # Once its circuit has opened, an allowed call is the half-open trial
+        is_trial = breaker.open_until is not None
+        if not breaker.allow_request():
+            logger.warning(f"Circuit for {candidate} is open, not calling it")
+            errors.append(f"{candidate}: circuit open")
+            continue
+        try:
+            if index > 0:
+                logger.warning(f"Falling back from {model_name} to {candidate}")
+
+            primary = index == 0
+            params = prepare_params(
+                messages=messages,
+                model_name=candidate,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=response_format,
+                tools=tools,
+                tool_choice=tool_choice,
+                api_key=api_key if primary else None,
+                api_base=api_base if primary else None,
+                stream=stream,
+                top_p=top_p,
+                model_id=model_id if primary else None,
+                enable_thinking=enable_thinking,
+                reasoning_effort=reasoning_effort,
+                ephemeral_start=ephemeral_start
+            )
+            # Reuse the provider's open connections instead of a fresh TCP/TLS setup per call
+            client = get_pooled_client(params["model"], params.get("api_key"), params.get("api_base"))
+            if client is not None:
+                params["client"] = client
+            return await _call_with_retries(params, candidate, breaker)
+        except LLMRetryError as e:
+            errors.append(f"{candidate}: {str(e)}")
+            # Fall back only while the provider is considered degraded
+            if not breaker.is_open:
+                raise
+        finally:
+            # A trial call that ended without an outcome, e.g. cancelled, must not block the circuit
+            if is_trial:
+                breaker.release_trial()
+
+    error_msg = "No model available: " + "; ".join(errors)
+    logger.error(error_msg)
+    raise LLMRetryError(error_msg)
+
+async def _call_with_retries(params: Dict[str, Any], model_name: str, breaker: CircuitBreaker) -> Union[Dict[str, Any], AsyncGenerator]:
+    """Call one model, retrying transient errors until MAX_RETRIES or its circuit opens"""
+    rate_limit = get_rate_limit(model_name)
+    estimated_tokens = estimate_prompt_tokens(model_name, params["messages"]) if rate_limit else 0
+    # Anthropic reports prompt cache reads and writes in the usage
+    track_cache = "claude" in model_name.lower() or "anthropic" in model_name.lower()
+    if (rate_limit or track_cache) and params.get("stream"):
+        # Usage is then sent in the last chunk
+        params["stream_options"] = {"include_usage": True}
     last_error = None
+    delay = BASE_RETRY_DELAY
     for attempt in range(MAX_RETRIES):
         try:
             logger.debug(f"Attempt {attempt + 1}/{MAX_RETRIES}")
             # logger.debug(f"API request parameters: {json.dumps(params, indent=2)}")
 
-            response = await litellm.acompletion(**params)
+            reservation = await acquire_rate_limit(rate_limit, estimated_tokens) if rate_limit else None
+            try:
+                response = await litellm.acompletion(**params)
+            except (Exception, asyncio.CancelledError):
+                # A failed or cancelled call used no tokens
+                if reservation:
+                    await reservation.settle(0)
+                raise
+            breaker.record_success()
+            if reservation or track_cache:
+                if params.get("stream"):
+                    response = _watch_stream_usage(response, model_name, reservation, track_cache)
+                else:
+                    await _record_usage(model_name, getattr(response, "usage", None), reservation, track_cache)
             logger.debug(f"Successfully received API response from {model_name}")
             logger.debug(f"Response: {response}")
             return response
 
+        except NON_RETRYABLE_ERRORS as e:
+            breaker.record_success()
+            logger.error(f"Non-retryable error during API call: {str(e)}")
+            raise LLMError(f"API call failed: {str(e)}")
+
         except (litellm.exceptions.RateLimitError, OpenAIError, json.JSONDecodeError) as e:
             last_error = e
-            await handle_error(e, attempt, MAX_RETRIES)
+            breaker.record_failure()
+            retry_after = get_retry_after(e)
+            if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                # The provider says it is unavailable for a while; stop calling it until then
+                breaker.open_for(retry_after)
+                break
+            if breaker.is_open or attempt + 1 >= MAX_RETRIES:
+                break
+            delay = await handle_error(e, attempt, MAX_RETRIES, delay)
 
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"Unexpected error during API call: {str(e)}", exc_info=True)
             raise LLMError(f"API call failed: {str(e)}")
 
-    error_msg = f"Failed to make API call after {MAX_RETRIES} attempts"
+    error_msg = f"Failed to make API call to {model_name} after {attempt + 1} attempts"
     if last_error:
         error_msg += f". Last error: {str(last_error)}"
-    logger.error(error_msg, exc_info=True)
+    logger.error(error_msg)
     raise LLMRetryError(error_msg)
 
 # Initialize API keys on module import
@@ -0,0 +1,179 @@
+"""
+Prompt-cache breakpoint planning for Anthropic models.
+
+Anthropic caches the prompt prefix up to each `cache_control` breakpoint, at
+most four per request, and a later request reads an entry when its prefix up
+to a content block boundary is identical (looking back up to 20 blocks from
+each breakpoint). The planner therefore only places breakpoints on content
+that will be byte-identical in the next call:
+
+- the end of the system prompt (with the XML tool examples and, before it, the
+  tool schemas), which is the same for every call of a run;
+- checkpoints at fixed positions in the history, so long conversations keep
+  hitting entries that earlier calls wrote;
+- the end of the stable history, which the next call reads back.
+
+Messages from `ephemeral_start` on, such as the browser state inserted before
+the last user message, change every call and are kept after all breakpoints.
+
+Cache reads and writes reported in the usage of each call are logged and
+counted per model so the hit rate can be measured.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from services import redis
+from utils.logger import logger
+
+# Anthropic allows at most this many cache_control blocks per request
+MAX_BREAKPOINTS = 4
+# Prefixes shorter than this are not cached by the API (1024 tokens for Sonnet and Opus)
+MIN_CACHEABLE_TOKENS = 1024
+# History checkpoints sit on multiples of this many messages, so they stay put as the thread grows
+CHECKPOINT_INTERVAL = 12
+# Rough token cost of an image block for the size estimate
+IMAGE_TOKENS = 1500
+STATS_KEY = "llm_prompt_cache_stats"
+
+CACHE_ROLES = ("system", "user", "assistant")
+
+
+def _estimate_tokens(message: Dict[str, Any]) -> int:
+    content = message.get("content")
+    if isinstance(content, str):
+        return len(content) // 4
+    tokens = 0
+    if isinstance(content, list):
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "text":
+                tokens += len(block.get("text", "")) // 4
+            elif block.get("type") in ("image_url", "image"):
+                tokens += IMAGE_TOKENS
+    if message.get("tool_calls"):
+        tokens += len(json.dumps(message["tool_calls"], default=str)) // 4
+    return tokens
+
+
+def _strip_cache_control(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of the message without breakpoints from earlier calls"""
+    content = message.get("content")
+    if not isinstance(content, list) or not any(isinstance(b, dict) and "cache_control" in b for b in content):
+        return message
+    blocks = [{k: v for k, v in block.items() if k != "cache_control"} if isinstance(block, dict) else block for block in content]
+    return {**message, "content": blocks}
+
+
+def _can_mark(message: Dict[str, Any]) -> bool:
+    if message.get("role") not in CACHE_ROLES:
+        return False
+    content = message.get("content")
+    if isinstance(content, str):
+        return bool(content)
+    return isinstance(content, list) and any(isinstance(b, dict) and b.get("type") == "text" for b in content)
+
+
+def _mark(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of the message with a breakpoint on its last text block"""
+    content = message["content"]
+    if isinstance(content, str):
+        return {**message, "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]}
+    blocks = list(content)
+    for i in range(len(blocks) - 1, -1, -1):
+        if isinstance(blocks[i], dict) and blocks[i].get("type") == "text":
+            blocks[i] = {**blocks[i], "cache_control": {"type": "ephemeral"}}
+            break
+    return {**message, "content": blocks}
+
+
+def plan_cache_breakpoints(messages: List[Dict[str, Any]], ephemeral_start: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Return the messages with cache_control breakpoints on their longest stable prefixes.
+
+    The input messages are not modified.
+
+    Args:
+        messages: Messages of the request, system prompt first
+        ephemeral_start: Index of the first message that changes between calls; it
+            and everything after it stay uncached (default: the whole list is stable)
+
+    Returns:
+        The messages, with marked ones replaced by copies
+    """
+    planned = [_strip_cache_control(message) for message in messages]
+    stable_end = len(planned) if ephemeral_start is None else max(min(ephemeral_start, len(planned)), 0)
+
+    # Cumulative size of the prefix ending at each message
+    prefix_tokens = []
+    total = 0
+    for message in planned[:stable_end]:
+        total += _estimate_tokens(message)
+        prefix_tokens.append(total)
+
+    def cacheable(index: int) -> bool:
+        return _can_mark(planned[index]) and prefix_tokens[index] >= MIN_CACHEABLE_TOKENS
+
+    breakpoints: List[int] = []
+    # The system prompt, shared by every call of the run
+    if stable_end and planned[0].get("role") == "system" and cacheable(0):
+        breakpoints.append(0)
+
+    # The end of the stable history, written now and read by the next call
+    last = next((i for i in range(stable_end - 1, 0, -1) if cacheable(i)), None)
+
+    # Fixed checkpoints in between, newest first, for what the last breakpoint cannot look back to
+    checkpoints = []
+    if last is not None:
+        remaining = MAX_BREAKPOINTS - len(breakpoints) - 1
+        position = (last - 1) // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL
+        while remaining and position > 0:
+            index = next((i for i in range(position, 0, -1) if cacheable(i)), None)
+            if index is None or (breakpoints and index <= breakpoints[0]):
+                break
+            if index not in checkpoints:
+                checkpoints.append(index)
+                remaining -= 1
+            position -= CHECKPOINT_INTERVAL
+        breakpoints.extend(sorted(checkpoints))
+        breakpoints.append(last)
+
+    for index in breakpoints:
+        planned[index] = _mark(planned[index])
+    logger.debug(f"Placed {len(breakpoints)} prompt cache breakpoint(s) at messages {breakpoints} of {len(planned)} ({stable_end} stable)")
+    return planned
+
+
+def _usage_value(usage: Any, name: str) -> int:
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return int(value or 0)
+
+
+async def record_cache_usage(model_name: str, usage: Any) -> None:
+    """Log the prompt cache reads and writes of one call and add them to the per-model totals"""
+    if usage is None:
+        return
+    cache_read = _usage_value(usage, "cache_read_input_tokens")
+    cache_creation = _usage_value(usage, "cache_creation_input_tokens")
+    prompt_tokens = _usage_value(usage, "prompt_tokens")
+    logger.info(f"Prompt cache for {model_name}: {cache_read} tokens read, {cache_creation} written, {prompt_tokens} prompt tokens")
+    try:
+        await redis.hincrby(STATS_KEY, f"{model_name}:calls")
+        await redis.hincrby(STATS_KEY, f"{model_name}:cache_read_input_tokens", cache_read)
+        await redis.hincrby(STATS_KEY, f"{model_name}:cache_creation_input_tokens", cache_creation)
+        await redis.hincrby(STATS_KEY, f"{model_name}:prompt_tokens", prompt_tokens)
+    except Exception as e:
+        logger.debug(f"Could not record prompt cache usage for {model_name}: {str(e)}")
+
+
+async def get_prompt_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Cache reads, writes and hit rate per model, across all instances"""
+    counts = await redis.hgetall(STATS_KEY)
+    stats: Dict[str, Dict[str, Any]] = {}
+    for field, value in counts.items():
+        model_name, _, name = field.rpartition(":")
+        stats.setdefault(model_name, {})[name] = int(value)
+    for entry in stats.values():
+        prompt_tokens = entry.get("prompt_tokens", 0)
+        entry["hit_rate"] = round(entry.get("cache_read_input_tokens", 0) / prompt_tokens, 3) if prompt_tokens else 0.0
+    return stats
@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 import asyncio
 from utils.logger import logger
-from typing import List, Any
+from typing import Dict, List, Any
 
 # Redis client
 client = None
@@ -148,4 +148,42 @@ async def expire(key: str, time: int):
 async def keys(pattern: str) -> List[str]:
     """Get keys matching a pattern."""
     redis_client = await get_client()
-    return await redis_client.keys(pattern)
\ No newline at end of file
+    return await redis_client.keys(pattern)
+
+
+# Hash operations
+async def hset(key: str, field: str, value: str):
+    """Set a field in a hash."""
+    redis_client = await get_client()
+    return await redis_client.hset(key, field, value)
+
+
+async def hget(key: str, field: str):
+    """Get a field from a hash."""
+    redis_client = await get_client()
+    return await redis_client.hget(key, field)
+
+
+async def hgetall(key: str) -> Dict[str, str]:
+    """Get all fields and values of a hash."""
+    redis_client = await get_client()
+    return await redis_client.hgetall(key)
+
+
+async def hdel(key: str, *fields: str):
+    """Delete one or more fields from a hash."""
+    redis_client = await get_client()
+    return await redis_client.hdel(key, *fields)
+
+
+async def hincrby(key: str, field: str, amount: int = 1) -> int:
+    """Increment the integer value of a hash field."""
+    redis_client = await get_client()
+    return await redis_client.hincrby(key, field, amount)
+
+
+# Scripts
+async def eval(script: str, keys: List[str], args: List[Any]):
+    """Run a Lua script atomically."""
+    redis_client = await get_client()
+    return await redis_client.eval(script, len(keys), *keys, *args)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+# The extractor runs inside the sandbox image, where its directory is the import root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "sandbox", "docker"))
+
+from content_extraction import ContentExtractor
+
+ARTICLE_TEXT = " ".join(f"word{i}" for i in range(200))
+
+
+def extract(html: str) -> str:
+    document, _ = ContentExtractor().extract(html, "https://example.com/")
+    return document.markdown
+
+
+def test_unclosed_options_do_not_hide_the_rest_of_the_page():
+    html = (
+        "<html><body>"
+        "<select><option>A<option>B</select>"
+        f"<article><h1>Heading</h1><p>{ARTICLE_TEXT}</p></article>"
+        "</body></html>"
+    )
+    markdown = extract(html)
+    assert "word0" in markdown
+    assert "word199" in markdown
+    assert "A" not in markdown.split()
+
+
+def test_nested_skipped_elements_are_skipped_whole():
+    html = (
+        "<html><body>"
+        "<svg><svg><text>inner</text></svg><text>outer</text></svg>"
+        f"<article><p>{ARTICLE_TEXT}</p></article>"
+        "</body></html>"
+    )
+    markdown = extract(html)
+    assert "word199" in markdown
+    assert "inner" not in markdown
+    assert "outer" not in markdown
+
+
+def test_unclosed_head_ends_at_body():
+    html = f"<html><head><title>Page</title><body><article><p>{ARTICLE_TEXT}</p></article></body></html>"
+    document, _ = ContentExtractor().extract(html, "https://example.com/")
+    assert document.title == "Page"
+    assert "word199" in document.markdown
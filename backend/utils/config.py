@@ -123,6 +123,16 @@ class Configuration:
     # Model configuration
     MODEL_TO_USE: Optional[str] = "anthropic/claude-3-7-sonnet-latest"
     
+    # Pooled HTTP connections to LLM providers
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: int = 120
+    LLM_HTTP2: bool = True
+    # JSON object mapping a model to the models to fall back to while its circuit is open
+    LLM_FALLBACK_MODELS: Optional[str] = None
+    # JSON object mapping a model or provider to its {"rpm": ..., "tpm": ...} limits, shared by all instances
+    LLM_RATE_LIMITS: Optional[str] = None
+    
     # Supabase configuration
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
@@ -1,5 +1,8 @@
 
 import os
+import re
+import shlex
+from typing import Iterable, List, Optional
 
 # Files to exclude from operations
 EXCLUDED_FILES = {
@@ -20,7 +23,9 @@ EXCLUDED_DIRS = {
     ".next",
     "dist",
     "build",
-    ".git"
+    ".git",
+    ".command_logs",
+    ".tool_outputs"
 }
 
 # File extensions to exclude from operations
@@ -38,6 +43,120 @@ EXCLUDED_EXT = {
     ".sql"
 }
 
+def _glob_to_regex(glob: str) -> str:
+    """Translate a gitignore-style glob to a regex over a relative path"""
+    regex = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                regex.append(glob[i:end + 1].replace("[!", "[^"))
+                i = end
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+class PathMatcher:
+    """Compiled gitignore-style exclusion patterns
+    
+    A pattern without a slash matches a whole path segment at any depth, so
+    "build/" excludes "build" and "src/build" but not "rebuild" or "build.py".
+    A slash elsewhere in the pattern anchors it to the root. A trailing slash
+    restricts the pattern to directories. "*" and "?" stay within a segment and
+    "**" spans segments. Negation is not supported.
+    
+    Everything under an excluded directory is excluded too, so traversals should
+    prune such directories instead of listing them and filtering afterwards.
+    find_prune() and find_file_filter() give the matching find(1) expressions for
+    traversals that run inside the sandbox.
+    """
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True):
+        self.patterns: List[str] = [
+            p.strip() for p in patterns if p.strip() and not p.strip().startswith("#")
+        ]
+        self.ignore_case = ignore_case
+        dir_regexes = []
+        any_regexes = []
+        for pattern in self.patterns:
+            body = pattern.rstrip("/")
+            regex = _glob_to_regex(body.lstrip("/"))
+            regex = f"^{regex}$" if "/" in body else f"(?:^|/){regex}$"
+            (dir_regexes if pattern.endswith("/") else any_regexes).append(regex)
+        flags = re.IGNORECASE if ignore_case else 0
+        self._dir_re = self._compile(dir_regexes + any_regexes, flags)
+        self._file_re = self._compile(any_regexes, flags)
+
+    @staticmethod
+    def _compile(regexes: List[str], flags: int) -> Optional[re.Pattern]:
+        return re.compile("|".join(regexes), flags) if regexes else None
+
+    def matches_dir(self, rel_path: str) -> bool:
+        """Whether a pattern matches this directory itself"""
+        return self._dir_re is not None and self._dir_re.search(rel_path.strip("/")) is not None
+
+    def excludes(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Whether rel_path is excluded, either directly or through an excluded parent directory"""
+        rel_path = rel_path.strip("/")
+        if not rel_path:
+            return False
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.matches_dir("/".join(parts[:depth])):
+                return True
+        if is_dir:
+            return self.matches_dir(rel_path)
+        return self._file_re is not None and self._file_re.search(rel_path) is not None
+
+    def _find_tests(self, patterns: List[str], root: str) -> List[str]:
+        name_test = "-iname" if self.ignore_case else "-name"
+        path_test = "-ipath" if self.ignore_case else "-path"
+        tests = []
+        for pattern in patterns:
+            body = pattern.rstrip("/")
+            if "/" in body:
+                glob = body.lstrip("/").replace("**/", "*").replace("**", "*")
+                tests.append(f"{path_test} {shlex.quote(root.rstrip('/') + '/' + glob)}")
+            else:
+                tests.append(f"{name_test} {shlex.quote(body)}")
+        return tests
+
+    def find_prune(self, root: str = ".") -> str:
+        """find(1) test matching excluded directories below root, to combine with -prune"""
+        tests = self._find_tests(self.patterns, root)
+        if not tests:
+            return "-false"
+        return f"-type d \\( {' -o '.join(tests)} \\)"
+
+    def find_file_filter(self, root: str = ".") -> str:
+        """find(1) tests that reject excluded files below root"""
+        tests = self._find_tests([p for p in self.patterns if not p.endswith("/")], root)
+        return " ".join(f"! {test}" for test in tests)
+
+# Workspace excludes shared by snapshots, the manifest and listings
+WORKSPACE_EXCLUDES = PathMatcher(
+    [f"{d}/" for d in sorted(EXCLUDED_DIRS)]
+    + sorted(EXCLUDED_FILES)
+    + [f"*{ext}" for ext in sorted(EXCLUDED_EXT)]
+)
+
 def should_exclude_file(rel_path: str) -> bool:
     """Check if a file should be excluded based on path, name, or extension
     
@@ -47,22 +166,7 @@ def should_exclude_file(rel_path: str) -> bool:
     Returns:
         True if the file should be excluded, False otherwise
     """
-    # Check filename
-    filename = os.path.basename(rel_path)
-    if filename in EXCLUDED_FILES:
-        return True
-
-    # Check directory
-    dir_path = os.path.dirname(rel_path)
-    if any(excluded in dir_path for excluded in EXCLUDED_DIRS):
-        return True
-
-    # Check extension
-    _, ext = os.path.splitext(filename)
-    if ext.lower() in EXCLUDED_EXT:
-        return True
-
-    return False 
+    return WORKSPACE_EXCLUDES.excludes(rel_path)
 
 def clean_path(path: str, workspace_path: str = "/workspace") -> str:
     """Clean and normalize a path to be relative to the workspace